@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Measures the four rotation steps of the access token rotator lambda against
+moto's Secrets Manager, and compares cold invocations, which start from a
+new lambda container, with warm invocations, which reuse the Secrets Manager
+client, the parsed secrets_config.json and the cached static secrets.
+
+The npm registry calls are replaced with stubs, so that only the Secrets
+Manager side of each step is measured. Before each rotation, the pending
+version of the access token secret is staged, as Secrets Manager would, so
+createSecret finds it and does not create a new token.
+
+Usage:
+    ./benchmarks/rotation_benchmark.py --rotations 20
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from unittest.mock import patch
+
+import boto3
+from moto import mock_aws
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + '/../lambda_functions')
+import rotation_metrics
+import secret_rotator
+import secrets_config_utils
+import secrets_manager_utils
+import user_access_token_rotator
+from rotation_handlers import rotate_access_keys
+
+STEPS = ['createSecret', 'setSecret', 'testSecret', 'finishSecret']
+STATIC_SECRETS = {
+    'npm_login_username_secret': ('npm_login_username', 'benchmark-user'),
+    'npm_login_password_secret': ('npm_login_password', 'benchmark-password'),
+    'npm_otp_seed_secret': ('npm_otp_seed', 'JBSWY3DPEHPK3PXP'),
+}
+
+
+def create_secrets(service_client):
+    """Creates the static secrets and an access token secret enabled for rotation, and returns the
+    secrets_config.json contents that reference them
+    """
+    config = {}
+    for secret_id, (secret_key, value) in STATIC_SECRETS.items():
+        arn = service_client.create_secret(Name=secret_id,
+                                           SecretString=json.dumps({secret_key: value}))['ARN']
+        config[secret_id] = {'arn': arn, 'secret_key': secret_key}
+
+    access_token_arn = service_client.create_secret(
+        Name='npm_access_token',
+        SecretString=json.dumps({'npm_access_token': 'initial-token'}))['ARN']
+    service_client.rotate_secret(SecretId=access_token_arn, RotationRules={'AutomaticallyAfterDays': 5})
+    # moto's rotation, without a lambda, leaves a current version without a value
+    service_client.put_secret_value(SecretId=access_token_arn,
+                                    SecretString=json.dumps({'npm_access_token': 'initial-token'}),
+                                    VersionStages=['AWSCURRENT'])
+    config['npm_access_token_secrets'] = {
+        'secrets': [{'arn': access_token_arn, 'secret_key': 'npm_access_token'}]
+    }
+    return config
+
+
+def reset_container():
+    """Drops the state kept across warm invocations, as a new lambda container would start without it"""
+    secret_rotator.service_client = None
+    secrets_config_utils.secrets_config_index = None
+    secrets_manager_utils.cached_secret_values.clear()
+    # The metrics are recorded, but their log lines are discarded
+    rotation_metrics.rotation_metrics = rotation_metrics.RotationMetrics(emit=lambda log_line: None)
+
+
+def rotate(service_client, access_token_arn, cold):
+    """Runs the four rotation steps for a new version of the access token secret, and returns the
+    duration of each step in seconds
+    """
+    token = str(uuid.uuid4())
+    service_client.put_secret_value(SecretId=access_token_arn,
+                                    ClientRequestToken=token,
+                                    SecretString=json.dumps({'npm_access_token': token}),
+                                    VersionStages=['AWSPENDING'])
+    durations = {}
+    for step in STEPS:
+        if cold:
+            reset_container()
+        started_at = time.perf_counter()
+        rotate_access_keys({'SecretId': access_token_arn, 'ClientRequestToken': token, 'Step': step}, None)
+        durations[step] = time.perf_counter() - started_at
+    return durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--rotations', type=int, default=10)
+    args = parser.parse_args()
+
+    os.environ.update(AWS_ACCESS_KEY_ID='benchmark',
+                      AWS_SECRET_ACCESS_KEY='benchmark',
+                      AWS_DEFAULT_REGION='us-west-2')
+    with mock_aws(), tempfile.TemporaryDirectory() as config_dir, \
+            patch.object(user_access_token_rotator, 'create_access_token', return_value='new-token'), \
+            patch.object(user_access_token_rotator, 'get_user_info_using_access_token'), \
+            patch.object(user_access_token_rotator, 'delete_access_token'):
+        service_client = boto3.client('secretsmanager')
+        config = create_secrets(service_client)
+        with open(f'{config_dir}/secrets_config.json', 'w') as config_file:
+            json.dump(config, config_file)
+        os.chdir(config_dir)
+        access_token_arn = config['npm_access_token_secrets']['secrets'][0]['arn']
+
+        results = {}
+        for mode in ['cold', 'warm']:
+            reset_container()
+            rotations = [rotate(service_client, access_token_arn, mode == 'cold') for _ in range(args.rotations)]
+            results[mode] = {step: statistics.median(r[step] for r in rotations) for step in STEPS}
+
+    print(f"{'step':<14}{'cold (ms)':>12}{'warm (ms)':>12}")
+    for step in STEPS:
+        print(f"{step:<14}{results['cold'][step] * 1000:>12.1f}{results['warm'][step] * 1000:>12.1f}")
+    cold_total = sum(results['cold'].values())
+    warm_total = sum(results['warm'].values())
+    print(f"{'total':<14}{cold_total * 1000:>12.1f}{warm_total * 1000:>12.1f} ({cold_total / warm_total:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from npm_utils import create_access_token, delete_access_token, get_user_info_using_access_token
+from rotation_metrics import get_rotation_metrics
+from secret_rotator import get_service_client
+from secrets_config_utils import (get_access_token_secrets_configs, get_secret_arn,
+                                  get_secret_config, get_secret_key)
+from secrets_manager_utils import (get_cached_secret_values, get_secret_values,
+                                   invalidate_cached_secret_values)
+
+# The maximum number of concurrent registry requests, to stay within the registry's rate limits
+REGISTRY_CONCURRENCY = int(os.getenv('NPM_REGISTRY_CONCURRENCY', '2'))
+
+
+class AccessTokenRotation:
+    """
+    The state and outcome of rotating one access token secret in a bulk rotation
+    Attributes:
+        secret_config: The configuration for the secret specified in secrets_config.json
+        token: The ClientRequestToken of the new secret version
+        step: The last rotation step that was started
+        outcome: 'rotated', 'failed', or None while the rotation is in progress
+        is_current: Whether the new version of the secret has become its current version, after
+            which the rotation is no longer undone, and is reported as rotated
+        error: What went wrong, also when the secret was rotated nonetheless
+    """
+
+    def __init__(self, secret_config):
+        self.secret_config = secret_config
+        self.token = str(uuid.uuid4())
+        self.new_access_token = None
+        self.old_access_token = None
+        self.is_current = False
+        self.step = None
+        self.outcome = None
+        self.error = None
+        self.started_at = time.perf_counter()
+        self.seconds = None
+
+    def fail(self, error):
+        self.outcome = 'failed'
+        self.error = f'{type(error).__name__}: {error}'
+        self.seconds = time.perf_counter() - self.started_at
+
+    def succeed(self):
+        self.outcome = 'rotated'
+        self.seconds = time.perf_counter() - self.started_at
+
+    def report_error(self, message):
+        """Records an error that does not undo the rotation, e.g. one after the new version became
+        current
+        """
+        self.error = message if self.error is None else f'{self.error}; {message}'
+
+    def to_dict(self):
+        return {
+            'secret_key': get_secret_key(self.secret_config),
+            'arn': get_secret_arn(self.secret_config),
+            'outcome': self.outcome,
+            'step': self.step,
+            'seconds': round(self.seconds, 3),
+            'error': self.error
+        }
+
+
+class BulkAccessTokenRotator:
+    """
+    Rotates every npm access token secret configured under npm_access_token_secrets in one
+    invocation, instead of the four invocations per secret of Secrets Manager's rotation. The npm
+    user's credentials are read once, the new access tokens are created concurrently, with at most
+    REGISTRY_CONCURRENCY registry requests at once, and the secrets are then staged, tested and
+    finalized as a batch.
+    A secret that fails a step before its new version became current is left out of the later
+    steps, with its new access token deleted and its pending version unstaged, without affecting
+    the rotation of the other secrets. Once the new version is current, the secret is rotated, and
+    later errors are reported with it, without undoing the rotation.
+    """
+
+    def __init__(self, secrets_config_id='npm_access_token_secrets'):
+        self.service_client = get_service_client()
+        self.secret_configs = get_access_token_secrets_configs(secrets_config_id)
+        self.logger = logging.getLogger()
+        self.logger.setLevel(logging.INFO)
+
+        secret_configs = [get_secret_config(secret_id)
+                          for secret_id in ['npm_login_username_secret',
+                                            'npm_otp_seed_secret',
+                                            'npm_login_password_secret']]
+        # The password is read on every invocation, as UserLoginPasswordRotator rotates it, and a
+        # cached one would be stale in the other containers until it expired
+        self.login_username, self.otp_seed, self.login_password = get_cached_secret_values(
+            self.service_client, secret_configs, uncached_configs=secret_configs[2:])
+
+    def rotate(self):
+        """Rotates every access token secret
+        Returns:
+            The outcome of each secret's rotation as a list of Dictionary objects
+        """
+        rotations = [AccessTokenRotation(secret_config) for secret_config in self.secret_configs]
+
+        self.run_step(rotations, 'createSecret', self.create_secret, REGISTRY_CONCURRENCY)
+        self.run_step(rotations, 'readCurrentSecrets', self.read_current_access_tokens)
+        self.run_step(rotations, 'testSecret', self.test_secret, REGISTRY_CONCURRENCY)
+        self.run_step(rotations, 'finishSecret', self.finish_secret, len(rotations))
+        self.run_step(rotations, 'deleteOldToken', self.delete_old_access_token,
+                      REGISTRY_CONCURRENCY)
+
+        for rotation in rotations:
+            if rotation.outcome is None:
+                rotation.succeed()
+        report = [rotation.to_dict() for rotation in rotations]
+        self.logger.info(f'Bulk rotation outcomes: {json.dumps(report)}')
+        return report
+
+    def run_step(self, rotations, step, function, max_workers=None):
+        """Runs a rotation step concurrently for every secret still being rotated, and cleans up the
+        secrets that fail it. Without max_workers, the function is called once, with every secret
+        still being rotated. The step's duration, and the number of secrets with an error in it, are
+        written as metrics
+        """
+        in_progress = [rotation for rotation in rotations if rotation.outcome is None]
+        if not in_progress:
+            return
+        started_at = time.perf_counter()
+        errors_before = [rotation.error for rotation in in_progress]
+
+        def run(rotation):
+            rotation.step = step
+            try:
+                function(rotation)
+            except Exception as e:
+                secret_key = get_secret_key(rotation.secret_config)
+                self.logger.error(f'{step}: Failed for secret {secret_key}: {e}')
+                if rotation.is_current:
+                    # The new access token is already in use, so the secret is rotated regardless
+                    rotation.report_error(f'{step}: {type(e).__name__}: {e}')
+                else:
+                    rotation.fail(e)
+                    self.clean_up(rotation)
+
+        if max_workers is None:
+            for rotation in in_progress:
+                rotation.step = step
+            function(in_progress)
+        else:
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                list(executor.map(run, in_progress))
+
+        # A secret rotated with an error, e.g. whose old access token could not be deleted, still
+        # counts as a failure of the step the error happened in
+        failures = len([rotation for rotation, error in zip(in_progress, errors_before)
+                        if rotation.error != error])
+        get_rotation_metrics().put_step(step, type(self).__name__, time.perf_counter() - started_at,
+                                        failures)
+
+    def create_secret(self, rotation):
+        """Creates a new access token, and puts it as the pending version of the secret"""
+        rotation.new_access_token = create_access_token(self.login_username, self.otp_seed,
+                                                        self.login_password)
+        secret_string = json.dumps({get_secret_key(rotation.secret_config):
+                                    rotation.new_access_token})
+        self.service_client.put_secret_value(SecretId=get_secret_arn(rotation.secret_config),
+                                             ClientRequestToken=rotation.token,
+                                             SecretString=secret_string,
+                                             VersionStages=['AWSPENDING'])
+
+    def read_current_access_tokens(self, in_progress):
+        """Reads the current access tokens of the secrets being rotated, together, before they are
+        replaced
+        """
+        try:
+            current_access_tokens = get_secret_values(
+                self.service_client, [rotation.secret_config for rotation in in_progress])
+        except Exception as e:
+            self.logger.error(f'Could not read the current access tokens: {e}')
+            for rotation in in_progress:
+                rotation.fail(e)
+                self.clean_up(rotation)
+            return
+        for rotation, current_access_token in zip(in_progress, current_access_tokens):
+            rotation.old_access_token = current_access_token
+
+    def test_secret(self, rotation):
+        """Validates that the new access token works for the npm user"""
+        get_user_info_using_access_token(self.login_username, self.otp_seed,
+                                         rotation.new_access_token)
+
+    def finish_secret(self, rotation):
+        """Marks the new version of the secret as the current one, and then removes its pending
+        label. The secret is rotated once the new version is current, so a failure to remove the
+        label is reported, but does not undo the rotation
+        """
+        secret_arn = get_secret_arn(rotation.secret_config)
+        metadata = self.service_client.describe_secret(SecretId=secret_arn)
+        current_version = None
+        for version, stages in metadata['VersionIdsToStages'].items():
+            if 'AWSCURRENT' in stages:
+                current_version = version
+                break
+        self.service_client.update_secret_version_stage(SecretId=secret_arn,
+                                                        VersionStage='AWSCURRENT',
+                                                        MoveToVersionId=rotation.token,
+                                                        RemoveFromVersionId=current_version)
+        rotation.is_current = True
+        invalidate_cached_secret_values(secret_arn)
+
+        # Outside of a Secrets Manager rotation, the pending label is not removed for us
+        try:
+            self.service_client.update_secret_version_stage(SecretId=secret_arn,
+                                                            VersionStage='AWSPENDING',
+                                                            RemoveFromVersionId=rotation.token)
+        except Exception as e:
+            self.logger.error('Could not remove the pending label of '
+                              f'{get_secret_key(rotation.secret_config)}: {e}')
+            rotation.report_error(f'Pending label not removed: {type(e).__name__}: {e}')
+
+    def delete_old_access_token(self, rotation):
+        """Deletes the replaced access token from the npm user's account. The secret is rotated by
+        then, so a failure is reported, but does not undo the rotation
+        """
+        try:
+            delete_access_token(self.login_username, self.otp_seed, self.login_password,
+                                rotation.old_access_token)
+        except Exception as e:
+            self.logger.error('Could not delete the old access token of '
+                              f'{get_secret_key(rotation.secret_config)}')
+            rotation.report_error(f'Old access token not deleted: {type(e).__name__}: {e}')
+
+    def clean_up(self, rotation):
+        """Deletes the new access token of a secret whose rotation failed before it became current,
+        and unstages its pending version, so that the old access token stays in use
+        """
+        if rotation.is_current or rotation.new_access_token is None:
+            return
+        secret_key = get_secret_key(rotation.secret_config)
+        try:
+            delete_access_token(self.login_username, self.otp_seed, self.login_password,
+                                rotation.new_access_token)
+        except Exception as e:
+            self.logger.error(f'Could not delete the new access token of {secret_key}: {e}')
+        try:
+            self.service_client.update_secret_version_stage(
+                SecretId=get_secret_arn(rotation.secret_config),
+                VersionStage='AWSPENDING',
+                RemoveFromVersionId=rotation.token)
+        except self.service_client.exceptions.ResourceNotFoundException:
+            # The pending version was never put
+            pass
+        except Exception as e:
+            self.logger.error(f'Could not unstage the pending version of {secret_key}: {e}')
@@ -1,6 +1,6 @@
 from secret_rotator import SecretRotator
 from secrets_config_utils import get_secret_config
-from secrets_manager_utils import get_secret_value
+from secrets_manager_utils import get_cached_secret_values
 
 
 class NPMCredentialsRotator(SecretRotator):
@@ -13,6 +13,23 @@ class NPMCredentialsRotator(SecretRotator):
 
         # Secrets that are commonly used by NPM credential rotators for authentication etc.
         # This avoids fetching these inside every method and thereby making less network calls
-        self.login_username = get_secret_value(self.service_client, get_secret_config('npm_login_username_secret'))
-        self.otp_seed = get_secret_value(self.service_client, get_secret_config('npm_otp_seed_secret'))
-        self.login_password = get_secret_value(self.service_client, get_secret_config('npm_login_password_secret'))
+        # The values are fetched together, and cached across the warm invocations of the lambda container
+        secret_configs = [get_secret_config(secret_id) for secret_id in ['npm_login_username_secret',
+                                                                         'npm_otp_seed_secret',
+                                                                         'npm_login_password_secret']]
+        # The password is read on every invocation, as UserLoginPasswordRotator rotates it, and a
+        # cached one would be stale in the other containers until it expired. So are the secrets read by the
+        # rotation step, which are fetched in the same batch
+        step_secret_configs = self.get_step_secret_configs()
+        secret_values = get_cached_secret_values(
+            self.service_client, secret_configs + step_secret_configs,
+            uncached_configs=secret_configs[2:] + step_secret_configs)
+        self.login_username, self.otp_seed, self.login_password = secret_values[:3]
+        self.step_secret_values = secret_values[3:]
+
+    def get_step_secret_configs(self):
+        """
+        Returns the configurations of the secrets whose current values the rotation step reads, which are
+        fetched together with the secrets used for authentication, into step_secret_values. None by default
+        """
+        return []
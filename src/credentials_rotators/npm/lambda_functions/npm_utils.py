@@ -1,6 +1,193 @@
 import json
+import os
+import random
+import threading
+import time
+
 import pyotp
 import requests
+from requests.adapters import HTTPAdapter
+
+from rotation_metrics import NPM_REGISTRY, get_rotation_metrics
+
+# The status codes of responses worth retrying: rate limiting and server errors
+RETRYABLE_STATUS_CODES = [429, 500, 502, 503, 504]
+# The methods that can be retried on server errors. A POST, e.g. creating an access token, may have
+# succeeded before the server failed, so it is only retried when it was rate limited
+IDEMPOTENT_METHODS = ['GET', 'DELETE']
+# The minimum number of seconds an OTP must stay valid for to be sent, so that it does not expire before the
+# registry checks it. Every attempt of a request may wait this long for the next OTP
+OTP_MIN_REMAINING_SECONDS = float(os.getenv('NPM_OTP_MIN_REMAINING_SECONDS', '1'))
+
+
+class NpmRegistryClient:
+    """
+    Sends requests to the npm registry through a single keep-alive session, so that the calls made by a
+    rotation step, and by the warm invocations of the lambda container, reuse their TLS connections.
+    Rate limited requests, and idempotent requests that failed with a server error, are retried with
+    exponential backoff and full jitter, honouring the Retry-After header of the response.
+    Attributes:
+        base_url: The url of the registry, https://registry.npmjs.org by default
+        timeout: The (connect, read) timeouts of each request, in seconds
+        max_retries: The maximum number of times a request is retried
+        backoff_base: The delay before the first retry, in seconds, doubled for every later retry
+        backoff_max: The maximum delay before a retry, in seconds
+    """
+
+    def __init__(self,
+                 base_url=None,
+                 connect_timeout=None,
+                 read_timeout=None,
+                 max_retries=None,
+                 backoff_base=0.5,
+                 backoff_max=8.0,
+                 pool_maxsize=10,
+                 sleep=time.sleep):
+        self.base_url = (base_url or os.getenv('NPM_REGISTRY_URL', 'https://registry.npmjs.org')).rstrip('/')
+        self.timeout = (
+            connect_timeout if connect_timeout is not None else float(os.getenv('NPM_REGISTRY_CONNECT_TIMEOUT', '5')),
+            read_timeout if read_timeout is not None else float(os.getenv('NPM_REGISTRY_READ_TIMEOUT', '15'))
+        )
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv('NPM_REGISTRY_MAX_RETRIES', '3'))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.sleep = sleep
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, path, get_headers, operation=None, **kwargs):
+        """Sends a request to the registry, retrying it if it is rate limited or, if it is idempotent, if the
+        registry failed
+        Args:
+            method (string): The HTTP method
+            path (string): The path of the url, below the registry's base url
+            get_headers (function): Returns the headers of an attempt. It is called again for every retry, so
+                that each attempt is sent with a current OTP
+            operation (string): The name of the request in the call metrics, the method by default
+            kwargs: Passed on to requests, e.g. data or auth
+        Returns:
+            The response of the last attempt
+        Raises:
+            HttpError: If the last attempt failed
+        """
+        url = f'{self.base_url}{path}'
+        attempt = 0
+        started_at = time.perf_counter()
+        failed = True
+        try:
+            while True:
+                response = self.session.request(method, url, headers=get_headers(),
+                                                timeout=self.timeout, **kwargs)
+                if (attempt >= self.max_retries
+                        or not self.is_retryable(method, response.status_code)):
+                    response.raise_for_status()
+                    failed = False
+                    return response
+                attempt += 1
+                self.sleep(self.get_retry_delay(attempt, response))
+        finally:
+            get_rotation_metrics().record_call(NPM_REGISTRY, operation or method,
+                                               time.perf_counter() - started_at,
+                                               retries=attempt, failed=failed)
+
+    @staticmethod
+    def is_retryable(method, status_code):
+        if status_code == 429:
+            return True
+        return status_code in RETRYABLE_STATUS_CODES and method.upper() in IDEMPOTENT_METHODS
+
+    def get_retry_delay(self, attempt, response):
+        """Returns the delay before the given retry: the response's Retry-After, if it has one, or a random
+        delay up to the exponential backoff of the attempt
+        """
+        retry_after = response.headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), self.backoff_max)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+
+# The registry client is created once per lambda container, and reused by warm invocations
+registry_client = None
+
+
+def get_registry_client():
+    """Gets the npm registry client shared by every invocation of the lambda container
+    Returns:
+        The NpmRegistryClient
+    """
+    global registry_client
+    if registry_client is None:
+        registry_client = NpmRegistryClient()
+    return registry_client
+
+
+class OtpGenerator:
+    """
+    Generates the time based OTPs of a npm user. The TOTP is parsed once, and its code is computed once per
+    time window, and reused by every registry call made in that window.
+    When the current window is about to expire, the generator waits for the next one, so that a request is not
+    sent with an OTP that expires before the registry checks it, rejected and retried.
+    Attributes:
+        totp: The parsed TOTP of the user
+        min_remaining: The minimum number of seconds an OTP must stay valid for to be returned
+    """
+
+    def __init__(self, username, otp_seed, min_remaining=OTP_MIN_REMAINING_SECONDS, clock=time.time,
+                 sleep=time.sleep):
+        self.totp = pyotp.parse_uri(f'otpauth://totp/{username}?secret={otp_seed}&issuer=npm')
+        self.min_remaining = min_remaining
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.window = None
+        self.otp = None
+
+    def now(self):
+        """Gets the OTP of the current time window, waiting for the next window if the current one is about to
+        expire
+        Returns:
+            The OTP as a String
+        """
+        current_time = self.clock()
+        remaining = self.totp.interval - current_time % self.totp.interval
+        if remaining < self.min_remaining:
+            self.sleep(remaining)
+            current_time = self.clock()
+
+        window = int(current_time // self.totp.interval)
+        with self.lock:
+            if window != self.window:
+                self.otp = self.totp.at(int(current_time))
+                self.window = window
+            return self.otp
+
+
+# The OTP generators of the npm users, by username and seed, reused by warm invocations
+otp_generators = {}
+otp_generators_lock = threading.Lock()
+
+
+def get_otp_generator(username, otp_seed):
+    """Gets the OTP generator of the npm user, shared by every invocation of the lambda container
+    Args:
+        username (string): The username of the npm user
+        otp_seed (string): The seed generated during 2 factor auth setup for the user
+    Returns:
+        The OtpGenerator
+    """
+    with otp_generators_lock:
+        otp_generator = otp_generators.get((username, otp_seed))
+        if otp_generator is None:
+            otp_generator = OtpGenerator(username, otp_seed)
+            otp_generators[(username, otp_seed)] = otp_generator
+        return otp_generator
+
 
 def generate_otp(username, otp_seed):
     """Generate a time based OTP using the OTP_SEED for the npm user
@@ -9,9 +196,19 @@ def generate_otp(username, otp_seed):
         username (string): The username of the npm user
         otp_seed (string): The seed generated during 2 factor auth setup for the user
     """
-    totp = pyotp.parse_uri(f'otpauth://totp/{username}?secret={otp_seed}&issuer=npm')
-    otp = totp.now()
-    return otp
+    return get_otp_generator(username, otp_seed).now()
+
+
+def get_otp_headers(username, otp_seed):
+    """Gets the headers of a registry request authenticated with a current OTP
+    Args:
+        username (string): The username of the npm user
+        otp_seed (string): The seed generated during 2 factor auth setup for the user
+    """
+    return {
+        'content-type': 'application/json',
+        'npm-otp': generate_otp(username, otp_seed)
+    }
 
 
 def update_login_password(username, otp_seed, current_password, new_password):
@@ -24,19 +221,13 @@ def update_login_password(username, otp_seed, current_password, new_password):
     Raises:
         HttpError: If the password update fails
     """
-    otp = generate_otp(username, otp_seed)
-
-    headers = {
-        'content-type': 'application/json',
-        'npm-otp': otp
-    }
-
-    url = 'https://registry.npmjs.org/-/npm/v1/user'
     data_dict = {'password': {'old': current_password, 'new': new_password}}
     data = json.dumps(data_dict)
 
-    response = requests.post(url, headers=headers, data=data, auth=(username, current_password))
-    response.raise_for_status()
+    get_registry_client().request('POST', '/-/npm/v1/user',
+                                  lambda: get_otp_headers(username, otp_seed),
+                                  operation='UpdatePassword', data=data,
+                                  auth=(username, current_password))
 
 def create_access_token(username, otp_seed, password):
     """Create an access token for a NPM user
@@ -47,19 +238,13 @@ def create_access_token(username, otp_seed, password):
     Raises:
         HttpError: If the access token creation fails
     """
-    otp = generate_otp(username, otp_seed)
-
-    headers = {
-        'content-type': 'application/json',
-        'npm-otp': otp
-    }
-
-    url = 'https://registry.npmjs.org/-/npm/v1/tokens'
     data_dict = {'password': password}
     data = json.dumps(data_dict)
 
-    response = requests.post(url, headers=headers, data=data, auth=(username, password))
-    response.raise_for_status()
+    response = get_registry_client().request('POST', '/-/npm/v1/tokens',
+                                             lambda: get_otp_headers(username, otp_seed),
+                                             operation='CreateToken', data=data,
+                                             auth=(username, password))
     return json.loads(response.content)['token']
 
 
@@ -72,16 +257,8 @@ def get_user_info_using_password(username, otp_seed, password):
     Raises:
         HttpError: If the user profile information cannot be fetched
     """
-    otp = generate_otp(username, otp_seed)
-
-    headers = {
-        'content-type': 'application/json',
-        'npm-otp': otp
-    }
-
-    url = 'https://registry.npmjs.org/-/npm/v1/user'
-    response = requests.get(url, headers=headers, auth=(username, password))
-    response.raise_for_status()
+    get_registry_client().request('GET', '/-/npm/v1/user', lambda: get_otp_headers(username, otp_seed),
+                                  operation='GetUser', auth=(username, password))
 
 def get_user_info_using_access_token(username, otp_seed, access_token):
     """Fetch the npm user profile information after authorization using access token and OTP
@@ -92,17 +269,12 @@ def get_user_info_using_access_token(username, otp_seed, access_token):
     Raises:
         HttpError: If the user profile information cannot be fetched
     """
-    otp = generate_otp(username, otp_seed)
+    def get_headers():
+        headers = get_otp_headers(username, otp_seed)
+        headers['Authorization'] = f'Bearer {access_token}'
+        return headers
 
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-        'content-type': 'application/json',
-        'npm-otp': otp
-    }
-
-    url = 'https://registry.npmjs.org/-/npm/v1/user'
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()
+    get_registry_client().request('GET', '/-/npm/v1/user', get_headers, operation='GetUser')
 
 def delete_access_token(username, otp_seed, password, access_token):
     """Delete given access token for a NPM user
@@ -114,16 +286,9 @@ def delete_access_token(username, otp_seed, password, access_token):
     Raises:
         HttpError: If the access token creation fails
     """
-    otp = generate_otp(username, otp_seed)
-
-    headers = {
-        'content-type': 'application/json',
-        'npm-otp': otp
-    }
-
-    url = f'https://registry.npmjs.org/-/npm/v1/tokens/token/{access_token}'
     data_dict = {'password': password}
     data = json.dumps(data_dict)
 
-    response = requests.delete(url, headers=headers, data=data, auth=(username, password))
-    response.raise_for_status()
+    get_registry_client().request('DELETE', f'/-/npm/v1/tokens/token/{access_token}',
+                                  lambda: get_otp_headers(username, otp_seed),
+                                  operation='DeleteToken', data=data, auth=(username, password))
@@ -1,3 +1,4 @@
+from bulk_access_token_rotator import BulkAccessTokenRotator
 from user_access_token_rotator import UserAccessTokenRotator
 from user_login_password_rotator import UserLoginPasswordRotator
 
@@ -43,3 +44,21 @@ def rotate_login_password(event, context):
 
     user_login_password_rotator = UserLoginPasswordRotator(arn, token, step)
     user_login_password_rotator.rotate()
+
+
+def rotate_access_keys_in_bulk(event, context):
+    """ Handler for the scheduled lambda that rotates all of the npm user's access keys in one invocation
+    Args:
+        event (dict): The scheduled event, whose contents are ignored
+        context (LambdaContext): The Lambda runtime information
+    Returns:
+        The outcome and duration of each secret's rotation
+    Raises:
+        RuntimeError: If any of the secrets could not be rotated, or its old access key could not be deleted
+    """
+    report = BulkAccessTokenRotator().rotate()
+
+    errors = [f"{outcome['secret_key']}: {outcome['error']}" for outcome in report if outcome['error']]
+    if errors:
+        raise RuntimeError(f"Bulk rotation failed for some secrets: {'; '.join(errors)}")
+    return report
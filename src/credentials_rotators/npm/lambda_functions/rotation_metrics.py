@@ -0,0 +1,194 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# The CloudWatch namespace of the rotation metrics, which the latency alarms of the stacks watch
+METRICS_NAMESPACE = 'NpmCredentialsRotation'
+# The names of the downstream services, used as the Service dimension of the call metrics
+SECRETS_MANAGER = 'SecretsManager'
+NPM_REGISTRY = 'NpmRegistry'
+# The maximum number of values of a metric in one EMF log line
+EMF_MAX_VALUES = 100
+
+
+class RotationMetrics:
+    """
+    Records the duration and outcome of the rotation steps, and the latency and retries of the
+    Secrets Manager and npm registry calls made by them, and writes them as CloudWatch Embedded
+    Metric Format (EMF) log lines, which CloudWatch extracts into metrics from the lambda's logs.
+    Every metric has the FunctionName dimension, so that the alarms of each rotator lambda only
+    watch its own metrics. The calls recorded during a step are written when it ends, as one line
+    per service and operation.
+    Attributes:
+        function_name: The name of the lambda function, from AWS_LAMBDA_FUNCTION_NAME
+        namespace: The CloudWatch namespace of the metrics
+        emit: Writes a log line, print by default, as the lambda's standard output goes to
+            CloudWatch Logs
+    """
+
+    def __init__(self, function_name=None, namespace=METRICS_NAMESPACE, emit=print):
+        self.function_name = function_name or os.getenv('AWS_LAMBDA_FUNCTION_NAME', 'local')
+        self.namespace = namespace
+        self.emit = emit
+        self.lock = threading.Lock()
+        # Maps (service, operation) to the latencies, in milliseconds, retries and failures of its
+        # calls
+        self.calls = {}
+
+    @contextmanager
+    def time_step(self, step, rotator):
+        """Times a rotation step, and writes its metrics, and those of the calls made during it,
+        when it ends
+        Args:
+            step (string): The rotation step, e.g. createSecret
+            rotator (string): The name of the rotator running the step
+        """
+        started_at = time.perf_counter()
+        failures = 0
+        try:
+            yield
+        except Exception:
+            failures = 1
+            raise
+        finally:
+            self.put_step(step, rotator, time.perf_counter() - started_at, failures)
+
+    def put_step(self, step, rotator, seconds, failures):
+        """Writes the metrics of a rotation step, and those of the calls made since the previous
+        step
+        Args:
+            step (string): The rotation step, e.g. createSecret
+            rotator (string): The name of the rotator running the step
+            seconds (float): The duration of the step
+            failures (int): The number of secrets whose rotation failed in the step
+        """
+        self.put_metrics(
+            [['FunctionName'], ['FunctionName', 'Step']],
+            {'FunctionName': self.function_name, 'Step': step},
+            [
+                ('StepDuration', 'Milliseconds', round(seconds * 1000, 3)),
+                ('StepFailures', 'Count', failures),
+            ],
+            {'Rotator': rotator, 'Outcome': 'Failure' if failures else 'Success'},
+        )
+        self.flush_calls(step)
+
+    def record_call(self, service, operation, seconds, retries=0, failed=False):
+        """Records a call to a downstream service
+        Args:
+            service (string): The service called, SECRETS_MANAGER or NPM_REGISTRY
+            operation (string): The operation called, e.g. GetSecretValue
+            seconds (float): The latency of the call, including its retries
+            retries (int): The number of times the call was retried
+            failed (bool): Whether the call failed
+        """
+        with self.lock:
+            call = self.calls.setdefault(
+                (service, operation), {'latencies': [], 'retries': 0, 'failures': 0}
+            )
+            call['latencies'].append(round(seconds * 1000, 3))
+            call['retries'] += retries
+            call['failures'] += int(failed)
+
+    def flush_calls(self, step):
+        """Writes the metrics of the calls recorded since the previous flush"""
+        with self.lock:
+            calls, self.calls = self.calls, {}
+        for (service, operation), call in sorted(calls.items()):
+            latencies = call['latencies']
+            for start in range(0, len(latencies), EMF_MAX_VALUES):
+                # The retries and failures are only counted once, on the first line of the operation
+                first_line = start == 0
+                self.put_metrics(
+                    [['FunctionName', 'Service'], ['FunctionName', 'Service', 'Operation']],
+                    {
+                        'FunctionName': self.function_name,
+                        'Service': service,
+                        'Operation': operation,
+                    },
+                    [
+                        ('CallLatency', 'Milliseconds', latencies[start : start + EMF_MAX_VALUES]),
+                        ('CallRetries', 'Count', call['retries'] if first_line else 0),
+                        ('CallFailures', 'Count', call['failures'] if first_line else 0),
+                    ],
+                    {'Step': step},
+                )
+
+    def put_metrics(self, dimension_sets, dimensions, metrics, properties):
+        """Writes one EMF log line
+        Args:
+            dimension_sets (list): The lists of dimension names the metrics are aggregated by
+            dimensions (Dictionary): The values of the dimensions
+            metrics (list): The (name, unit, value) of each metric. A value may be a list of up to
+                100 values
+            properties (Dictionary): Other values to log, which are not metrics
+        """
+        log_line = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [
+                    {
+                        'Namespace': self.namespace,
+                        'Dimensions': dimension_sets,
+                        'Metrics': [{'Name': name, 'Unit': unit} for name, unit, _ in metrics],
+                    }
+                ],
+            }
+        }
+        log_line.update(properties)
+        log_line.update(dimensions)
+        log_line.update({name: value for name, _, value in metrics})
+        self.emit(json.dumps(log_line))
+
+
+# The metrics recorder is created once per lambda container, and shared by the rotators and the
+# service clients
+rotation_metrics = None
+
+
+def get_rotation_metrics():
+    """Gets the metrics recorder shared by every invocation of the lambda container
+    Returns:
+        The RotationMetrics
+    """
+    global rotation_metrics
+    if rotation_metrics is None:
+        rotation_metrics = RotationMetrics()
+    return rotation_metrics
+
+
+def instrument_service_client(service_client, service=SECRETS_MANAGER):
+    """Records the latency, retries and outcome of every call made with a boto3 client
+    Args:
+        service_client (client): The boto3 client
+        service (string): The name of the service, used as the Service dimension of the call metrics
+    """
+    service_id = service_client.meta.service_model.service_id.hyphenize()
+
+    def before_call(context, **kwargs):
+        context['rotation_metrics_started_at'] = time.perf_counter()
+
+    def after_call(context, model, parsed, **kwargs):
+        response_metadata = parsed.get('ResponseMetadata', {})
+        get_rotation_metrics().record_call(
+            service,
+            model.name,
+            time.perf_counter() - context['rotation_metrics_started_at'],
+            retries=response_metadata.get('RetryAttempts', 0),
+            failed=response_metadata.get('HTTPStatusCode', 200) >= 400,
+        )
+
+    def after_call_error(context, event_name, **kwargs):
+        # The request failed without a response, e.g. on a connection error
+        get_rotation_metrics().record_call(
+            service,
+            event_name.split('.')[-1],
+            time.perf_counter() - context['rotation_metrics_started_at'],
+            failed=True,
+        )
+
+    service_client.meta.events.register(f'before-call.{service_id}', before_call)
+    service_client.meta.events.register(f'after-call.{service_id}', after_call)
+    service_client.meta.events.register(f'after-call-error.{service_id}', after_call_error)
@@ -3,7 +3,29 @@ import os
 
 import boto3
 
+from rotation_metrics import get_rotation_metrics, instrument_service_client
 from secrets_config_utils import get_secrets_config
+from secrets_manager_utils import invalidate_cached_secret_values
+
+# The Secrets Manager client is created once per lambda container, and reused by warm invocations
+service_client = None
+
+
+def get_service_client():
+    """Gets the Secrets Manager client shared by every invocation of the lambda container
+    Defaults to us-west-2 in case region is not specified using AWS_DEFAULT_REGION variable
+    Returns:
+        The secrets manager service client
+    """
+    global service_client
+    if service_client is None:
+        session = boto3.session.Session()
+        service_client = session.client(
+            service_name='secretsmanager',
+            region_name=os.getenv('AWS_DEFAULT_REGION', 'us-west-2')
+        )
+        instrument_service_client(service_client)
+    return service_client
 
 
 class SecretRotator:
@@ -20,14 +42,11 @@ class SecretRotator:
         self.token = token
         self.step = step
         self.secrets_config = get_secrets_config()
+        # The secret's metadata, read while checking its versions, and reused by the rotation step
+        self.metadata = None
 
-        # Create a Secrets Manager client to be used to access the secret
-        # Default to us-west-2 in case region is not specified using AWS_DEFAULT_REGION variable
-        session = boto3.session.Session()
-        self.service_client = session.client(
-            service_name='secretsmanager',
-            region_name=os.getenv('AWS_DEFAULT_REGION', 'us-west-2')
-        )
+        # The Secrets Manager client used to access the secret
+        self.service_client = get_service_client()
 
         # Re-use the logger instance when possible
         self.logger = logging.getLogger()
@@ -40,21 +59,24 @@ class SecretRotator:
             ValueError: If the secret is not properly configured for rotation
             KeyError: If the event parameters do not contain the expected keys
         """
-        self.check_secret_versions()
-
-        ## process the current rotation step
-        if self.step == "createSecret":
-            self.create_secret()
-        elif self.step == "setSecret":
-            self.set_secret()
-        elif self.step == "testSecret":
-            self.test_secret()
-        elif self.step == "finishSecret":
-            self.finish_secret()
-        else:
-            # should not be any other value unless there is an API change
-            # https://docs.aws.amazon.com/secretsmanager/latest/userguide/rotating-secrets-lambda-function-overview.html
-            raise ValueError("Invalid step parameter")
+        # The step's duration and outcome, and the calls made by it, are written as metrics when it
+        # ends
+        with get_rotation_metrics().time_step(self.step, type(self).__name__):
+            self.check_secret_versions()
+
+            ## process the current rotation step
+            if self.step == "createSecret":
+                self.create_secret()
+            elif self.step == "setSecret":
+                self.set_secret()
+            elif self.step == "testSecret":
+                self.test_secret()
+            elif self.step == "finishSecret":
+                self.finish_secret()
+            else:
+                # should not be any other value unless there is an API change
+                # https://docs.aws.amazon.com/secretsmanager/latest/userguide/rotating-secrets-lambda-function-overview.html
+                raise ValueError("Invalid step parameter")
 
     def check_secret_versions(self):
         """Make sure the version is staged correctly
@@ -62,6 +84,7 @@ class SecretRotator:
             ValueError: If the secret with the specified token is incorrectly versioned
         """
         metadata = self.service_client.describe_secret(SecretId=self.arn)
+        self.metadata = metadata
         if not metadata['RotationEnabled']:
             self.logger.error("Secret is not enabled for rotation")
             raise ValueError("Secret is not enabled for rotation")
@@ -118,8 +141,8 @@ class SecretRotator:
         Raises:
             ResourceNotFoundException: If the secret with the specified arn does not exist
         """
-        # First describe the secret to get the current version
-        metadata = self.service_client.describe_secret(SecretId=self.arn)
+        # First describe the secret to get the current version, unless it was described while checking its versions
+        metadata = self.metadata or self.service_client.describe_secret(SecretId=self.arn)
         current_version = None
         for version in metadata["VersionIdsToStages"]:
             if "AWSCURRENT" in metadata["VersionIdsToStages"][version]:
@@ -135,4 +158,6 @@ class SecretRotator:
                                                         VersionStage="AWSCURRENT",
                                                         MoveToVersionId=self.token,
                                                         RemoveFromVersionId=current_version)
+        # The cached value of the secret, if any, is no longer current
+        invalidate_cached_secret_values(self.arn)
         self.logger.info("finishSecret: Successfully set AWSCURRENT stage")
@@ -1,25 +1,132 @@
 import json
 import logging
+from types import MappingProxyType
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-def get_secrets_config():
-    """Reads the secrets_config.json into a Dictionary
+# The secrets every rotator needs, which must be present in secrets_config.json
+REQUIRED_SECRET_IDS = ['npm_login_username_secret',
+                       'npm_login_password_secret',
+                       'npm_otp_seed_secret',
+                       'npm_access_token_secrets']
+
+
+def freeze(value):
+    """Returns a read-only copy of a parsed JSON value, with its objects as mapping proxies and its lists as tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class SecretsConfigIndex:
+    """
+    The validated, read-only contents of secrets_config.json, indexed by secret id and by secret arn
+    Attributes:
+        secrets_config: The secrets_config.json file as a read-only Dictionary
+        secret_configs_by_id: The configuration of each secret or group of secrets, by its identifier in
+            secrets_config.json
+        secret_configs_by_arn: The identifier and the configuration of each secret, by its arn. The secrets of a
+            group, e.g. npm_access_token_secrets, are indexed under the identifier of the group
+    """
+
+    def __init__(self, secrets_config):
+        errors = self.validate(secrets_config)
+        if errors:
+            raise ValueError(f'Invalid secrets configuration: {"; ".join(errors)}')
+
+        self.secrets_config = freeze(secrets_config)
+        self.secret_configs_by_id = self.secrets_config
+        secret_configs_by_arn = {}
+        for secret_id, secret_config in self.secrets_config.items():
+            for member_config in secret_config.get('secrets', [secret_config]):
+                secret_configs_by_arn[member_config['arn']] = (secret_id, member_config)
+        self.secret_configs_by_arn = MappingProxyType(secret_configs_by_arn)
+
+    @staticmethod
+    def validate(secrets_config):
+        """Checks the structure of the secrets configuration
+        Args:
+            secrets_config (Dictionary): The parsed secrets_config.json
+        Returns:
+            The problems found, as a list of Strings
+        """
+        if not isinstance(secrets_config, dict):
+            return ['the configuration must be an object']
+        errors = [f'missing {secret_id}' for secret_id in REQUIRED_SECRET_IDS if secret_id not in secrets_config]
+        arns = set()
+
+        def validate_secret(path, secret_config):
+            if not isinstance(secret_config, dict):
+                errors.append(f'{path} must be an object')
+                return
+            for field in ['arn', 'secret_key']:
+                if not isinstance(secret_config.get(field), str) or not secret_config[field]:
+                    errors.append(f'{path}.{field} must be a non-empty string')
+            arn = secret_config.get('arn')
+            if isinstance(arn, str) and arn:
+                if arn in arns:
+                    errors.append(f'{path}.arn {arn} is used by another secret')
+                arns.add(arn)
+
+        for secret_id, secret_config in secrets_config.items():
+            if not isinstance(secret_config, dict):
+                errors.append(f'{secret_id} must be an object')
+                continue
+            if 'secrets' in secret_config:
+                member_configs = secret_config['secrets']
+                if not isinstance(member_configs, list) or not member_configs:
+                    errors.append(f'{secret_id}.secrets must be a non-empty list')
+                else:
+                    for i, member_config in enumerate(member_configs):
+                        validate_secret(f'{secret_id}.secrets[{i}]', member_config)
+            else:
+                validate_secret(secret_id, secret_config)
+            alarm_subscriptions = secret_config.get('alarm_subscriptions', [])
+            if not isinstance(alarm_subscriptions, list) or \
+                    not all(isinstance(email, str) for email in alarm_subscriptions):
+                errors.append(f'{secret_id}.alarm_subscriptions must be a list of emails')
+            if not isinstance(secret_config.get('bulk_rotation', False), bool):
+                errors.append(f'{secret_id}.bulk_rotation must be true or false')
+        return errors
+
+
+# The index of secrets_config.json, loaded once per process, and shared by the CDK stacks and the lambda handlers
+secrets_config_index = None
+
+def get_secrets_config_index():
+    """Reads and validates secrets_config.json into a SecretsConfigIndex
+    The file is read on the first call only, and later calls return the same index
     Returns:
-        The secrets_config.json file as a Dictionary
+        The SecretsConfigIndex
     Raises:
         IOError, FileNotFoundError: If the secrets configuration file cannot be read
+        ValueError: If the secrets configuration is not valid
     """
+    global secrets_config_index
+    if secrets_config_index is not None:
+        return secrets_config_index
     try:
         with open('secrets_config.json') as config_file:
-            config = json.load(config_file)
-            return config
+            secrets_config = json.load(config_file)
     except FileNotFoundError as e:
         # used when accessing from outside the current package
         with open('lambda_functions/secrets_config.json') as config_file:
-            config = json.load(config_file)
-            return config
+            secrets_config = json.load(config_file)
+    secrets_config_index = SecretsConfigIndex(secrets_config)
+    return secrets_config_index
+
+def get_secrets_config():
+    """Gets the contents of secrets_config.json
+    Returns:
+        The secrets_config.json file as a read-only Dictionary
+    Raises:
+        IOError, FileNotFoundError: If the secrets configuration file cannot be read
+        ValueError: If the secrets configuration is not valid
+    """
+    return get_secrets_config_index().secrets_config
 
 def get_secret_config(secret_id):
     """
@@ -27,17 +134,37 @@ def get_secret_config(secret_id):
     Args:
         secret_id (string): Identifier for the secret in secrets_config.json
     Returns:
-        The secret configuration as a Dictionary
+        The secret configuration as a read-only Dictionary
     Raises:
         KeyError: If the required secret is not present in the configuration
     """
     try:
-        secret_config = get_secrets_config()[secret_id]
-        return secret_config
+        return get_secrets_config_index().secret_configs_by_id[secret_id]
     except KeyError as e:
         logger.error(f'Invalid configuration. Could not read config for secret {secret_id}')
         raise e
 
+def get_secret_config_by_arn(arn, secret_id=None):
+    """
+    Returns the secret configuration of the secret with the given arn in secrets_config.json
+    Args:
+        arn (string): The full arn of the secret
+        secret_id (string): If given, the identifier in secrets_config.json of the secret or group of secrets the
+            secret must belong to
+    Returns:
+        The secret configuration as a read-only Dictionary
+    Raises:
+        KeyError: If no secret with the arn is present in the configuration, or under secret_id
+    """
+    try:
+        config_secret_id, secret_config = get_secrets_config_index().secret_configs_by_arn[arn]
+        if secret_id is not None and config_secret_id != secret_id:
+            raise KeyError(arn)
+        return secret_config
+    except KeyError as e:
+        logger.error(f'Invalid configuration. Could not find config for secret arn {arn}')
+        raise e
+
 def get_secret_key(secret_config):
     """Gets the key of the secret referenced using secret_config from the secrets_config.json
     Args:
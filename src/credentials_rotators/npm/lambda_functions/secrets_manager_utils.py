@@ -1,11 +1,26 @@
 import json
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from botocore.exceptions import ClientError
 
 from secrets_config_utils import get_secret_arn, get_secret_key
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# Values of the current versions of static secrets, cached across warm invocations of the lambda container
+# Maps (secret arn, secret key) to (expiry time, secret value)
+cached_secret_values = {}
+SECRET_CACHE_TTL_SECONDS = int(os.getenv('SECRET_CACHE_TTL_SECONDS', '300'))
+
+# The maximum number of secrets BatchGetSecretValue accepts in one call
+BATCH_GET_SECRET_VALUE_LIMIT = 20
+# Error codes meaning that BatchGetSecretValue cannot be used, e.g. if the lambda role lacks the permission
+BATCH_GET_SECRET_VALUE_UNAVAILABLE_ERRORS = ['AccessDeniedException', 'UnknownOperationException']
+
 def get_secret_dict(service_client, secret_config, stage='AWSCURRENT', token=None):
     """Gets the secret JSON from secrets manager corresponding to the secret stage, and token
     Args:
@@ -52,3 +67,129 @@ def get_secret_value(service_client, secret_config, stage='AWSCURRENT', token=No
     except KeyError as e:
         logger.error('Could not find the secret_key in secret')
         raise e
+
+def get_secret_values(service_client, secret_configs):
+    """Gets the current values of several secrets, referenced by secret_configs, with as few sequential calls as possible
+    The secrets are fetched with BatchGetSecretValue. If it is not available, e.g. with an older boto3 or if the lambda
+    role is not allowed to call it, they are fetched concurrently with GetSecretValue instead
+    Args:
+        service_client (client): The secrets manager service client
+        secret_configs (list): The configurations for the secrets specified in secrets_config.json
+    Returns:
+        The Values of the secrets, in the order of secret_configs
+    Raises:
+        KeyError: If the secret_key is not present in a secret
+        ResourceNotFoundException: If one of the secrets does not exist
+        ValueError: If a secret is not valid JSON, or could not be fetched
+    """
+    secret_arns = list(dict.fromkeys(get_secret_arn(secret_config) for secret_config in secret_configs))
+    if len(secret_arns) > 1 and hasattr(service_client, 'batch_get_secret_value'):
+        try:
+            secret_dicts = batch_get_secret_dicts(service_client, secret_arns)
+        except ClientError as e:
+            if e.response['Error']['Code'] not in BATCH_GET_SECRET_VALUE_UNAVAILABLE_ERRORS:
+                raise e
+            logger.warning('BatchGetSecretValue is not available, fetching the secrets concurrently instead')
+            secret_dicts = None
+    else:
+        secret_dicts = None
+
+    if secret_dicts is None:
+        with ThreadPoolExecutor(max_workers=len(secret_arns)) as executor:
+            fetched_dicts = executor.map(lambda secret_arn: get_secret_dict(service_client, {'arn': secret_arn}),
+                                         secret_arns)
+            secret_dicts = dict(zip(secret_arns, fetched_dicts))
+
+    try:
+        return [secret_dicts[get_secret_arn(secret_config)][get_secret_key(secret_config)]
+                for secret_config in secret_configs]
+    except KeyError as e:
+        logger.error('Could not find the secret_key in secret')
+        raise e
+
+def batch_get_secret_dicts(service_client, secret_arns):
+    """Gets the current versions of several secrets with BatchGetSecretValue, parsed as JSON
+    Args:
+        service_client (client): The secrets manager service client
+        secret_arns (list): The full arns of the secrets
+    Returns:
+        The secrets as dictionaries, by arn
+    Raises:
+        ValueError: If a secret is not valid JSON, or could not be fetched
+    """
+    secret_dicts = {}
+    for start in range(0, len(secret_arns), BATCH_GET_SECRET_VALUE_LIMIT):
+        response = service_client.batch_get_secret_value(
+            SecretIdList=secret_arns[start:start + BATCH_GET_SECRET_VALUE_LIMIT])
+        if response.get('Errors'):
+            error_messages = [f"{error['SecretId']}: {error['ErrorCode']}" for error in response['Errors']]
+            logger.error(f"Could not fetch secrets: {', '.join(error_messages)}")
+            raise ValueError(f"Could not fetch secrets: {', '.join(error_messages)}")
+        for secret in response['SecretValues']:
+            # The secrets may be configured by their full arn or their name
+            secret_dict = json.loads(secret['SecretString'])
+            secret_dicts[secret['ARN']] = secret_dict
+            secret_dicts[secret['Name']] = secret_dict
+    return secret_dicts
+
+def get_cached_secret_values(service_client, secret_configs, ttl_seconds=None, uncached_configs=()):
+    """Gets the current values of the secrets referenced by secret_configs, reusing the values fetched by an earlier
+    call for up to ttl_seconds. The secrets that are not cached are fetched together, with get_secret_values.
+    Only meant for the secrets used for authentication, which are not rotated by the caller. A secret
+    that another lambda rotates, e.g. the npm login password, must be passed in uncached_configs as
+    well, so that its new value is used as soon as it is current, instead of a stale one
+    Args:
+        service_client (client): The secrets manager service client
+        secret_configs (list): The configurations for the secrets specified in secrets_config.json
+        ttl_seconds (int): How long a fetched value is reused, SECRET_CACHE_TTL_SECONDS by default
+        uncached_configs (list): The configurations, among secret_configs, of the secrets fetched on
+            every call, together with the expired ones, and never cached
+    Returns:
+        The Values of the secrets, in the order of secret_configs
+    Raises:
+        KeyError: If the secret_key is not present in a secret
+        ResourceNotFoundException: If one of the secrets does not exist
+        ValueError: If a secret is not valid JSON, or could not be fetched
+    """
+    ttl_seconds = SECRET_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+    cache_keys = [(get_secret_arn(secret_config), get_secret_key(secret_config)) for secret_config in secret_configs]
+    uncached_keys = {(get_secret_arn(secret_config), get_secret_key(secret_config))
+                     for secret_config in uncached_configs}
+    now = time.monotonic()
+    missing_configs = [secret_config for secret_config, cache_key in zip(secret_configs, cache_keys)
+                       if cache_key in uncached_keys or cache_key not in cached_secret_values
+                       or cached_secret_values[cache_key][0] <= now]
+
+    fetched_values = {}
+    if missing_configs:
+        expiry = time.monotonic() + ttl_seconds
+        for secret_config, secret_value in zip(missing_configs,
+                                               get_secret_values(service_client, missing_configs)):
+            cache_key = (get_secret_arn(secret_config), get_secret_key(secret_config))
+            fetched_values[cache_key] = secret_value
+            if cache_key not in uncached_keys:
+                cached_secret_values[cache_key] = (expiry, secret_value)
+
+    return [fetched_values[cache_key] if cache_key in fetched_values
+            else cached_secret_values[cache_key][1]
+            for cache_key in cache_keys]
+
+def get_cached_secret_value(service_client, secret_config, ttl_seconds=None):
+    """Gets the current value of the secret referenced by secret_config, reusing the value fetched by an earlier call
+    for up to ttl_seconds. See get_cached_secret_values
+    Args:
+        service_client (client): The secrets manager service client
+        secret_config (Dictionary): The configuration for the secret specified in secrets_config.json
+        ttl_seconds (int): How long a fetched value is reused, SECRET_CACHE_TTL_SECONDS by default
+    Returns:
+        The Value of the secret
+    """
+    return get_cached_secret_values(service_client, [secret_config], ttl_seconds)[0]
+
+def invalidate_cached_secret_values(secret_arn):
+    """Removes the cached values of the secret, e.g. after its current version changed
+    Args:
+        secret_arn (string): The arn of the secret
+    """
+    for cache_key in [cache_key for cache_key in cached_secret_values if cache_key[0] == secret_arn]:
+        del cached_secret_values[cache_key]
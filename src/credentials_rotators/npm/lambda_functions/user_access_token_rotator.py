@@ -2,7 +2,7 @@ import json
 
 from npm_credentials_rotator import NPMCredentialsRotator
 from npm_utils import (create_access_token, delete_access_token, get_user_info_using_access_token)
-from secrets_config_utils import (get_access_token_secrets_configs, get_secret_key)
+from secrets_config_utils import get_secret_config_by_arn, get_secret_key
 from secrets_manager_utils import get_secret_value
 
 
@@ -71,7 +71,8 @@ class UserAccessTokenRotator(NPMCredentialsRotator):
             ResourceNotFoundException: If the secret with the specified arn does not exist
             HttpError: If the old access token deletion fails
         """
-        access_token = get_secret_value(self.service_client, self.secret_config)
+        # The current access token was fetched with the secrets used for authentication
+        access_token = self.step_secret_values[0]
 
         super(UserAccessTokenRotator, self).finish_secret()
 
@@ -79,24 +80,23 @@ class UserAccessTokenRotator(NPMCredentialsRotator):
         delete_access_token(self.login_username, self.otp_seed, self.login_password, access_token)
         self.logger.info('finishSecret: Successfully finalized secret rotation')
 
+    def get_step_secret_configs(self):
+        """
+        The finishSecret step deletes the current access token, before its pending version becomes current
+        """
+        if self.step == 'finishSecret':
+            return [self.get_access_token_secret_config()]
+        return []
+
     def get_access_token_secret_config(self):
         """
         Match the arn with the specified access token secrets in secrets_config.json
         Returns the secret configuration dictionary if found
-        Args:
-            arn (string): The unique arn of the secret
         Raises:
             KeyError: If the arn cannot be found in the configuration
         """
         try:
-            access_token_secrets_configs = get_access_token_secrets_configs('npm_access_token_secrets')
-            for secret_config in access_token_secrets_configs:
-                if secret_config['arn'] == self.arn:
-                    return secret_config
-                else:
-                    raise KeyError(
-                        'The secret arn cannot be found in the list of access token secrets from config'
-                    )
+            return get_secret_config_by_arn(self.arn, 'npm_access_token_secrets')
         except KeyError as e:
             self.logger.error(
                 'The secret arn could not be matched with any known access token secrets from config')
@@ -25,7 +25,10 @@ setuptools.setup(
         "aws_cdk.aws_iam",
         "aws_cdk.aws_sns",
         "aws_cdk.aws_sns_subscriptions",
+        "aws_cdk.aws_cloudwatch",
         "aws_cdk.aws_cloudwatch_actions",
+        "aws_cdk.aws_events",
+        "aws_cdk.aws_events_targets",
         "boto3"
     ],
 
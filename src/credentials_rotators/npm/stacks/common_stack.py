@@ -1,6 +1,7 @@
 import subprocess
 
 from aws_cdk import core
+from aws_cdk.aws_cloudwatch import Metric, TreatMissingData
 from aws_cdk.aws_cloudwatch_actions import SnsAction
 from aws_cdk.aws_iam import Effect, PolicyStatement, ServicePrincipal
 from aws_cdk.aws_lambda import Code, LayerVersion
@@ -8,6 +9,7 @@ from aws_cdk.aws_secretsmanager import Secret
 from aws_cdk.aws_sns import Topic
 from aws_cdk.aws_sns_subscriptions import EmailSubscription
 
+from lambda_functions.rotation_metrics import METRICS_NAMESPACE, NPM_REGISTRY
 from lambda_functions.secrets_config_utils import (get_alarm_subscriptions,
                                                    get_secret_arn,
                                                    get_secret_key,
@@ -18,6 +20,12 @@ class CommonStack(core.Stack):
     Holds the resources and methods common to all rotator stacks
     """
 
+    # The timeout of the lambdas that rotate a single secret. Each rotation step sends at most one request to
+    # the npm registry which, with the default registry settings, may take up to 4 attempts of 5 + 15 seconds,
+    # each after waiting up to 1 second for a fresh OTP, and 3 backoff delays of up to 8 seconds, i.e. 108
+    # seconds. The rest of the step calls Secrets Manager
+    ROTATION_STEP_TIMEOUT = core.Duration.minutes(3)
+
     def __init__(self, scope: core.Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         self.dependencies_lambda_layer = self.create_dependencies_layer()
@@ -89,6 +97,13 @@ class CommonStack(core.Stack):
                                                               actions=["secretsmanager:GetSecretValue"]
                                                               )
                                               )
+        # The static secrets are fetched together. BatchGetSecretValue does not support resource-level permissions,
+        # and it still requires GetSecretValue access to every secret it fetches
+        rotator_lambda.add_to_role_policy(PolicyStatement(effect=Effect.ALLOW,
+                                                          resources=['*'],
+                                                          actions=["secretsmanager:BatchGetSecretValue"]
+                                                          )
+                                          )
 
     def configure_secret_rotation(self, rotator_lambda, secret_config, duration):
         """
@@ -107,14 +122,25 @@ class CommonStack(core.Stack):
                                      automatically_after=duration,
                                      rotation_lambda=rotator_lambda)
 
-    def enable_cloudwatch_alarm_notifications(self, rotator_lambda, secret_id):
+    def enable_cloudwatch_alarm_notifications(self,
+                                              rotator_lambda,
+                                              secret_id,
+                                              rotator_timeout,
+                                              registry_latency_threshold=core.Duration.seconds(1)):
         """
-        Adds a cloudwatch alarm to monitor the error metrics.
+        Adds cloudwatch alarms to monitor the error metrics, and the latency metrics written by the
+        rotator lambda.
         Subscribes the given emails to receive email alerts.
         Args:
             rotator_lambda (Function): The lambda function used for rotating a secret
             secret_id (string): The identifier corresponding to the secret in the secrets_config.json file
+            rotator_timeout (Duration): The timeout of rotator_lambda. A rotation step that takes longer than
+                two thirds of it is close to timing out. The timeout is sized for the registry retries and the
+                OTP waits of a step, so a healthy step, even one that waited for a fresh OTP, stays well below
+            registry_latency_threshold (Duration): The p90 latency of the npm registry calls,
+                retries included, above which they are considered slow
         """
+        step_latency_threshold = core.Duration.seconds(rotator_timeout.to_seconds() * 2 / 3)
         # create an sns topic for the rotator lambda monitoring
         alarm_sns_topic_id = f'{secret_id}_alarm_sns_topic'
         alarm_sns_topic = Topic(self,
@@ -133,3 +159,32 @@ class CommonStack(core.Stack):
                                                                    threshold=1,
                                                                    evaluation_periods=1)
         errors_alarm.add_alarm_action(SnsAction(alarm_sns_topic))
+
+        # add latency alarms on the rotation metrics written by the rotator lambda
+        # rotations are infrequent, so periods without rotations are not breaching
+        step_duration_metric = Metric(namespace=METRICS_NAMESPACE,
+                                      metric_name='StepDuration',
+                                      dimensions={'FunctionName': rotator_lambda.function_name},
+                                      statistic='Maximum',
+                                      period=core.Duration.minutes(5))
+        step_latency_alarm = step_duration_metric.create_alarm(
+            self,
+            f'{secret_id}_step_latency_alarm',
+            threshold=step_latency_threshold.to_milliseconds(),
+            evaluation_periods=1,
+            treat_missing_data=TreatMissingData.NOT_BREACHING)
+        step_latency_alarm.add_alarm_action(SnsAction(alarm_sns_topic))
+
+        registry_latency_metric = Metric(namespace=METRICS_NAMESPACE,
+                                         metric_name='CallLatency',
+                                         dimensions={'FunctionName': rotator_lambda.function_name,
+                                                     'Service': NPM_REGISTRY},
+                                         statistic='p90',
+                                         period=core.Duration.minutes(5))
+        registry_latency_alarm = registry_latency_metric.create_alarm(
+            self,
+            f'{secret_id}_registry_latency_alarm',
+            threshold=registry_latency_threshold.to_milliseconds(),
+            evaluation_periods=1,
+            treat_missing_data=TreatMissingData.NOT_BREACHING)
+        registry_latency_alarm.add_alarm_action(SnsAction(alarm_sns_topic))
@@ -1,4 +1,6 @@
 from aws_cdk import core
+from aws_cdk.aws_events import Rule, Schedule
+from aws_cdk.aws_events_targets import LambdaFunction
 from aws_cdk.aws_lambda import *
 
 from lambda_functions.secrets_config_utils import (
@@ -12,17 +14,35 @@ class UserAccessTokensRotatorStack(CommonStack):
     def __init__(self, scope: core.Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         secret_configs = get_access_token_secrets_configs('npm_access_token_secrets')
+        bulk_rotation = get_secret_config('npm_access_token_secrets').get('bulk_rotation', False)
 
-        rotator_lambda = Function(
-            self,
-            'npm_access_key_rotator',
-            runtime=Runtime.PYTHON_3_8,
-            code=Code.asset('lambda_functions'),
-            handler='rotation_handlers.rotate_access_keys',
-            layers=[
-                self.dependencies_lambda_layer
-            ]
-        )
+        if bulk_rotation:
+            # A single scheduled invocation rotates every access token secret
+            rotator_timeout = core.Duration.minutes(5)
+            rotator_lambda = Function(
+                self,
+                'npm_access_key_bulk_rotator',
+                runtime=Runtime.PYTHON_3_8,
+                code=Code.asset('lambda_functions'),
+                handler='rotation_handlers.rotate_access_keys_in_bulk',
+                timeout=rotator_timeout,
+                layers=[
+                    self.dependencies_lambda_layer
+                ]
+            )
+        else:
+            rotator_timeout = self.ROTATION_STEP_TIMEOUT
+            rotator_lambda = Function(
+                self,
+                'npm_access_key_rotator',
+                runtime=Runtime.PYTHON_3_8,
+                code=Code.asset('lambda_functions'),
+                handler='rotation_handlers.rotate_access_keys',
+                timeout=rotator_timeout,
+                layers=[
+                    self.dependencies_lambda_layer
+                ]
+            )
 
         # user credentials used for authentication
         required_secret_ids = ['npm_login_username_secret',
@@ -31,11 +51,19 @@ class UserAccessTokensRotatorStack(CommonStack):
         required_secret_configs = [get_secret_config(secret_id) for secret_id in required_secret_ids]
 
         # Add required permissions
-        self.grant_secrets_manager_access_to_lambda(rotator_lambda)
         self.grant_lambda_access_to_secrets(rotator_lambda, required_secret_configs)
         for secret_config in secret_configs:
             self.grant_lambda_access_to_rotate_secret(rotator_lambda, secret_config)
-            self.configure_secret_rotation(rotator_lambda, secret_config, core.Duration.days(5))
+
+        if bulk_rotation:
+            Rule(self,
+                 'npm_access_key_bulk_rotation_schedule',
+                 schedule=Schedule.rate(core.Duration.days(5)),
+                 targets=[LambdaFunction(rotator_lambda)])
+        else:
+            self.grant_secrets_manager_access_to_lambda(rotator_lambda)
+            for secret_config in secret_configs:
+                self.configure_secret_rotation(rotator_lambda, secret_config, core.Duration.days(5))
 
         # add cloudwatch alarm email notifications
-        self.enable_cloudwatch_alarm_notifications(rotator_lambda, 'npm_access_token_secrets')
+        self.enable_cloudwatch_alarm_notifications(rotator_lambda, 'npm_access_token_secrets', rotator_timeout)
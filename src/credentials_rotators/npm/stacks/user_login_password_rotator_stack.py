@@ -19,6 +19,7 @@ class UserLoginPasswordRotatorStack(CommonStack):
             runtime=Runtime.PYTHON_3_8,
             code=Code.asset('lambda_functions'),
             handler='rotation_handlers.rotate_login_password',
+            timeout=self.ROTATION_STEP_TIMEOUT,
             layers=[
                 self.dependencies_lambda_layer
             ]
@@ -35,4 +36,4 @@ class UserLoginPasswordRotatorStack(CommonStack):
         self.configure_secret_rotation(rotator_lambda, secret_config, core.Duration.days(7))
 
         # add cloudwatch alarm email notifications
-        self.enable_cloudwatch_alarm_notifications(rotator_lambda, secret_id)
+        self.enable_cloudwatch_alarm_notifications(rotator_lambda, secret_id, self.ROTATION_STEP_TIMEOUT)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pathlib
+import sys
+import unittest
+from unittest.mock import patch
+
+import boto3
+from moto import mock_aws
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + '/../lambda_functions')
+import bulk_access_token_rotator
+import secret_rotator
+import secrets_config_utils
+import secrets_manager_utils
+from bulk_access_token_rotator import BulkAccessTokenRotator
+from rotation_handlers import rotate_access_keys_in_bulk
+
+STATIC_SECRETS = {
+    'npm_login_username_secret': ('npm_login_username', 'user'),
+    'npm_login_password_secret': ('npm_login_password', 'password'),
+    'npm_otp_seed_secret': ('npm_otp_seed', 'JBSWY3DPEHPK3PXP'),
+}
+ACCESS_TOKEN_SECRET_KEYS = ['npm_access_token_codegen', 'npm_access_token_js',
+                            'npm_access_token_cli']
+
+
+class FakeRegistry:
+    """
+    Issues numbered access tokens, and rejects the tokens listed in invalid_tokens.
+    """
+
+    def __init__(self):
+        self.issued = 0
+        self.invalid_tokens = set()
+        self.deleted_tokens = []
+
+    def create_access_token(self, username, otp_seed, password):
+        self.issued += 1
+        return f'token-{self.issued}'
+
+    def get_user_info_using_access_token(self, username, otp_seed, access_token):
+        if access_token in self.invalid_tokens:
+            raise ValueError('Unauthorized')
+
+    def delete_access_token(self, username, otp_seed, password, access_token):
+        self.deleted_tokens.append(access_token)
+
+
+class TestBulkAccessTokenRotator(unittest.TestCase):
+    def setUp(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        environment = patch.dict(os.environ, {'AWS_ACCESS_KEY_ID': 'testing',
+                                              'AWS_SECRET_ACCESS_KEY': 'testing',
+                                              'AWS_DEFAULT_REGION': 'us-west-2'})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+        self.service_client = boto3.client('secretsmanager')
+        config = {}
+        for secret_id, (secret_key, value) in STATIC_SECRETS.items():
+            arn = self.service_client.create_secret(
+                Name=secret_id, SecretString=json.dumps({secret_key: value}))['ARN']
+            config[secret_id] = {'arn': arn, 'secret_key': secret_key}
+        config['npm_access_token_secrets'] = {'secrets': [], 'bulk_rotation': True}
+        for secret_key in ACCESS_TOKEN_SECRET_KEYS:
+            arn = self.service_client.create_secret(
+                Name=secret_key, SecretString=json.dumps({secret_key: f'{secret_key}-old'}))['ARN']
+            config['npm_access_token_secrets']['secrets'].append({'arn': arn,
+                                                                  'secret_key': secret_key})
+
+        for patcher in [patch.object(secret_rotator, 'service_client', self.service_client),
+                        patch.object(secrets_config_utils, 'secrets_config_index',
+                                     secrets_config_utils.SecretsConfigIndex(config))]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        secrets_manager_utils.cached_secret_values.clear()
+
+        self.registry = FakeRegistry()
+        for function in ['create_access_token', 'get_user_info_using_access_token',
+                         'delete_access_token']:
+            patcher = patch.object(bulk_access_token_rotator, function,
+                                   getattr(self.registry, function))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_current_value(self, secret_key):
+        secret_string = self.service_client.get_secret_value(
+            SecretId=secret_key, VersionStage='AWSCURRENT')['SecretString']
+        return json.loads(secret_string)[secret_key]
+
+    def test_rotates_every_secret(self):
+        report = BulkAccessTokenRotator().rotate()
+
+        self.assertEqual(['rotated'] * 3, [outcome['outcome'] for outcome in report])
+        for secret_key in ACCESS_TOKEN_SECRET_KEYS:
+            metadata = self.service_client.describe_secret(SecretId=secret_key)
+            self.assertEqual([['AWSCURRENT']],
+                             [stages for stages in metadata['VersionIdsToStages'].values()
+                              if 'AWSPREVIOUS' not in stages])
+        new_tokens = {self.get_current_value(secret_key) for secret_key in ACCESS_TOKEN_SECRET_KEYS}
+        self.assertEqual({'token-1', 'token-2', 'token-3'}, new_tokens)
+        self.assertCountEqual([f'{secret_key}-old' for secret_key in ACCESS_TOKEN_SECRET_KEYS],
+                              self.registry.deleted_tokens)
+
+    def test_isolates_a_failing_secret(self):
+        self.registry.invalid_tokens.add('token-2')
+        with patch.object(bulk_access_token_rotator, 'REGISTRY_CONCURRENCY', 1):
+            report = {outcome['secret_key']: outcome
+                      for outcome in BulkAccessTokenRotator().rotate()}
+
+        self.assertEqual('failed', report['npm_access_token_js']['outcome'])
+        self.assertEqual('testSecret', report['npm_access_token_js']['step'])
+        self.assertEqual('npm_access_token_js-old', self.get_current_value('npm_access_token_js'))
+        metadata = self.service_client.describe_secret(SecretId='npm_access_token_js')
+        self.assertFalse(any('AWSPENDING' in stages
+                             for stages in metadata['VersionIdsToStages'].values()))
+        self.assertIn('token-2', self.registry.deleted_tokens)
+        self.assertNotIn('npm_access_token_js-old', self.registry.deleted_tokens)
+
+        self.assertEqual('rotated', report['npm_access_token_codegen']['outcome'])
+        self.assertEqual('token-1', self.get_current_value('npm_access_token_codegen'))
+        self.assertEqual('token-3', self.get_current_value('npm_access_token_cli'))
+
+    def test_secret_is_rotated_when_its_pending_label_is_not_removed(self):
+        update_secret_version_stage = self.service_client.update_secret_version_stage
+
+        def fail_to_unstage_js(**kwargs):
+            if kwargs['SecretId'].split(':')[-1].startswith('npm_access_token_js') \
+                    and kwargs['VersionStage'] == 'AWSPENDING':
+                raise ValueError('Service unavailable')
+            return update_secret_version_stage(**kwargs)
+
+        with patch.object(self.service_client, 'update_secret_version_stage', fail_to_unstage_js):
+            report = {outcome['secret_key']: outcome
+                      for outcome in BulkAccessTokenRotator().rotate()}
+
+        outcome = report['npm_access_token_js']
+        self.assertEqual('rotated', outcome['outcome'])
+        self.assertIn('Pending label not removed', outcome['error'])
+        new_token = self.get_current_value('npm_access_token_js')
+        self.assertNotIn(new_token, self.registry.deleted_tokens)
+        self.assertIn('npm_access_token_js-old', self.registry.deleted_tokens)
+
+    def test_failure_to_make_new_version_current_is_undone(self):
+        update_secret_version_stage = self.service_client.update_secret_version_stage
+
+        def fail_to_finish_js(**kwargs):
+            if kwargs['SecretId'].split(':')[-1].startswith('npm_access_token_js') \
+                    and kwargs['VersionStage'] == 'AWSCURRENT':
+                raise ValueError('Service unavailable')
+            return update_secret_version_stage(**kwargs)
+
+        with patch.object(self.service_client, 'update_secret_version_stage', fail_to_finish_js):
+            report = {outcome['secret_key']: outcome
+                      for outcome in BulkAccessTokenRotator().rotate()}
+
+        outcome = report['npm_access_token_js']
+        self.assertEqual('failed', outcome['outcome'])
+        self.assertEqual('finishSecret', outcome['step'])
+        self.assertEqual('npm_access_token_js-old', self.get_current_value('npm_access_token_js'))
+        metadata = self.service_client.describe_secret(SecretId='npm_access_token_js')
+        self.assertFalse(any('AWSPENDING' in stages
+                             for stages in metadata['VersionIdsToStages'].values()))
+        self.assertNotIn('npm_access_token_js-old', self.registry.deleted_tokens)
+        # The old tokens of the two rotated secrets, and the new token of the failed one
+        self.assertEqual(3, len(self.registry.deleted_tokens))
+        self.assertEqual('rotated', report['npm_access_token_cli']['outcome'])
+
+    def test_handler_fails_when_a_secret_is_not_rotated(self):
+        self.registry.invalid_tokens.add('token-1')
+
+        with self.assertRaises(RuntimeError):
+            rotate_access_keys_in_bulk({}, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+
+import json
+import pathlib
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pyotp
+import requests
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + '/../lambda_functions')
+import npm_utils
+import rotation_metrics
+from npm_utils import NpmRegistryClient, OtpGenerator
+from rotation_metrics import NPM_REGISTRY, RotationMetrics
+
+OTP_SEED = 'JBSWY3DPEHPK3PXP'
+
+
+class StubRegistryHandler(BaseHTTPRequestHandler):
+    """
+    Answers every request with the next status code queued on the server, or 200, and a token.
+    """
+
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path, self.headers.get('npm-otp')))
+            status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = json.dumps({'token': 'new-token'}).encode()
+        self.send_response(status)
+        if status == 429:
+            self.send_header('Retry-After', '0')
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = respond
+    do_POST = respond
+    do_DELETE = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestNpmRegistryClient(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubRegistryHandler)
+        self.server.lock = threading.Lock()
+        self.server.connections = 0
+        self.server.requests = []
+        self.server.statuses = []
+        thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.delays = []
+        self.client = NpmRegistryClient(base_url=f'http://127.0.0.1:{self.server.server_port}',
+                                        sleep=self.delays.append)
+        self.metrics = RotationMetrics(emit=lambda log_line: None)
+        for patcher in [patch.object(npm_utils, 'registry_client', self.client),
+                        patch.object(rotation_metrics, 'rotation_metrics', self.metrics)]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_reuses_one_connection(self):
+        token = npm_utils.create_access_token('user', OTP_SEED, 'password')
+        npm_utils.get_user_info_using_access_token('user', OTP_SEED, token)
+        npm_utils.get_user_info_using_password('user', OTP_SEED, 'password')
+        npm_utils.delete_access_token('user', OTP_SEED, 'password', 'old-token')
+
+        self.assertEqual('new-token', token)
+        self.assertEqual(4, len(self.server.requests))
+        self.assertEqual(1, self.server.connections)
+
+    def test_retries_rate_limited_requests(self):
+        self.server.statuses = [429, 429]
+
+        npm_utils.create_access_token('user', OTP_SEED, 'password')
+
+        self.assertEqual(3, len(self.server.requests))
+        self.assertEqual([0.0, 0.0], self.delays)
+        self.assertTrue(all(otp for _, _, otp in self.server.requests))
+        self.assertEqual(2, self.metrics.calls[(NPM_REGISTRY, 'CreateToken')]['retries'])
+
+    def test_retries_idempotent_requests_on_server_errors(self):
+        self.server.statuses = [503]
+
+        npm_utils.get_user_info_using_password('user', OTP_SEED, 'password')
+
+        self.assertEqual(2, len(self.server.requests))
+        self.assertEqual(1, len(self.delays))
+        self.assertLessEqual(self.delays[0], self.client.backoff_base)
+
+    def test_does_not_retry_posts_on_server_errors(self):
+        self.server.statuses = [500]
+
+        with self.assertRaises(requests.HTTPError):
+            npm_utils.create_access_token('user', OTP_SEED, 'password')
+
+        self.assertEqual(1, len(self.server.requests))
+        self.assertEqual(1, self.metrics.calls[(NPM_REGISTRY, 'CreateToken')]['failures'])
+
+    def test_gives_up_after_max_retries(self):
+        self.server.statuses = [503] * 10
+
+        with self.assertRaises(requests.HTTPError):
+            npm_utils.get_user_info_using_password('user', OTP_SEED, 'password')
+
+        self.assertEqual(self.client.max_retries + 1, len(self.server.requests))
+
+    def test_backoff_is_bounded(self):
+        client = NpmRegistryClient(backoff_base=1.0, backoff_max=4.0)
+        response = requests.Response()
+
+        delays = [client.get_retry_delay(attempt, response) for attempt in range(1, 10)]
+
+        self.assertTrue(all(0 <= delay <= 4.0 for delay in delays))
+
+
+class FakeClock:
+    """
+    A clock that only moves when it is slept on, or advanced.
+    """
+
+    def __init__(self, now):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestOtpGenerator(unittest.TestCase):
+    def setUp(self):
+        # 10 seconds into a 30 second window
+        self.clock = FakeClock(1_000_000_030.0)
+        self.generator = OtpGenerator('user', OTP_SEED, min_remaining=2, clock=self.clock.time,
+                                      sleep=self.clock.sleep)
+        self.totp = pyotp.TOTP(OTP_SEED)
+
+    def test_reuses_the_otp_within_a_window(self):
+        with patch.object(self.generator.totp, 'at', wraps=self.generator.totp.at) as at:
+            first_otp = self.generator.now()
+            self.clock.now += 15
+            second_otp = self.generator.now()
+
+        self.assertEqual(self.totp.at(1_000_000_030), first_otp)
+        self.assertEqual(first_otp, second_otp)
+        self.assertEqual(1, at.call_count)
+        self.assertEqual([], self.clock.sleeps)
+
+    def test_generates_a_new_otp_in_the_next_window(self):
+        first_otp = self.generator.now()
+        self.clock.now += 30
+
+        self.assertEqual(self.totp.at(1_000_000_060), self.generator.now())
+        self.assertNotEqual(first_otp, self.generator.now())
+
+    def test_waits_for_the_next_window_when_the_otp_is_about_to_expire(self):
+        self.clock.now += 19
+
+        otp = self.generator.now()
+
+        self.assertEqual([1.0], self.clock.sleeps)
+        self.assertEqual(self.totp.at(1_000_000_050), otp)
+
+    def test_shares_the_generator_of_a_user(self):
+        with patch.dict(npm_utils.otp_generators, clear=True), \
+                patch.object(npm_utils.pyotp, 'parse_uri', wraps=pyotp.parse_uri) as parse_uri:
+            npm_utils.generate_otp('user', OTP_SEED)
+            npm_utils.generate_otp('user', OTP_SEED)
+
+        self.assertEqual(1, parse_uri.call_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
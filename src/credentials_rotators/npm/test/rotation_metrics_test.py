@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pathlib
+import sys
+import unittest
+from unittest.mock import patch
+
+import boto3
+from moto import mock_aws
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + '/../lambda_functions')
+import rotation_metrics
+from rotation_metrics import (
+    NPM_REGISTRY,
+    SECRETS_MANAGER,
+    RotationMetrics,
+    instrument_service_client,
+)
+
+
+class TestRotationMetrics(unittest.TestCase):
+    def setUp(self):
+        self.log_lines = []
+        self.metrics = RotationMetrics(function_name='rotator', emit=self.log_lines.append)
+        patcher = patch.object(rotation_metrics, 'rotation_metrics', self.metrics)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_log_lines(self):
+        return [json.loads(log_line) for log_line in self.log_lines]
+
+    def test_writes_step_metrics_in_emf(self):
+        with self.metrics.time_step('createSecret', 'UserAccessTokenRotator'):
+            pass
+
+        (log_line,) = self.get_log_lines()
+        (metrics_directive,) = log_line['_aws']['CloudWatchMetrics']
+        self.assertEqual('NpmCredentialsRotation', metrics_directive['Namespace'])
+        self.assertEqual(
+            [['FunctionName'], ['FunctionName', 'Step']], metrics_directive['Dimensions']
+        )
+        self.assertEqual(
+            ['StepDuration', 'StepFailures'],
+            [metric['Name'] for metric in metrics_directive['Metrics']],
+        )
+        self.assertEqual('rotator', log_line['FunctionName'])
+        self.assertEqual('createSecret', log_line['Step'])
+        self.assertEqual('Success', log_line['Outcome'])
+        self.assertEqual(0, log_line['StepFailures'])
+        self.assertGreaterEqual(log_line['StepDuration'], 0)
+
+    def test_records_failed_steps(self):
+        with self.assertRaises(ValueError):
+            with self.metrics.time_step('testSecret', 'UserAccessTokenRotator'):
+                raise ValueError('Unauthorized')
+
+        (log_line,) = self.get_log_lines()
+        self.assertEqual('Failure', log_line['Outcome'])
+        self.assertEqual(1, log_line['StepFailures'])
+
+    def test_writes_the_calls_of_a_step(self):
+        with self.metrics.time_step('createSecret', 'UserAccessTokenRotator'):
+            self.metrics.record_call(NPM_REGISTRY, 'CreateToken', 0.2, retries=2)
+            self.metrics.record_call(NPM_REGISTRY, 'CreateToken', 0.1, failed=True)
+
+        step_line, call_line = self.get_log_lines()
+        self.assertEqual(NPM_REGISTRY, call_line['Service'])
+        self.assertEqual('CreateToken', call_line['Operation'])
+        self.assertEqual('createSecret', call_line['Step'])
+        self.assertEqual([200.0, 100.0], call_line['CallLatency'])
+        self.assertEqual(2, call_line['CallRetries'])
+        self.assertEqual(1, call_line['CallFailures'])
+
+        # The calls are only written with the step they were made in
+        with self.metrics.time_step('setSecret', 'UserAccessTokenRotator'):
+            pass
+        self.assertEqual(3, len(self.log_lines))
+
+    def test_splits_calls_over_emf_value_limit(self):
+        for _ in range(150):
+            self.metrics.record_call(NPM_REGISTRY, 'GetUser', 0.1, retries=1)
+        self.metrics.flush_calls('testSecret')
+
+        first_line, second_line = self.get_log_lines()
+        self.assertEqual(
+            [100, 50], [len(first_line['CallLatency']), len(second_line['CallLatency'])]
+        )
+        self.assertEqual([150, 0], [first_line['CallRetries'], second_line['CallRetries']])
+
+    @mock_aws
+    def test_instruments_service_clients(self):
+        with patch.dict(
+            os.environ,
+            {
+                'AWS_ACCESS_KEY_ID': 'testing',
+                'AWS_SECRET_ACCESS_KEY': 'testing',
+                'AWS_DEFAULT_REGION': 'us-west-2',
+            },
+        ):
+            service_client = boto3.client('secretsmanager')
+            instrument_service_client(service_client)
+            service_client.create_secret(Name='secret', SecretString='{}')
+            with self.assertRaises(service_client.exceptions.ResourceNotFoundException):
+                service_client.get_secret_value(SecretId='missing')
+
+        self.metrics.flush_calls('createSecret')
+        calls = {log_line['Operation']: log_line for log_line in self.get_log_lines()}
+        self.assertEqual({'CreateSecret', 'GetSecretValue'}, set(calls))
+        self.assertEqual(SECRETS_MANAGER, calls['GetSecretValue']['Service'])
+        self.assertEqual(0, calls['CreateSecret']['CallFailures'])
+        self.assertEqual(1, calls['GetSecretValue']['CallFailures'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+import copy
+import pathlib
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + '/../lambda_functions')
+import secrets_config_utils
+from secrets_config_utils import (SecretsConfigIndex, get_access_token_secrets_configs, get_alarm_subscriptions,
+                                  get_secret_config, get_secret_config_by_arn)
+
+SECRETS_CONFIG = {
+    'npm_login_username_secret': {'arn': 'username-arn', 'secret_key': 'npm_login_username'},
+    'npm_login_password_secret': {'arn': 'password-arn', 'secret_key': 'npm_login_password',
+                                  'alarm_subscriptions': ['monitoring@domain.com']},
+    'npm_otp_seed_secret': {'arn': 'otp-seed-arn', 'secret_key': 'npm_otp_seed'},
+    'npm_access_token_secrets': {
+        'secrets': [
+            {'arn': 'codegen-arn', 'secret_key': 'npm_access_token_codegen'},
+            {'arn': 'js-arn', 'secret_key': 'npm_access_token_js'}
+        ]
+    }
+}
+
+
+class TestSecretsConfigIndex(unittest.TestCase):
+    def setUp(self):
+        patcher = patch.object(secrets_config_utils, 'secrets_config_index', SecretsConfigIndex(SECRETS_CONFIG))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_finds_secrets_by_id(self):
+        self.assertEqual('npm_otp_seed', get_secret_config('npm_otp_seed_secret')['secret_key'])
+        self.assertEqual(('monitoring@domain.com',), get_alarm_subscriptions('npm_login_password_secret'))
+        self.assertEqual(2, len(get_access_token_secrets_configs('npm_access_token_secrets')))
+
+    def test_finds_secrets_by_arn(self):
+        self.assertEqual('npm_access_token_js', get_secret_config_by_arn('js-arn')['secret_key'])
+        self.assertEqual('npm_access_token_js',
+                         get_secret_config_by_arn('js-arn', 'npm_access_token_secrets')['secret_key'])
+        self.assertEqual('npm_login_password', get_secret_config_by_arn('password-arn')['secret_key'])
+
+    def test_rejects_arns_outside_of_the_expected_secret(self):
+        with self.assertRaises(KeyError):
+            get_secret_config_by_arn('password-arn', 'npm_access_token_secrets')
+        with self.assertRaises(KeyError):
+            get_secret_config_by_arn('unknown-arn')
+
+    def test_is_read_only(self):
+        with self.assertRaises(TypeError):
+            get_secret_config('npm_otp_seed_secret')['arn'] = 'other-arn'
+        with self.assertRaises(AttributeError):
+            get_access_token_secrets_configs('npm_access_token_secrets').append({})
+
+    def test_validates_the_configuration(self):
+        secrets_config = copy.deepcopy(SECRETS_CONFIG)
+        del secrets_config['npm_otp_seed_secret']
+        del secrets_config['npm_login_username_secret']['secret_key']
+        secrets_config['npm_access_token_secrets']['secrets'][1]['arn'] = 'codegen-arn'
+
+        with self.assertRaises(ValueError) as context:
+            SecretsConfigIndex(secrets_config)
+
+        message = str(context.exception)
+        self.assertIn('missing npm_otp_seed_secret', message)
+        self.assertIn('npm_login_username_secret.secret_key', message)
+        self.assertIn('codegen-arn is used by another secret', message)
+
+
+if __name__ == '__main__':
+    unittest.main()
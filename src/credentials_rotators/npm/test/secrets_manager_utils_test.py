@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pathlib
+import sys
+import unittest
+from unittest.mock import patch
+
+import boto3
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + '/../lambda_functions')
+import secrets_manager_utils
+from secrets_manager_utils import get_cached_secret_values, get_secret_values
+
+
+class TestSecretsManagerUtils(unittest.TestCase):
+    def setUp(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        environment = patch.dict(os.environ, {'AWS_ACCESS_KEY_ID': 'testing',
+                                              'AWS_SECRET_ACCESS_KEY': 'testing',
+                                              'AWS_DEFAULT_REGION': 'us-west-2'})
+        environment.start()
+        self.addCleanup(environment.stop)
+        secrets_manager_utils.cached_secret_values.clear()
+
+        self.service_client = boto3.client('secretsmanager')
+        self.calls = []
+        self.service_client.meta.events.register('before-call.secretsmanager',
+                                                 lambda model, **_: self.calls.append(model.name))
+        self.secret_configs = []
+        for secret_key in ['npm_login_username', 'npm_otp_seed', 'npm_login_password']:
+            arn = self.service_client.create_secret(Name=secret_key,
+                                                    SecretString=json.dumps({secret_key: f'{secret_key}-value'}))['ARN']
+            self.secret_configs.append({'arn': arn, 'secret_key': secret_key})
+        self.calls.clear()
+
+    def test_fetches_secrets_in_one_batch(self):
+        values = get_secret_values(self.service_client, self.secret_configs)
+
+        self.assertEqual(['npm_login_username-value', 'npm_otp_seed-value', 'npm_login_password-value'], values)
+        self.assertEqual(['BatchGetSecretValue'], self.calls)
+
+    def test_falls_back_to_concurrent_fetches(self):
+        access_denied = ClientError({'Error': {'Code': 'AccessDeniedException', 'Message': 'denied'}},
+                                    'BatchGetSecretValue')
+        with patch.object(self.service_client, 'batch_get_secret_value', side_effect=access_denied):
+            values = get_secret_values(self.service_client, self.secret_configs)
+
+        self.assertEqual(['npm_login_username-value', 'npm_otp_seed-value', 'npm_login_password-value'], values)
+        self.assertEqual(['GetSecretValue'] * 3, self.calls)
+
+    def test_reuses_cached_secrets(self):
+        get_cached_secret_values(self.service_client, self.secret_configs[:2])
+        self.calls.clear()
+
+        values = get_cached_secret_values(self.service_client, self.secret_configs)
+
+        self.assertEqual('npm_login_password-value', values[2])
+        self.assertEqual(['GetSecretValue'], self.calls)
+
+    def test_refetches_uncached_secrets(self):
+        get_cached_secret_values(self.service_client, self.secret_configs,
+                                 uncached_configs=self.secret_configs[2:])
+        self.service_client.put_secret_value(
+            SecretId=self.secret_configs[2]['arn'],
+            SecretString=json.dumps({'npm_login_password': 'rotated'}))
+        self.calls.clear()
+
+        values = get_cached_secret_values(self.service_client, self.secret_configs,
+                                          uncached_configs=self.secret_configs[2:])
+
+        self.assertEqual(['npm_login_username-value', 'npm_otp_seed-value', 'rotated'], values)
+        self.assertEqual(['GetSecretValue'], self.calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
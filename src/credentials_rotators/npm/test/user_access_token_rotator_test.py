@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pathlib
+import sys
+import unittest
+import uuid
+from unittest.mock import patch
+
+import boto3
+from moto import mock_aws
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + '/../lambda_functions')
+import secret_rotator
+import secrets_config_utils
+import secrets_manager_utils
+import user_access_token_rotator
+from rotation_handlers import rotate_access_keys
+
+STATIC_SECRETS = {
+    'npm_login_username_secret': ('npm_login_username', 'user'),
+    'npm_login_password_secret': ('npm_login_password', 'password'),
+    'npm_otp_seed_secret': ('npm_otp_seed', 'JBSWY3DPEHPK3PXP'),
+}
+
+
+class TestUserAccessTokenRotator(unittest.TestCase):
+    def setUp(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        environment = patch.dict(os.environ, {'AWS_ACCESS_KEY_ID': 'testing',
+                                              'AWS_SECRET_ACCESS_KEY': 'testing',
+                                              'AWS_DEFAULT_REGION': 'us-west-2'})
+        environment.start()
+        self.addCleanup(environment.stop)
+
+        self.service_client = boto3.client('secretsmanager')
+        config = {}
+        for secret_id, (secret_key, value) in STATIC_SECRETS.items():
+            arn = self.service_client.create_secret(
+                Name=secret_id, SecretString=json.dumps({secret_key: value}))['ARN']
+            config[secret_id] = {'arn': arn, 'secret_key': secret_key}
+        self.arn = self.service_client.create_secret(
+            Name='npm_access_token', SecretString=json.dumps({'npm_access_token': 'old-token'}))['ARN']
+        self.service_client.rotate_secret(SecretId=self.arn, RotationRules={'AutomaticallyAfterDays': 5})
+        # moto's rotation, without a lambda, leaves a current version without a value
+        self.service_client.put_secret_value(SecretId=self.arn,
+                                             SecretString=json.dumps({'npm_access_token': 'old-token'}),
+                                             VersionStages=['AWSCURRENT'])
+        config['npm_access_token_secrets'] = {
+            'secrets': [{'arn': self.arn, 'secret_key': 'npm_access_token'}]
+        }
+
+        for patcher in [patch.object(secret_rotator, 'service_client', self.service_client),
+                        patch.object(secrets_config_utils, 'secrets_config_index',
+                                     secrets_config_utils.SecretsConfigIndex(config))]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        secrets_manager_utils.cached_secret_values.clear()
+
+        self.token = str(uuid.uuid4())
+        self.service_client.put_secret_value(SecretId=self.arn,
+                                             ClientRequestToken=self.token,
+                                             SecretString=json.dumps({'npm_access_token': 'new-token'}),
+                                             VersionStages=['AWSPENDING'])
+
+    def test_finish_secret_deletes_the_previous_access_token(self):
+        operations = []
+        self.service_client.meta.events.register(
+            'before-call.secretsmanager.*', lambda model, **kwargs: operations.append(model.name))
+
+        with patch.object(user_access_token_rotator, 'delete_access_token') as delete_access_token:
+            rotate_access_keys({'SecretId': self.arn, 'ClientRequestToken': self.token,
+                                'Step': 'finishSecret'}, None)
+
+        delete_access_token.assert_called_once_with('user', 'JBSWY3DPEHPK3PXP', 'password', 'old-token')
+        # The current access token is fetched in the same batch as the secrets used for authentication
+        self.assertEqual(['BatchGetSecretValue', 'DescribeSecret', 'UpdateSecretVersionStage'], operations)
+        current = self.service_client.get_secret_value(SecretId=self.arn, VersionStage='AWSCURRENT')
+        self.assertEqual(self.token, current['VersionId'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,18 @@
+from typing import List
+
 from aws_cdk import aws_cognito as cognito
 from aws_cdk import aws_iam as iam
-from aws_cdk import Duration, Stack
-from constructs import Construct
+from aws_cdk import Aspects, CfnRule, CfnRuleAssertion, Duration, Fn, IAspect, Stack
+from constructs import Construct, IConstruct
+import jsii
 
 from common.auth_utils import construct_identity_pool
 from common.platforms import Platform
+from common.policy_accumulator import PolicyAccumulator
 from common.region_aware_stack import RegionAwareStack
 from common.github_action_oidc import GithubActionOIDC
 
+
 class CommonStack(RegionAwareStack):
     def __init__(self, scope: Construct, id: str, platform: Platform, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
@@ -19,14 +24,24 @@ class CommonStack(RegionAwareStack):
             max_session_duration=Duration.hours(4),
         )
 
+        # Reading the stacks' snapshots also lists the parameter names, to find the
+        # stacks that have no snapshot
+        ssm_read_actions = ["ssm:GetParameter", "ssm:GetParametersByPath"]
+        if self.snapshot_parameters_enabled():
+            ssm_read_actions.append("ssm:DescribeParameters")
         policy_to_add = iam.PolicyStatement(
             effect=iam.Effect.ALLOW,
-            actions=["ssm:GetParameter", "ssm:GetParametersByPath"],
+            actions=ssm_read_actions,
             resources=["*"],
         )
         circleci_execution_role.add_to_policy(policy_to_add)
 
         self._circleci_execution_role = circleci_execution_role
+        self.github_action_oidc = None
+        # Statements added by other stacks are merged, and added to the roles once, at synth time
+        self._role_policies = PolicyAccumulator()
+        self._role_policies_flushed = False
+        Aspects.of(self).add(FlushRolePolicies(self))
         self._supported_in_region = True
         self._cognito_support_in_region = self.is_cognito_supported_in_region()
 
@@ -56,14 +71,53 @@ class CommonStack(RegionAwareStack):
                 resources=["*"],
             )
 
-        self._circleci_execution_role.add_to_policy(policy_to_add)
-        if self.github_action_oidc is not None:
-            self.github_action_oidc.aws_sdk_ios_integration_test_role.add_to_policy(policy_to_add)
+        if self._role_policies_flushed:
+            raise RuntimeError("Cannot add to the common role policies after they were flushed")
+        self._role_policies.add(policy_to_add)
 
+    def flush_role_policies(self) -> None:
+        """
+        Adds the merged statements of every add_to_common_role_policies call
+        to the common roles. Runs once, when the app is synthesized.
+        """
+        if self._role_policies_flushed:
+            return
+        self._role_policies_flushed = True
 
+        roles = [self._circleci_execution_role]
+        if self.github_action_oidc is not None:
+            roles.append(self.github_action_oidc.aws_sdk_ios_integration_test_role)
         if self._cognito_support_in_region:
-            self._cognito_identity_pool_auth_role.add_to_policy(policy_to_add)
-            self._cognito_identity_pool_unauth_role.add_to_policy(policy_to_add)
+            roles.append(self._cognito_identity_pool_auth_role)
+            roles.append(self._cognito_identity_pool_unauth_role)
+
+        for statement in self._role_policies.statements():
+            for role in roles:
+                role.add_to_policy(statement)
+
+    def refuse_partial_deployment(self, selected_stacks: List[str]) -> None:
+        """
+        Makes CloudFormation reject a deployment of this stack, when the app
+        was synthesized with only some of its stacks. Only those stacks then
+        added their policies and exports to this stack, and deploying it would
+        remove the other stacks' ones.
+        """
+        selection = ",".join(selected_stacks)
+        CfnRule(
+            self,
+            "refuse_partial_deployment",
+            assertions=[
+                CfnRuleAssertion(
+                    assert_=Fn.condition_equals("partial", "complete"),
+                    assert_description=(
+                        f"The {self.stack_name} stack was synthesized with -c stacks={selection}, "
+                        "so it is missing the other stacks' policies and exports. Deploy the "
+                        "selected stacks with --exclusively, or deploy this stack without "
+                        "the stacks context."
+                    ),
+                )
+            ],
+        )
 
     def create_common_identity_pool(self) -> None:
         (
@@ -94,3 +148,18 @@ class CommonStack(RegionAwareStack):
     @property
     def cognito_identity_pool_unauth_role(self) -> iam.Role:
         return self._cognito_identity_pool_unauth_role
+
+
+@jsii.implements(IAspect)
+class FlushRolePolicies:
+    """
+    Flushes a CommonStack's accumulated role policies when the app is
+    synthesized, before its templates are written.
+    """
+
+    def __init__(self, common_stack: CommonStack) -> None:
+        self._common_stack = common_stack
+
+    def visit(self, node: IConstruct) -> None:
+        if node is self._common_stack:
+            self._common_stack.flush_role_policies()
@@ -0,0 +1,89 @@
+"""
+Writes a stack's whole parameter map to the SSM Parameter Store, and deletes it
+again when the stack is deleted.
+
+`ResourceProperties.parameters` maps each fully qualified parameter name to
+its `value` and `type` (`String` or `StringList`). On update, parameters that
+are no longer in the map are deleted, and only the changed ones are written,
+unless `ResourceProperties.rewrite` changed, in which case every parameter is
+written again.
+
+Required permissions, on the stack's parameters:
+- ssm:PutParameter
+- ssm:DeleteParameters
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+
+# PutParameter's default quota is a few transactions per second per account, so writes are
+# spread over a small pool, and throttled calls are retried by botocore's adaptive mode
+MAX_WORKERS = 4
+RETRY_CONFIG = Config(retries={"mode": "adaptive", "max_attempts": 10})
+
+# DeleteParameters accepts at most this many names per call
+DELETE_BATCH_SIZE = 10
+
+
+def on_event(event, __):
+    request_type = event["RequestType"]
+    if request_type == "Create":
+        return on_create(event)
+    if request_type == "Update":
+        return on_update(event)
+    if request_type == "Delete":
+        return on_delete(event)
+    raise Exception(f"Invalid request type: {request_type}")
+
+
+def on_create(event):
+    parameters = event["ResourceProperties"]["parameters"]
+    put_parameters(parameters)
+    return {"PhysicalResourceId": event["ResourceProperties"]["namespace"]}
+
+
+def on_update(event):
+    parameters = event["ResourceProperties"]["parameters"]
+    old_properties = event["OldResourceProperties"]
+    old_parameters = old_properties["parameters"]
+    if event["ResourceProperties"].get("rewrite") != old_properties.get("rewrite"):
+        changed_parameters = parameters
+    else:
+        changed_parameters = {
+            name: parameter
+            for name, parameter in parameters.items()
+            if old_parameters.get(name) != parameter
+        }
+    put_parameters(changed_parameters)
+    delete_parameters([name for name in old_parameters if name not in parameters])
+    return {"PhysicalResourceId": event["ResourceProperties"]["namespace"]}
+
+
+def on_delete(event):
+    parameters = event["ResourceProperties"]["parameters"]
+    delete_parameters(list(parameters))
+    return {"PhysicalResourceId": event["PhysicalResourceId"]}
+
+
+def put_parameters(parameters: dict) -> None:
+    client = boto3.client("ssm", config=RETRY_CONFIG)
+
+    def put_parameter(name: str) -> None:
+        client.put_parameter(
+            Name=name,
+            Value=parameters[name]["value"],
+            Type=parameters[name]["type"],
+            Overwrite=True,
+        )
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        # Consuming the results raises the first error, if any
+        list(executor.map(put_parameter, sorted(parameters)))
+
+
+def delete_parameters(names: list) -> None:
+    client = boto3.client("ssm", config=RETRY_CONFIG)
+    for index in range(0, len(names), DELETE_BATCH_SIZE):
+        client.delete_parameters(Names=names[index : index + DELETE_BATCH_SIZE])
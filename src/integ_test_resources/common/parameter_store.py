@@ -1,9 +1,19 @@
+import hashlib
+import json
+import os
 from typing import List, Union
 
+from aws_cdk import aws_iam as iam
+from aws_cdk import aws_lambda as lambda_
 from aws_cdk import aws_ssm as ssm
-from aws_cdk import Stack
+from aws_cdk import custom_resources as custom_resources
+from aws_cdk import CustomResource, Fn, Stack, Token
 from common.platforms import Platform
 
+BATCH_PARAMETER_WRITER_CODE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "custom_resources", "batch_parameter_writer"
+)
+
 
 def save_parameter(
     scope: Stack, key: str, value: Union[str, List[str]], platform: Platform
@@ -74,6 +84,151 @@ def save_string_list_parameter(
     )
 
 
+def save_parameters_in_batch(
+    scope: Stack, parameters: dict, platform: Platform, rewrite: str = ""
+) -> None:
+    """
+    Saves all of a stack's parameters to the Amazon Systems Manager Parameter
+    Store through a single custom resource, instead of one CloudFormation
+    resource per parameter. The parameters are named and typed exactly as
+    save_parameter would name and type them, so device config builders read
+    them the same way.
+
+    The custom resource writes the parameters with a few concurrent
+    PutParameter calls, retrying throttled calls, and deletes them when the
+    stack is deleted, or when they are removed from the stack. Changing
+    `rewrite` makes the custom resource write every parameter again, even the
+    unchanged ones.
+    """
+    parameter_prefix = _get_parameter_name(platform, scope, "")
+    batched_parameters = dict()
+    for key, value in parameters.items():
+        parameter_name = _get_parameter_name(platform, scope, key)
+        if type(value) is list:
+            batched_parameters[parameter_name] = {
+                "value": Fn.join(",", value),
+                "type": "StringList",
+            }
+        else:
+            batched_parameters[parameter_name] = {"value": value, "type": "String"}
+
+    write_parameters_policy = iam.PolicyStatement(
+        effect=iam.Effect.ALLOW,
+        actions=["ssm:PutParameter", "ssm:DeleteParameters"],
+        resources=[f"arn:aws:ssm:{scope.region}:{scope.account}:parameter{parameter_prefix}*"],
+    )
+    writer_lambda = lambda_.Function(
+        scope,
+        "batch_parameter_writer_lambda",
+        runtime=lambda_.Runtime.PYTHON_3_12,
+        code=lambda_.AssetCode.from_asset(BATCH_PARAMETER_WRITER_CODE),
+        handler="batch_parameter_writer.on_event",
+        description=f"Writes the parameters beneath {parameter_prefix}",
+        initial_policy=[write_parameters_policy],
+    )
+    provider = custom_resources.Provider(
+        scope, "batch_parameter_writer_provider", on_event_handler=writer_lambda
+    )
+    CustomResource(
+        scope,
+        "batch_parameters",
+        resource_type="Custom::MobileSdkParameters",
+        service_token=provider.service_token,
+        properties={
+            "namespace": parameter_prefix,
+            "parameters": batched_parameters,
+            "rewrite": rewrite,
+        },
+    )
+
+
+def save_stack_hash_parameter(scope: Stack, parameters: dict, platform: Platform) -> None:
+    """
+    Saves a version marker of a stack's parameters to the Amazon Systems
+    Manager Parameter Store. The marker is stored outside of the `/mobile-sdk`
+    namespace, so that it is not picked up as test configuration. For example,
+    the marker of the apigateway stack's parameters would be saved as:
+    /mobile-sdk-stack-hash/android/apigateway
+
+    Device config builders compare the hashes of these markers against a local
+    cache, to decide whether a stack's parameters need to be read again. The
+    marker holds a hash of the parameters' definitions, and the values that
+    are only known at deploy time, which CloudFormation substitutes. So the
+    marker changes whenever the definitions change, and whenever a resource
+    is replaced, or the stack destroyed and deployed again, behind the same
+    logical IDs. It is saved in the intelligent tier, which moves it to the
+    advanced tier only if it is larger than 4 KB.
+    """
+    resolved_parameters = scope.resolve(parameters)
+    serialized_parameters = json.dumps(resolved_parameters, sort_keys=True)
+    definition_hash = hashlib.sha256(serialized_parameters.encode()).hexdigest()
+    deploy_time_values = {
+        key: value for key, value in parameters.items() if _is_deploy_time_value(value)
+    }
+
+    ssm.StringParameter(
+        scope,
+        "stack_hash_param",
+        string_value=scope.to_json_string(
+            {"definition": definition_hash, "values": deploy_time_values}
+        ),
+        parameter_name=_get_stack_hash_parameter_name(platform, scope),
+        simple_name=False,
+        tier=ssm.ParameterTier.INTELLIGENT_TIERING,
+    )
+
+
+def _is_deploy_time_value(value: Union[str, List[str]]) -> bool:
+    if type(value) is list:
+        return any(Token.is_unresolved(item) for item in value)
+    return Token.is_unresolved(value)
+
+
+def save_stack_snapshot_parameter(scope: Stack, parameters: dict, platform: Platform) -> None:
+    """
+    Saves a snapshot of a stack's whole package, as a single JSON document, to
+    the Amazon Systems Manager Parameter Store. Keys containing `/` are nested,
+    the same way device config builders nest the individual parameters. For
+    example, the snapshot of the apigateway stack would be saved as:
+    /mobile-sdk-snapshot/android/apigateway
+
+    Device config builders can read every stack's snapshot in a few calls,
+    instead of paging through each of the stack's parameters. Values that are
+    only known at deploy time are substituted by CloudFormation, so the
+    snapshot is not compressed. It is saved in the advanced tier, which allows
+    values of up to 8 KB, and is charged per parameter, so stacks only save
+    snapshots when the `snapshot_parameters` context is set.
+    """
+    package = dict()
+    for key, value in parameters.items():
+        segments = [segment for segment in key.split("/") if segment]
+        node = package
+        for segment in segments[:-1]:
+            node = node.setdefault(segment, dict())
+        node[segments[-1]] = value
+
+    ssm.StringParameter(
+        scope,
+        "stack_snapshot_param",
+        string_value=scope.to_json_string(package),
+        parameter_name=_get_stack_snapshot_parameter_name(platform, scope),
+        simple_name=False,
+        tier=ssm.ParameterTier.ADVANCED,
+    )
+
+
+def _get_stack_snapshot_parameter_name(platform: Platform, scope: Stack) -> str:
+    namespace = ("mobile-sdk-snapshot", platform.value)
+    parameter_name = "/" + "/".join(namespace + (scope.stack_name,))
+    return parameter_name
+
+
+def _get_stack_hash_parameter_name(platform: Platform, scope: Stack) -> str:
+    namespace = ("mobile-sdk-stack-hash", platform.value)
+    parameter_name = "/" + "/".join(namespace + (scope.stack_name,))
+    return parameter_name
+
+
 def _get_parameter_name(platform: Platform, scope: Stack, key: str) -> str:
     # Parameter names cannot be prefixed with the token 'aws', thus it is
     # conspicuously absent from the namespace. See: https://amzn.to/2VDaqtC
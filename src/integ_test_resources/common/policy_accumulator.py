@@ -0,0 +1,69 @@
+import json
+from typing import Dict, List, Tuple
+
+from aws_cdk import aws_iam as iam
+
+
+class PolicyAccumulator:
+    """
+    Collects IAM policy statements, so that they can be added to a role as
+    a few merged statements, instead of one statement per call.
+
+    Statements that share an effect, resources and conditions are merged
+    into one statement, with the union of their actions. Those merged
+    statements are then merged again if they share an effect, actions and
+    conditions, with the union of their resources. Duplicate actions and
+    resources are dropped, and the first-seen order is kept, so that the
+    synthesized policies are stable.
+
+    Statements with principals, a Sid, `NotAction` or `NotResource` are
+    kept as they are.
+    """
+
+    def __init__(self) -> None:
+        # (effect, resources, conditions) -> (conditions, actions)
+        self._statements_by_target: Dict[Tuple, Tuple[dict, Dict[str, None]]] = {}
+        self._unmerged_statements: List[iam.PolicyStatement] = []
+
+    def add(self, statement: iam.PolicyStatement) -> None:
+        if (
+            statement.has_principal
+            or statement.sid
+            or statement.not_actions
+            or statement.not_resources
+        ):
+            self._unmerged_statements.append(statement)
+            return
+
+        conditions = statement.conditions or {}
+        key = (
+            statement.effect,
+            tuple(dict.fromkeys(statement.resources)),
+            json.dumps(conditions, sort_keys=True),
+        )
+        if key not in self._statements_by_target:
+            self._statements_by_target[key] = (conditions, dict())
+        self._statements_by_target[key][1].update(dict.fromkeys(statement.actions))
+
+    def statements(self) -> List[iam.PolicyStatement]:
+        # (effect, actions, conditions) -> (conditions, resources)
+        statements_by_actions: Dict[Tuple, Tuple[dict, Dict[str, None]]] = {}
+        for (effect, resources, serialized_conditions), (
+            conditions,
+            actions,
+        ) in self._statements_by_target.items():
+            key = (effect, tuple(actions), serialized_conditions)
+            if key not in statements_by_actions:
+                statements_by_actions[key] = (conditions, dict())
+            statements_by_actions[key][1].update(dict.fromkeys(resources))
+
+        merged_statements = [
+            iam.PolicyStatement(
+                effect=effect,
+                actions=list(actions),
+                resources=list(resources),
+                conditions=conditions or None,
+            )
+            for (effect, actions, _), (conditions, resources) in statements_by_actions.items()
+        ]
+        return merged_statements + self._unmerged_statements
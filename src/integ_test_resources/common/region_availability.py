@@ -0,0 +1,55 @@
+import threading
+from typing import Dict, FrozenSet, Iterable, List
+
+from boto3.session import Session
+from common.synth_fixtures import synth_lookup
+
+# A single session for the whole process. botocore loads its endpoint data
+# the first time a session is asked for a service's regions, and keeps it for
+# the lifetime of that session.
+_session = None
+_regions_by_service: Dict[str, FrozenSet[str]] = {}
+_lock = threading.Lock()
+
+
+def get_supported_regions(service_name: str) -> FrozenSet[str]:
+    """
+    Returns the regions in which a service is available, according to the
+    endpoint data bundled with botocore. The endpoint data is loaded the first
+    time any service is looked up, and each service's regions are remembered
+    for the rest of the process.
+    """
+    regions = _regions_by_service.get(service_name)
+    if regions is None:
+        regions = _load_supported_regions([service_name])[service_name]
+    return regions
+
+
+def are_services_supported_in_region(service_names: Iterable[str], region_name: str) -> bool:
+    """
+    Returns True if every one of the services is available in the region. The
+    services that have not been looked up yet are all resolved in one pass.
+    """
+    service_names = list(service_names)
+    missing_service_names = [name for name in service_names if name not in _regions_by_service]
+    if missing_service_names:
+        _load_supported_regions(missing_service_names)
+    return all(region_name in _regions_by_service[name] for name in service_names)
+
+
+def _load_supported_regions(service_names: Iterable[str]) -> Dict[str, FrozenSet[str]]:
+    with _lock:
+        for service_name in service_names:
+            if service_name not in _regions_by_service:
+                regions = synth_lookup(
+                    "regions", service_name, lambda: _fetch_supported_regions(service_name)
+                )
+                _regions_by_service[service_name] = frozenset(regions)
+        return _regions_by_service
+
+
+def _fetch_supported_regions(service_name: str) -> List[str]:
+    global _session
+    if _session is None:
+        _session = Session()
+    return sorted(_session.get_available_regions(service_name))
@@ -2,13 +2,27 @@ import hashlib
 
 from aws_cdk import Stack
 from constructs import Construct
-from boto3.session import Session
 
-from common.parameter_store import save_parameter
+from common.parameter_store import (
+    save_parameter,
+    save_parameters_in_batch,
+    save_stack_hash_parameter,
+    save_stack_snapshot_parameter,
+)
 from common.platforms import Platform
+from common.region_availability import (
+    are_services_supported_in_region,
+    get_supported_regions,
+)
+from common.synth_profiler import profile_constructor
 
 
 class RegionAwareStack(Stack):
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        # Lets an opt-in SynthProfiler time every stack's constructor
+        cls.__init__ = profile_constructor(cls.__init__)
+
     def __init__(self, scope: Construct, id: str, **kwargs) -> None:
         super().__init__(scope, id, **kwargs)
 
@@ -20,34 +34,52 @@ class RegionAwareStack(Stack):
         self, service_name: str = None, region_name: str = None
     ) -> bool:
 
-        boto3_session = Session()
         if region_name is None:
             region_name = self.node.try_get_context("region")
 
         if service_name is None:
             service_name = self.stack_name
 
-        supported_regions_for_service = boto3_session.get_available_regions(service_name)
-        service_supported_in_region = region_name in supported_regions_for_service
-        return service_supported_in_region
+        return region_name in get_supported_regions(service_name)
 
     def are_services_supported_in_region(
         self, service_names: list, region_name: str = None
     ) -> bool:
 
-        services_supported_in_region = True
-        for service_name in service_names:
-            services_supported_in_region = (
-                services_supported_in_region
-                and self.is_service_supported_in_region(
-                    service_name=service_name, region_name=region_name
-                )
-            )
-        return services_supported_in_region
+        if region_name is None:
+            region_name = self.node.try_get_context("region")
+
+        return are_services_supported_in_region(service_names, region_name)
 
     def save_parameters_in_parameter_store(self, platform: Platform) -> None:
-        for parameter_name, parameter_value in self.parameters_to_save.items():
-            save_parameter(self, parameter_name, parameter_value, platform=platform)
+        """
+        Saves the stack's parameters, one SSM parameter resource per key, or,
+        with the `batch_parameters` context set to `true`, all of them through
+        a single custom resource, which writes all of them again whenever the
+        `rewrite_parameters` context changes. With the `snapshot_parameters`
+        context set to `true`, a snapshot of the whole package is saved too.
+        """
+        if self.batch_parameters_enabled():
+            if self.parameters_to_save:
+                save_parameters_in_batch(
+                    self,
+                    self.parameters_to_save,
+                    platform=platform,
+                    rewrite=str(self.node.try_get_context("rewrite_parameters") or ""),
+                )
+        else:
+            for parameter_name, parameter_value in self.parameters_to_save.items():
+                save_parameter(self, parameter_name, parameter_value, platform=platform)
+        if self.parameters_to_save:
+            save_stack_hash_parameter(self, self.parameters_to_save, platform=platform)
+            if self.snapshot_parameters_enabled():
+                save_stack_snapshot_parameter(self, self.parameters_to_save, platform=platform)
+
+    def batch_parameters_enabled(self) -> bool:
+        return str(self.node.try_get_context("batch_parameters")).lower() == "true"
+
+    def snapshot_parameters_enabled(self) -> bool:
+        return str(self.node.try_get_context("snapshot_parameters")).lower() == "true"
 
     def add_dependencies_with_region_filter(self, stacks_to_add: list) -> None:
         for stack in stacks_to_add:
@@ -0,0 +1,78 @@
+import random
+from typing import Callable
+
+from botocore.exceptions import ClientError
+from botocore.retries import standard
+
+# The checks of botocore's standard retry mode, for callers that turn its
+# retries off and retry requests themselves
+THROTTLED_CHECKER = standard.ThrottledRetryableChecker()
+TRANSIENT_CHECKER = standard.TransientRetryableChecker()
+# The HTTP status codes that botocore's standard retry mode treats as transient
+TRANSIENT_STATUS_CODES = (500, 502, 503, 504)
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Returns whether botocore's standard retry mode would retry a request
+    that failed with `error`: a throttle, a transient error code or 5xx
+    status, or a connection error such as EndpointConnectionError or
+    ConnectionClosedError.
+    """
+    if isinstance(error, ClientError):
+        status_code = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        if status_code in TRANSIENT_STATUS_CODES:
+            return True
+        context = standard.RetryContext(attempt_number=1, parsed_response=error.response)
+    else:
+        context = standard.RetryContext(attempt_number=1, caught_exception=error)
+    return THROTTLED_CHECKER.is_retryable(context) or TRANSIENT_CHECKER.is_retryable(context)
+
+
+class AdaptiveBackoff:
+    """
+    Tracks how hard SSM is currently pushing back, for a group of requests
+    that share one account's quota.
+
+    Every throttled or transiently failing request (see `is_retryable`)
+    doubles the shared delay, up to `max_delay`, and every successful
+    request halves it again, until it falls below `base_delay` and is
+    dropped. Requests wait for the current delay before
+    they are sent, so that once any of them is throttled, all of them slow
+    down together, rather than each retrying on its own schedule.
+
+    Delays are jittered by up to half their length, so that requests which
+    were throttled together are not retried together.
+    """
+
+    DEFAULT_BASE_DELAY_SECONDS = 0.05
+    DEFAULT_MAX_DELAY_SECONDS = 5.0
+
+    def __init__(
+        self,
+        base_delay: float = DEFAULT_BASE_DELAY_SECONDS,
+        max_delay: float = DEFAULT_MAX_DELAY_SECONDS,
+        jitter: Callable[[], float] = random.random,
+    ):
+        if base_delay <= 0 or max_delay < base_delay:
+            raise ValueError("Expected 0 < base_delay <= max_delay")
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.delay = 0.0
+
+    def next_delay(self) -> float:
+        """
+        Returns how long the next request should wait before it is sent.
+        """
+        if self.delay == 0.0:
+            return 0.0
+        return self.delay * (0.5 + 0.5 * self.jitter())
+
+    def on_throttle(self) -> None:
+        self.delay = min(self.max_delay, max(self.base_delay, 2 * self.delay))
+
+    def on_success(self) -> None:
+        self.delay /= 2
+        if self.delay < self.base_delay:
+            self.delay = 0.0
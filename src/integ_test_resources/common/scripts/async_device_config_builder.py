@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import pathlib
+import sys
+from contextlib import asynccontextmanager, nullcontext
+from typing import Optional
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+from botocore.exceptions import BotoCoreError, ClientError
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from adaptive_backoff import AdaptiveBackoff, is_retryable
+from device_config_builder import SUPPORTED_PLATFORMS, DeviceConfigBuilder
+from parameter_fetcher import ShardedParameterFetcher
+from rate_limiter import SharedRateLimiter
+
+
+class AsyncDeviceConfigBuilder:
+    """
+    Builds the same device config document as DeviceConfigBuilder, for
+    callers that already run an asyncio event loop, without blocking it on
+    SSM round trips.
+
+    Like ShardedParameterFetcher, the platform prefix is split into its
+    per-stack subtrees, as listed by the stack hash markers, and the
+    subtrees are paged concurrently. At most `max_concurrency` SSM requests
+    are in flight at a time. Requests that botocore's standard retry mode
+    would retry, i.e. throttles, transient errors and connection errors, are
+    retried by this class rather than by botocore, after a delay that is
+    shared by every request of the builder (see AdaptiveBackoff), so that
+    concurrent subtrees back off together. With a rate limiter, every
+    request also waits for a token of the limiter shared with the other
+    processes on the host, on the event loop.
+
+    The on-disk cache of DeviceConfigBuilder is not supported.
+    """
+
+    DEFAULT_MAX_CONCURRENCY = 8
+    DEFAULT_MAX_ATTEMPTS = 8
+
+    def __init__(
+        self,
+        platform: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        backoff: Optional[AdaptiveBackoff] = None,
+        rate_limiter: Optional[SharedRateLimiter] = None,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.builder = DeviceConfigBuilder(platform)
+        self.platform = platform
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff if backoff is not None else AdaptiveBackoff()
+        self.rate_limiter = rate_limiter
+
+    @asynccontextmanager
+    async def ssm_client(
+        self, aws_config: DeviceConfigBuilder.AWSConfig, endpoint_url: Optional[str] = None
+    ):
+        """
+        Returns an async context manager that yields an SSM client for the
+        provided Config. botocore's own retries are turned off, so that
+        failed requests are only retried by `call`. If the builder has a
+        rate limiter, every request the client sends is paced by it.
+        """
+        async with get_session().create_client(
+            "ssm",
+            region_name=aws_config.defaultRegion,
+            endpoint_url=endpoint_url,
+            aws_access_key_id=aws_config.accessKey,
+            aws_secret_access_key=aws_config.secretKey,
+            aws_session_token=aws_config.sessionToken,
+            config=AioConfig(
+                retries={"mode": "standard", "max_attempts": 1},
+                max_pool_connections=self.max_concurrency,
+            ),
+        ) as ssm:
+            if self.rate_limiter is not None:
+                self.rate_limiter.attach_async(ssm)
+            yield ssm
+
+    async def call(self, ssm, semaphore: asyncio.Semaphore, operation_name: str, **kwargs) -> dict:
+        """
+        Calls an SSM operation, retrying it when it is throttled or fails
+        transiently.
+        """
+        for attempt in range(1, self.max_attempts + 1):
+            delay = self.backoff.next_delay()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with semaphore:
+                try:
+                    response = await getattr(ssm, operation_name)(**kwargs)
+                except (BotoCoreError, ClientError) as error:
+                    if not is_retryable(error) or attempt == self.max_attempts:
+                        raise
+                    self.backoff.on_throttle()
+                    continue
+            self.backoff.on_success()
+            return response
+
+    async def list_shards(self, ssm, semaphore: asyncio.Semaphore) -> Optional[list]:
+        """
+        Lists the shards from the stack hash markers, like
+        DeviceConfigBuilder.list_stack_shards. Returns None if they cannot be
+        listed.
+        """
+        hash_prefix = self.builder.STACK_HASH_PREFIX_BASE + "/" + self.platform
+        try:
+            markers = await self.get_parameters_by_path(hash_prefix, False, ssm, semaphore)
+        except ClientError:
+            return None
+        if not markers:
+            return None
+        return [""] + sorted(parameter["Name"][len(hash_prefix) + 1 :] for parameter in markers)
+
+    async def get_parameters_in_shard(
+        self, parameter_prefix: str, shard: str, ssm, semaphore: asyncio.Semaphore
+    ) -> list:
+        path, recursive = ShardedParameterFetcher.shard_path(parameter_prefix, shard)
+        return await self.get_parameters_by_path(path, recursive, ssm, semaphore)
+
+    async def get_parameters_by_path(
+        self, path: str, recursive: bool, ssm, semaphore: asyncio.Semaphore
+    ) -> list:
+        parameters = list()
+        kwargs = {"Path": path, "Recursive": recursive}
+        while True:
+            page = await self.call(ssm, semaphore, "get_parameters_by_path", **kwargs)
+            parameters.extend(page["Parameters"])
+            if "NextToken" not in page:
+                return parameters
+            kwargs["NextToken"] = page["NextToken"]
+
+    async def get_parameters_with_prefix(self, parameter_prefix: str, ssm) -> list:
+        """
+        Returns all parameters beneath `parameter_prefix`, in the same order
+        as ShardedParameterFetcher.get_parameters. If the stacks cannot be
+        listed, the prefix is walked serially.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        shards = await self.list_shards(ssm, semaphore)
+        if shards is None:
+            return await self.get_parameters_by_path(parameter_prefix, True, ssm, semaphore)
+        shard_parameters = await asyncio.gather(
+            *[
+                self.get_parameters_in_shard(parameter_prefix, shard, ssm, semaphore)
+                for shard in shards
+            ]
+        )
+        return [parameter for parameters in shard_parameters for parameter in parameters]
+
+    async def get_package_data(
+        self, aws_config: DeviceConfigBuilder.AWSConfig = None, ssm=None
+    ) -> dict:
+        """
+        Returns the package data for the platform. The Config is taken from
+        the environment, and an SSM client is built from it, unless they are
+        provided by the caller.
+        """
+        if aws_config is None:
+            aws_config = self.builder.aws_config_from_environment()
+        if ssm is None:
+            async with self.ssm_client(aws_config) as ssm:
+                return await self.get_package_data(aws_config, ssm)
+
+        parameter_prefix = self.builder.STACK_PREFIX_BASE + "/" + self.platform
+        parameters = await self.get_parameters_with_prefix(parameter_prefix, ssm)
+        return self.builder.build_package_data(parameter_prefix, parameters)
+
+    async def get_device_config(self) -> dict:
+        """
+        Returns the device config document that
+        DeviceConfigBuilder.print_device_config would print.
+        """
+        package_data = await self.get_package_data()
+        credentials_data = self.builder.get_credentials_data()
+        return {"credentials": credentials_data, "packages": package_data}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prints a device test configuration file.")
+    parser.add_argument("platform", choices=SUPPORTED_PLATFORMS)
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=AsyncDeviceConfigBuilder.DEFAULT_MAX_CONCURRENCY,
+        help="maximum number of SSM requests in flight at once",
+    )
+    parser.add_argument("--compact", action="store_true", help="write JSON without indentation")
+    parser.add_argument("--output", help="write to this file, instead of standard output")
+    parser.add_argument(
+        "--rate-limit",
+        action="store_true",
+        help="pace SSM requests with a rate limiter shared by every process on this host",
+    )
+    parser.add_argument("--rate-limit-file", default=SharedRateLimiter.DEFAULT_STATE_FILE)
+    args = parser.parse_args()
+
+    rate_limiter = SharedRateLimiter(args.rate_limit_file) if args.rate_limit else None
+    config_builder = AsyncDeviceConfigBuilder(
+        args.platform, max_concurrency=args.max_concurrency, rate_limiter=rate_limiter
+    )
+    device_config = asyncio.run(config_builder.get_device_config())
+    with open(args.output, "w") if args.output else nullcontext(sys.stdout) as output:
+        print(
+            DeviceConfigBuilder.encode_device_config(
+                device_config["credentials"], device_config["packages"], args.compact
+            ),
+            file=output,
+        )
+    if rate_limiter is not None:
+        print(rate_limiter.summary(), file=sys.stderr)
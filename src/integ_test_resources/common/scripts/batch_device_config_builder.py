@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Builds device config files for several platforms and regions in one run.
+
+One file named `<platform>-<region>.json` is written to the output directory
+for every combination. A combination that fails does not stop the others;
+the script exits with an error after all of them have been attempted.
+
+Usage:
+    ./batch_device_config_builder.py --platforms ios android \\
+        --regions us-east-1 us-west-2 --output-dir build/device-config
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, TextIO
+
+from botocore.config import Config
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from device_config_builder import SUPPORTED_PLATFORMS, DeviceConfigBuilder
+from rate_limiter import SharedRateLimiter
+
+
+class BatchDeviceConfigBuilder:
+    """
+    Builds the device config for every platform and region combination
+    concurrently.
+
+    A single boto3 session is used for the whole batch, and one SSM client is
+    created per region, and shared by every platform in that region. Each
+    client's connection pool is sized for all of the requests that may be in
+    flight against it at once, so that the sharded fetches of concurrent
+    platforms do not queue up for connections. With a rate limiter, every
+    request of every client is paced by it.
+    """
+
+    DEFAULT_JOBS = 4
+
+    Result = namedtuple("Result", "platform region path packageCount seconds error")
+
+    def __init__(
+        self,
+        platforms: List[str],
+        regions: List[str],
+        max_workers: int = DeviceConfigBuilder.DEFAULT_MAX_WORKERS,
+        jobs: int = DEFAULT_JOBS,
+        rate_limiter: Optional[SharedRateLimiter] = None,
+    ):
+        if jobs < 1:
+            raise ValueError(f"jobs must be at least 1, got {jobs}")
+        self.platforms = platforms
+        self.regions = regions
+        self.max_workers = max_workers
+        self.jobs = jobs
+        self.rate_limiter = rate_limiter
+        self.builders = {
+            platform: DeviceConfigBuilder(platform, max_workers=max_workers)
+            for platform in platforms
+        }
+
+    def ssm_clients(self, session) -> dict:
+        """
+        Creates one SSM client per region. Clients are created up front, on
+        the calling thread, because boto3 sessions are not thread-safe, while
+        the clients they create are.
+        """
+        concurrent_platforms = min(self.jobs, len(self.platforms))
+        client_config = Config(
+            max_pool_connections=max(10, self.max_workers * concurrent_platforms)
+        )
+        ssm_clients = {
+            region: session.client("ssm", region_name=region, config=client_config)
+            for region in self.regions
+        }
+        if self.rate_limiter is not None:
+            for ssm in ssm_clients.values():
+                self.rate_limiter.attach(ssm)
+        return ssm_clients
+
+    def build_one(
+        self,
+        platform: str,
+        region: str,
+        aws_config: DeviceConfigBuilder.AWSConfig,
+        ssm,
+        output_dir: str,
+        compact: bool,
+    ) -> Result:
+        path = os.path.join(output_dir, f"{platform}-{region}.json")
+        start = time.perf_counter()
+        try:
+            builder = self.builders[platform]
+            region_config = aws_config._replace(defaultRegion=region)
+            package_data = builder.get_package_data(aws_config=region_config, ssm=ssm)
+            credentials_data = builder.get_credentials_data()
+            encoded = DeviceConfigBuilder.encode_device_config(
+                credentials_data, package_data, compact
+            )
+            with open(path, "w") as output:
+                print(encoded, file=output)
+        except Exception as error:
+            return BatchDeviceConfigBuilder.Result(
+                platform, region, None, 0, time.perf_counter() - start, error
+            )
+        return BatchDeviceConfigBuilder.Result(
+            platform, region, path, len(package_data), time.perf_counter() - start, None
+        )
+
+    def build_all(self, output_dir: str, compact: bool = False) -> List[Result]:
+        """
+        Writes one device config file per platform and region to
+        `output_dir`, and returns a Result for each, in the order of
+        the platforms and regions.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        any_builder = self.builders[self.platforms[0]]
+        aws_config = any_builder.aws_config_from_environment()
+        session = any_builder.session(aws_config)
+        ssm_clients = self.ssm_clients(session)
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            futures = [
+                executor.submit(
+                    self.build_one,
+                    platform,
+                    region,
+                    aws_config,
+                    ssm_clients[region],
+                    output_dir,
+                    compact,
+                )
+                for platform in self.platforms
+                for region in self.regions
+            ]
+            return [future.result() for future in futures]
+
+    @staticmethod
+    def print_summary(results: List[Result], total_seconds: float, output: TextIO) -> None:
+        print(
+            f"{'platform':<10} {'region':<16} {'packages':>8} {'seconds':>8}  status", file=output
+        )
+        for result in results:
+            status = "ok" if result.error is None else f"failed: {result.error}"
+            print(
+                f"{result.platform:<10} {result.region:<16} {result.packageCount:>8} "
+                f"{result.seconds:>8.2f}  {status}",
+                file=output,
+            )
+        print(f"total: {total_seconds:.2f}s", file=output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--platforms", nargs="+", choices=SUPPORTED_PLATFORMS, required=True)
+    parser.add_argument("--regions", nargs="+", required=True)
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DeviceConfigBuilder.DEFAULT_MAX_WORKERS,
+        help="Concurrent SSM requests per platform and region",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=BatchDeviceConfigBuilder.DEFAULT_JOBS,
+        help="Platform and region combinations to build at once",
+    )
+    parser.add_argument("--compact", action="store_true", help="Write JSON without whitespace")
+    parser.add_argument(
+        "--rate-limit",
+        action="store_true",
+        help="Pace SSM requests with a rate limiter shared by every process on this host",
+    )
+    parser.add_argument("--rate-limit-file", default=SharedRateLimiter.DEFAULT_STATE_FILE)
+    args = parser.parse_args()
+
+    rate_limiter = SharedRateLimiter(args.rate_limit_file) if args.rate_limit else None
+    batch_builder = BatchDeviceConfigBuilder(
+        args.platforms,
+        args.regions,
+        max_workers=args.max_workers,
+        jobs=args.jobs,
+        rate_limiter=rate_limiter,
+    )
+    start = time.perf_counter()
+    results = batch_builder.build_all(args.output_dir, compact=args.compact)
+    BatchDeviceConfigBuilder.print_summary(results, time.perf_counter() - start, sys.stderr)
+    if rate_limiter is not None:
+        print(rate_limiter.summary(), file=sys.stderr)
+    if any(result.error is not None for result in results):
+        sys.exit(1)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Measures how long DeviceConfigBuilder.build_package_data takes to nest a
+large number of synthetic parameter names, and compares it with the
+recursive builder it replaced.
+
+Pass `--fail-above SECONDS` to exit with an error when the current builder
+is slower than the given time, e.g. to catch regressions in CI.
+
+Usage:
+    ./benchmarks/package_data_benchmark.py --count 100000
+"""
+
+import argparse
+import pathlib
+import sys
+import timeit
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from device_config_builder import DeviceConfigBuilder
+
+PREFIX = "/mobile-sdk/ios"
+STACK_COUNT = 30
+
+
+def synthetic_parameters(count: int) -> list:
+    """
+    Builds parameters grouped by stack, as SSM returns them, with key-paths
+    between one and four segments deep below the stack.
+    """
+    parameters = list()
+    for index in range(count):
+        stack = f"stack{index * STACK_COUNT // count:02d}"
+        depth = index % 4
+        path = "/".join([f"group{index % 7}", f"section{index % 3}", "settings"][:depth])
+        name = "/".join(filter(None, [PREFIX, stack, path, f"key{index}"]))
+        parameters.append({"Name": name, "Type": "String", "Value": f"value{index}"})
+    return parameters
+
+
+def add_package_data_recursively(all_package_data: dict, key: str, value: str) -> None:
+    """
+    The recursive implementation of add_package_data, kept as a baseline.
+    """
+    key = key.strip("/")
+    first_slash_pos = key.find("/")
+    if first_slash_pos == -1:
+        all_package_data[key] = value
+    else:
+        first_part = key[:first_slash_pos]
+        the_rest = key[first_slash_pos + 1 :]
+        if first_part not in all_package_data:
+            all_package_data[first_part] = dict()
+        add_package_data_recursively(all_package_data[first_part], the_rest, value)
+
+
+def build_package_data_recursively(prefix: str, parameters: list) -> dict:
+    all_packages_data = dict()
+    for parameter in parameters:
+        name = parameter["Name"][len(prefix) :]
+        value = DeviceConfigBuilder.get_value_for_parameter(parameter)
+        add_package_data_recursively(all_packages_data, name, value)
+    return all_packages_data
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--fail-above", type=float, default=None, metavar="SECONDS")
+    args = parser.parse_args()
+
+    parameters = synthetic_parameters(args.count)
+    builder = DeviceConfigBuilder("ios")
+
+    current = builder.build_package_data(PREFIX, parameters)
+    baseline = build_package_data_recursively(PREFIX, parameters)
+    if current != baseline:
+        raise RuntimeError("The builders produced different package data")
+
+    current_time = min(
+        timeit.repeat(
+            lambda: builder.build_package_data(PREFIX, parameters), number=1, repeat=args.repeat
+        )
+    )
+    baseline_time = min(
+        timeit.repeat(
+            lambda: build_package_data_recursively(PREFIX, parameters),
+            number=1,
+            repeat=args.repeat,
+        )
+    )
+
+    print(f"parameters:        {args.count}")
+    print(f"recursive builder: {baseline_time:.3f}s")
+    print(f"current builder:   {current_time:.3f}s ({baseline_time / current_time:.1f}x)")
+
+    if args.fail_above is not None and current_time > args.fail_above:
+        sys.exit(f"build_package_data took {current_time:.3f}s, above {args.fail_above:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
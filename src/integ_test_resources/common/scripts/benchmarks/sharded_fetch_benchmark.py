@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Compares the serial `get_parameters_by_path` walk with the sharded fetch
+engine, against an in-memory SSM provided by moto.
+
+moto answers requests in-process, so by default each SSM call is delayed by
+a simulated round-trip time. Use `--latency-ms 0` to measure raw overhead.
+
+The sharded run is timed the way device config builders fetch parameters
+with `--max-workers`, including listing the stack subtrees from the stacks'
+hash markers. With `--known-shards`, the stack names are passed in instead,
+as an incremental refresh does, and only the fetch itself is timed.
+`--discover` also reports the listing on its own.
+
+Usage:
+    pip install -r requirements-dev.txt
+    ./benchmarks/sharded_fetch_benchmark.py --sizes 1000 5000 20000
+"""
+
+import argparse
+import pathlib
+import sys
+import time
+
+import boto3
+from moto import mock_aws
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from device_config_builder import DeviceConfigBuilder
+from parameter_fetcher import ShardedParameterFetcher
+
+STACK_COUNT = 30
+PLATFORM = "ios"
+
+
+def stack_names() -> list:
+    return [f"stack{index:02d}" for index in range(STACK_COUNT)]
+
+
+def populate_parameters(ssm, count: int) -> None:
+    stacks = stack_names()
+    for stack in stacks:
+        name = f"{DeviceConfigBuilder.STACK_HASH_PREFIX_BASE}/{PLATFORM}/{stack}"
+        ssm.put_parameter(Name=name, Value="marker", Type="String")
+    for index in range(count):
+        stack = stacks[index % STACK_COUNT]
+        name = f"{DeviceConfigBuilder.STACK_PREFIX_BASE}/{PLATFORM}/{stack}/key{index}"
+        ssm.put_parameter(Name=name, Value=f"value{index}", Type="String")
+
+
+def add_simulated_latency(ssm, latency_ms: int) -> None:
+    def delay(**kwargs):
+        time.sleep(latency_ms / 1000.0)
+
+    ssm.meta.events.register("before-call.ssm.*", delay)
+
+
+def timed(function, *args, **kwargs) -> (float, object):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--latency-ms", type=int, default=20)
+    parser.add_argument(
+        "--max-workers", type=int, default=ShardedParameterFetcher.DEFAULT_MAX_WORKERS
+    )
+    parser.add_argument(
+        "--known-shards",
+        action="store_true",
+        help="pass the stack names to the sharded fetch, instead of discovering them",
+    )
+    parser.add_argument("--discover", action="store_true", help="also time subtree listing")
+    args = parser.parse_args()
+
+    prefix = f"{DeviceConfigBuilder.STACK_PREFIX_BASE}/{PLATFORM}"
+    builder = DeviceConfigBuilder(PLATFORM, max_workers=args.max_workers)
+
+    header = f"{'parameters':>10}  {'serial (s)':>10}  {'sharded (s)':>11}  {'speedup':>7}"
+    print(header + (f"  {'discovery (s)':>13}" if args.discover else ""))
+    shards = [""] + stack_names() if args.known_shards else None
+    for size in args.sizes:
+        with mock_aws():
+            ssm = boto3.client("ssm", region_name="us-east-1")
+            populate_parameters(ssm, size)
+            add_simulated_latency(ssm, args.latency_ms)
+
+            serial_time, serial = timed(builder.get_parameters_with_prefix, prefix, ssm)
+            sharded_time, sharded = timed(
+                builder.get_parameters_with_prefix_sharded,
+                prefix,
+                ssm,
+                stack_names=shards,
+            )
+            if args.discover:
+                fetcher = ShardedParameterFetcher(ssm)
+                marker_prefix = f"{DeviceConfigBuilder.STACK_HASH_PREFIX_BASE}/{PLATFORM}"
+                discovery_time, _ = timed(fetcher.list_shards, marker_prefix)
+
+        if len(serial) != len(sharded):
+            raise RuntimeError(f"Fetched {len(serial)} serially, but {len(sharded)} sharded")
+        speedup = serial_time / sharded_time
+        row = f"{size:>10}  {serial_time:>10.2f}  {sharded_time:>11.2f}  {speedup:>6.1f}x"
+        print(row + (f"  {discovery_time:>13.2f}" if args.discover else ""))
+
+
+if __name__ == "__main__":
+    main()
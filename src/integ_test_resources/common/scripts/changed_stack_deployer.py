@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+
+import argparse
+import pathlib
+import subprocess
+import sys
+from typing import Callable, Dict, Iterable, List, Optional
+
+import boto3
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from cloud_assembly import CloudAssembly
+from platforms import Platform
+from stack_deploy_scheduler import DEPLOYED, StackDeployResult, StackDeployScheduler
+
+SUPPORTED_PLATFORMS = [platform.value for platform in Platform]
+
+# The CloudFormation stack statuses of stacks that no longer exist
+DELETED_STACK_STATUSES = {"DELETE_COMPLETE"}
+
+
+class ChangedStackDeployer:
+    """
+    Deploys the stacks of a synthesized CDK app whose templates or assets
+    changed since they were last deployed, and skips the others.
+
+    After a stack has been deployed, its fingerprint (see CloudAssembly) is
+    stored in the SSM parameter `/mobile-sdk-deploy/<platform>/<stack>`. A
+    stack is deployed again if its fingerprint differs from the stored one,
+    if no fingerprint is stored, or if the stack no longer exists.
+
+    The changed stacks are deployed by `cdk deploy --app <cdk.out>
+    --exclusively`, concurrently, by a StackDeployScheduler which follows
+    the app's dependency graph. A stack that fails to deploy only holds back
+    the stacks that depend on it.
+    """
+
+    FINGERPRINT_PREFIX_BASE = "/mobile-sdk-deploy"
+    DEFAULT_MAX_WORKERS = StackDeployScheduler.DEFAULT_MAX_WORKERS
+
+    def __init__(
+        self,
+        platform: str,
+        assembly: CloudAssembly,
+        session: Optional[boto3.session.Session] = None,
+        cdk_command: Iterable[str] = ("cdk",),
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        run: Callable[..., subprocess.CompletedProcess] = subprocess.run,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        session = session or boto3.session.Session()
+        self.platform = platform
+        self.assembly = assembly
+        self.ssm = session.client("ssm")
+        self.cloudformation = session.client("cloudformation")
+        self.cdk_command = list(cdk_command)
+        self.max_workers = max_workers
+        self.run = run
+
+    def fingerprint_parameter_name(self, name: str) -> str:
+        return f"{self.FINGERPRINT_PREFIX_BASE}/{self.platform}/{name}"
+
+    def get_deployed_fingerprints(self, names: List[str]) -> Dict[str, str]:
+        """
+        Returns the fingerprints stored for the named stacks, by stack name.
+        Stacks without a stored fingerprint are left out.
+        """
+        fingerprints = {}
+        # get_parameters accepts at most 10 names per call
+        for start in range(0, len(names), 10):
+            batch = names[start : start + 10]
+            response = self.ssm.get_parameters(
+                Names=[self.fingerprint_parameter_name(name) for name in batch]
+            )
+            values = {parameter["Name"]: parameter["Value"] for parameter in response["Parameters"]}
+            for name in batch:
+                parameter_name = self.fingerprint_parameter_name(name)
+                if parameter_name in values:
+                    fingerprints[name] = values[parameter_name]
+        return fingerprints
+
+    def get_existing_stack_names(self) -> set:
+        stack_names = set()
+        for page in self.cloudformation.get_paginator("list_stacks").paginate():
+            for summary in page["StackSummaries"]:
+                if summary["StackStatus"] not in DELETED_STACK_STATUSES:
+                    stack_names.add(summary["StackName"])
+        return stack_names
+
+    def check_names(self, names: Optional[List[str]]) -> List[str]:
+        """
+        Returns `names`, or the names of every stack of the app if None.
+        """
+        names = list(self.assembly.stacks) if names is None else names
+        unknown_names = [name for name in names if name not in self.assembly.stacks]
+        if unknown_names:
+            raise ValueError(
+                f"Unknown stacks {', '.join(unknown_names)}. "
+                f"Known stacks: {', '.join(self.assembly.stacks)}"
+            )
+        return names
+
+    def get_changed_stacks(self, names: Optional[List[str]] = None) -> List[str]:
+        """
+        Returns the names of the stacks, among `names` or every stack of the
+        app, that need to be deployed.
+        """
+        names = self.check_names(names)
+        fingerprints = self.get_deployed_fingerprints(names)
+        existing_stack_names = self.get_existing_stack_names()
+        return [
+            name
+            for name in names
+            if fingerprints.get(name) != self.assembly.stacks[name].fingerprint
+            or self.assembly.stacks[name].stack_name not in existing_stack_names
+        ]
+
+    def deploy_stack(self, name: str) -> bool:
+        """
+        Deploys one stack, and stores its fingerprint if it was deployed.
+        Returns whether it was deployed.
+        """
+        command = self.cdk_command + [
+            "deploy",
+            "--app",
+            self.assembly.directory,
+            "--exclusively",
+            "--require-approval",
+            "never",
+            name,
+        ]
+        result = self.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        if result.returncode != 0:
+            print(f"Failed to deploy {name}:\n{result.stdout}", file=sys.stderr)
+            return False
+        self.ssm.put_parameter(
+            Name=self.fingerprint_parameter_name(name),
+            Value=self.assembly.stacks[name].fingerprint,
+            Type="String",
+            Overwrite=True,
+        )
+        print(f"Deployed {name}", file=sys.stderr)
+        return True
+
+    def deploy(
+        self, names: Optional[List[str]] = None, changed_only: bool = True
+    ) -> Dict[str, StackDeployResult]:
+        """
+        Deploys the changed stacks among `names`, or among every stack of the
+        app, or all of them if `changed_only` is False. Returns the result of
+        each stack, in the order they finished.
+        """
+        names = self.get_changed_stacks(names) if changed_only else self.check_names(names)
+        # A stack waits for the deployed stacks it depends on, even through
+        # stacks that are not deployed
+        dependencies = {
+            name: self.assembly.transitive_dependencies(name) & set(names) for name in names
+        }
+        scheduler = StackDeployScheduler(dependencies, self.deploy_stack, self.max_workers)
+        return scheduler.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Deploys the stacks of a synthesized CDK app changed since their last deploy."
+    )
+    parser.add_argument("platform", choices=SUPPORTED_PLATFORMS)
+    parser.add_argument("stacks", nargs="*", help="stacks to consider, instead of every stack")
+    parser.add_argument("--app", default="cdk.out", help="the synthesized app's directory")
+    parser.add_argument(
+        "--cdk-command", default="cdk", help="command that runs the CDK CLI, e.g. 'npx cdk'"
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=ChangedStackDeployer.DEFAULT_MAX_WORKERS,
+        help="maximum number of stacks deployed at once",
+    )
+    parser.add_argument(
+        "--all", action="store_true", help="deploy every stack, whether it changed or not"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print the stacks to deploy, in dependency waves, and exit",
+    )
+    args = parser.parse_args()
+
+    deployer = ChangedStackDeployer(
+        args.platform,
+        CloudAssembly(args.app),
+        cdk_command=args.cdk_command.split(),
+        max_workers=args.max_workers,
+    )
+    if args.dry_run:
+        if args.all:
+            names = deployer.check_names(args.stacks or None)
+        else:
+            names = deployer.get_changed_stacks(args.stacks or None)
+        for wave in deployer.assembly.waves(names):
+            print(" ".join(wave))
+        sys.exit(0)
+    results = deployer.deploy(args.stacks or None, changed_only=not args.all)
+    for result in results.values():
+        print(f"{result.name}: {result.status} in {result.seconds:.1f}s", file=sys.stderr)
+    failed_stacks = [result.name for result in results.values() if result.status != DEPLOYED]
+    if failed_stacks:
+        sys.exit(f"Failed or skipped {', '.join(failed_stacks)}")
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+from collections import namedtuple
+from typing import Dict, List
+
+STACK_ARTIFACT_TYPE = "aws:cloudformation:stack"
+ASSET_MANIFEST_ARTIFACT_TYPE = "cdk:asset-manifest"
+
+StackArtifact = namedtuple("StackArtifact", "name stack_name dependencies fingerprint")
+
+
+class CloudAssembly:
+    """
+    Reads the stacks of a synthesized CDK app, i.e., of a `cdk.out`
+    directory, with the stacks each one depends on, and a fingerprint of
+    everything `cdk deploy` would send to CloudFormation for it.
+
+    A stack's fingerprint is the SHA-256 hash of its template, its asset
+    manifest, which names each of its assets by a hash of the asset's
+    content, and the deployment properties of its artifact, such as its
+    tags and parameters. Two syntheses of an unchanged stack have the same
+    fingerprint.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json")) as manifest_file:
+            self.manifest = json.load(manifest_file)
+        self.stacks: Dict[str, StackArtifact] = {}
+
+        artifacts = self.manifest.get("artifacts", {})
+        for name, artifact in artifacts.items():
+            if artifact["type"] != STACK_ARTIFACT_TYPE:
+                continue
+            dependencies = [
+                dependency
+                for dependency in artifact.get("dependencies", [])
+                if artifacts.get(dependency, {}).get("type") == STACK_ARTIFACT_TYPE
+            ]
+            properties = artifact.get("properties", {})
+            self.stacks[name] = StackArtifact(
+                name=name,
+                stack_name=properties.get("stackName", name),
+                dependencies=dependencies,
+                fingerprint=self.fingerprint(artifacts, artifact),
+            )
+
+    def fingerprint(self, artifacts: dict, artifact: dict) -> str:
+        properties = artifact.get("properties", {})
+        digest = hashlib.sha256()
+        digest.update(json.dumps(properties, sort_keys=True).encode())
+        with open(os.path.join(self.directory, properties["templateFile"]), "rb") as template:
+            digest.update(template.read())
+        for dependency in sorted(artifact.get("dependencies", [])):
+            dependency_artifact = artifacts.get(dependency, {})
+            if dependency_artifact.get("type") != ASSET_MANIFEST_ARTIFACT_TYPE:
+                continue
+            asset_manifest_file = dependency_artifact["properties"]["file"]
+            with open(os.path.join(self.directory, asset_manifest_file)) as asset_manifest:
+                assets = json.load(asset_manifest)
+            # The manifest's version changes with the CDK, not with the assets
+            assets.pop("version", None)
+            digest.update(json.dumps(assets, sort_keys=True).encode())
+        return digest.hexdigest()
+
+    def waves(self, names: List[str]) -> List[List[str]]:
+        """
+        Groups the named stacks into waves, such that each stack comes after
+        every named stack it depends on, directly or not. The stacks of a
+        wave do not depend on each other, and can be deployed concurrently.
+        Dependencies that are not named are assumed to be deployed already.
+        """
+        remaining = set(names)
+        depends_on = {name: self.transitive_dependencies(name) & remaining for name in names}
+        waves = []
+        while remaining:
+            wave = sorted(name for name in remaining if not depends_on[name] & remaining)
+            if not wave:
+                raise ValueError(f"Circular dependency between {', '.join(sorted(remaining))}")
+            waves.append(wave)
+            remaining.difference_update(wave)
+        return waves
+
+    def transitive_dependencies(self, name: str) -> set:
+        dependencies = set()
+        pending = list(self.stacks[name].dependencies)
+        while pending:
+            dependency = pending.pop()
+            if dependency not in dependencies:
+                dependencies.add(dependency)
+                pending.extend(self.stacks[dependency].dependencies)
+        return dependencies
@@ -1,16 +1,24 @@
 #!/usr/bin/env python3
 
+import argparse
+import hashlib
 import json
 import os
 import pathlib
 import sys
 from collections import namedtuple
-from typing import List, Union
+from contextlib import nullcontext
+from typing import List, Optional, TextIO, Union
 
 import boto3
+from botocore.exceptions import ClientError
 
 sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from device_config_cache import DeviceConfigCache
+from device_config_writer import StreamingDeviceConfigWriter
+from parameter_fetcher import ShardedParameterFetcher
 from platforms import Platform
+from rate_limiter import SharedRateLimiter
 
 SUPPORTED_PLATFORMS = [platform.value for platform in Platform]
 
@@ -32,27 +40,62 @@ class DeviceConfigBuilder:
     the script.
     """
 
-    def __init__(self, platform: str):
+    STACK_HASH_PREFIX_BASE = "/mobile-sdk-stack-hash"
+    """
+    Each stack that stores parameters also stores a version marker of them
+    at <STACK_HASH_PREFIX_BASE>/<platform>/<stack name>, which changes on
+    each deploy that changes a parameter's value. The markers' hashes are
+    used to tell whether a cached config is still current.
+    """
+
+    STACK_SNAPSHOT_PREFIX_BASE = "/mobile-sdk-snapshot"
+    """
+    Each stack that stores parameters also stores its whole package, as a
+    single JSON document, at <STACK_SNAPSHOT_PREFIX_BASE>/<platform>/<stack
+    name>. In snapshot mode, the package data is built from these documents.
+    """
+
+    DEFAULT_MAX_WORKERS = 1
+    """
+    By default, the platform prefix is read with a single serial walk. With
+    more workers, the stacks' subtrees are listed from their hash markers,
+    and read concurrently. Stacks without a marker are then left out.
+    """
+
+    def __init__(
+        self,
+        platform: str,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        cache: Optional[DeviceConfigCache] = None,
+        rate_limiter: Optional[SharedRateLimiter] = None,
+        snapshot: bool = False,
+    ):
         if platform not in SUPPORTED_PLATFORMS:
             raise Exception(f"Platform must be one of: {', '.join(SUPPORTED_PLATFORMS)}")
         self.platform = platform
+        self.max_workers = max_workers
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.snapshot = snapshot
 
     AWSConfig = namedtuple("AWSConfig", "accessKey secretKey sessionToken defaultRegion")
 
     def build_package_data(self, prefix: str, parameters: dict) -> dict:
         all_packages_data = dict()
+        # Branch nodes that have already been created, keyed by their path.
+        # Parameters arrive grouped by stack, so most of them share a parent
+        # with an earlier parameter, and can skip walking the tree.
+        branches = {(): all_packages_data}
+        prefix_len = len(prefix)
         for parameter in parameters:
-            prefix_len = len(prefix)
-            name = parameter["Name"][prefix_len:]
+            segments = DeviceConfigBuilder.split_key(parameter["Name"][prefix_len:])
             value = DeviceConfigBuilder.get_value_for_parameter(parameter)
-            self.add_package_data(all_packages_data, name, value)
+            DeviceConfigBuilder.insert_package_data(branches, segments, value)
         return all_packages_data
 
     def add_package_data(self, all_package_data: dict, key: str, value: str) -> None:
         """
-        This is a helper method used by build_package_data.
-        This is called recursively to explore a nested key path, as
-        described below.
+        Stores a single value into a nested dictionary structure.
 
         Given a key of the form /suitename/foo/bar/baz,
         /suitename/foo/bar/baz is considered to be a key-path into a
@@ -67,23 +110,73 @@ class DeviceConfigBuilder:
             }
           }
         }
+
+        Raises a ValueError if the key-path passes through an existing leaf,
+        or ends on an existing branch.
         """
-        key = key.strip("/")
-        first_slash_pos = key.find("/")
-        if first_slash_pos == -1:
-            # If the key didn't have a '/', its just a simple leaf, and
-            # we can store the value, here.
-            all_package_data[key] = value
-        else:
-            # Otherwise, we need to nest. Pull out the next part of the
-            # path, wrap a dict, and repeat the process on the remainder
-            # of the key.
-            first_part = key[:first_slash_pos]
-            continue_index = first_slash_pos + 1
-            the_rest = key[continue_index:]
-            if first_part not in all_package_data:
-                all_package_data[first_part] = dict()
-            self.add_package_data(all_package_data[first_part], the_rest, value)
+        branches = {(): all_package_data}
+        DeviceConfigBuilder.insert_package_data(branches, DeviceConfigBuilder.split_key(key), value)
+
+    @staticmethod
+    def split_key(key: str) -> List[str]:
+        """
+        Splits a key-path into its segments. Empty segments, as produced by
+        leading, trailing or doubled slashes, are ignored.
+        """
+        segments = key.strip("/").split("/")
+        if "" in segments:
+            segments = [segment for segment in segments if segment] or [""]
+        return segments
+
+    @staticmethod
+    def insert_package_data(branches: dict, segments: List[str], value: str) -> None:
+        """
+        This is a helper method used by build_package_data and
+        add_package_data. It stores the value at the leaf named by the last
+        segment, below the branches named by the preceding segments.
+
+        `branches` maps the path of every known branch, as a tuple of
+        segments, to the dict at that branch. It must contain at least the
+        root, under `()`. New branches are added to it as they are created.
+        """
+        parent_path = tuple(segments[:-1])
+        node = branches.get(parent_path)
+        if node is None:
+            node = DeviceConfigBuilder.create_branches(branches, parent_path)
+
+        leaf = segments[-1]
+        if leaf in node and isinstance(node[leaf], dict):
+            raise ValueError(
+                f"Cannot store a value at '{'/'.join(segments)}', because it already holds "
+                "nested values"
+            )
+        node[leaf] = value
+
+    @staticmethod
+    def create_branches(branches: dict, path: tuple) -> dict:
+        """
+        Walks down from the deepest known ancestor of `path`, creating the
+        missing branches along the way, and returns the branch at `path`.
+        """
+        depth = len(path)
+        while path[:depth] not in branches:
+            depth -= 1
+        node = branches[path[:depth]]
+
+        for index in range(depth, len(path)):
+            segment = path[index]
+            child = node.get(segment)
+            if child is None:
+                child = dict()
+                node[segment] = child
+            elif not isinstance(child, dict):
+                raise ValueError(
+                    f"Cannot store a value below '{'/'.join(path[: index + 1])}', because it "
+                    "already holds a value"
+                )
+            branches[path[: index + 1]] = child
+            node = child
+        return node
 
     @staticmethod
     def get_value_for_parameter(parameter: dict) -> Union[str, List[str]]:
@@ -106,17 +199,130 @@ class DeviceConfigBuilder:
                 parameters.append(parameter)
         return parameters
 
-    def ssm_client(self, aws_config: AWSConfig):
+    def get_parameters_with_prefix_sharded(
+        self, parameter_prefix: str, ssm, stack_names: Optional[List[str]] = None
+    ) -> list:
+        """
+        Same result as get_parameters_with_prefix, but pages each stack's
+        subtree of the prefix concurrently. See ShardedParameterFetcher.
+
+        Unless the caller passes the stacks to read, every stack with a hash
+        marker is read, along with the parameters stored directly beneath the
+        prefix. If the stacks cannot be listed, the prefix is walked serially.
+        """
+        fetcher = ShardedParameterFetcher(ssm, max_workers=self.max_workers)
+        if stack_names is None:
+            stack_names = self.list_stack_shards(fetcher)
+            if stack_names is None:
+                return self.get_parameters_with_prefix(parameter_prefix, ssm)
+        return fetcher.get_parameters(parameter_prefix, stack_names)
+
+    def list_stack_shards(self, fetcher: ShardedParameterFetcher) -> Optional[List[str]]:
+        """
+        Lists the shards of the platform prefix from the stack hash markers.
+        Returns None if no stack has a marker, or if the credentials are not
+        allowed to read the markers.
+        """
+        hash_prefix = self.STACK_HASH_PREFIX_BASE + "/" + self.platform
+        try:
+            shards = fetcher.list_shards(hash_prefix)
+        except ClientError:
+            return None
+        return shards or None
+
+    def get_stack_hashes(self, ssm) -> dict:
         """
-        Builds an SSM client using the provided Config.
+        Returns a dictionary of stack name to the hash of the version marker
+        of the parameters that stack last deployed. Stacks deployed before
+        the markers were introduced are absent.
         """
-        session = boto3.session.Session(
+        hash_prefix = self.STACK_HASH_PREFIX_BASE + "/" + self.platform
+        parameters = self.get_parameters_with_prefix(hash_prefix, ssm)
+        stack_hashes = dict()
+        for parameter in parameters:
+            stack_name = parameter["Name"][len(hash_prefix) :].strip("/")
+            stack_hashes[stack_name] = hashlib.sha256(parameter["Value"].encode()).hexdigest()
+        return stack_hashes
+
+    def list_parameter_subtrees(self, parameter_prefix: str, ssm) -> List[str]:
+        """
+        Returns the sorted names of the subtrees beneath `parameter_prefix`
+        that hold parameters, listed from the parameters' names, which SSM
+        returns 50 per page. Parameters stored directly beneath the prefix
+        are represented by an empty name.
+        """
+        subtrees = set()
+        paginator = ssm.get_paginator("describe_parameters")
+        page_iterator = paginator.paginate(
+            ParameterFilters=[{"Key": "Path", "Option": "Recursive", "Values": [parameter_prefix]}],
+            PaginationConfig={"PageSize": 50},
+        )
+        for page in page_iterator:
+            for parameter in page["Parameters"]:
+                name = parameter["Name"][len(parameter_prefix) :].strip("/")
+                subtrees.add(name.split("/")[0] if "/" in name else "")
+        return sorted(subtrees)
+
+    def get_snapshot_package_data(self, ssm) -> Optional[dict]:
+        """
+        Builds the package data out of the stacks' snapshots. The subtrees
+        of the platform prefix are listed, and those without a snapshot, e.g.
+        of stacks deployed without the `snapshot_parameters` context, are read
+        parameter by parameter, as are parameters stored directly beneath the
+        prefix.
+
+        Returns None if no stack has a snapshot, or if the subtrees cannot be
+        listed, e.g. because the credentials may not describe parameters.
+        """
+        snapshot_prefix = self.STACK_SNAPSHOT_PREFIX_BASE + "/" + self.platform
+        parameters = self.get_parameters_with_prefix(snapshot_prefix, ssm)
+        if not parameters:
+            return None
+
+        parameter_prefix = self.STACK_PREFIX_BASE + "/" + self.platform
+        try:
+            subtrees = self.list_parameter_subtrees(parameter_prefix, ssm)
+        except ClientError:
+            return None
+
+        snapshots = {
+            parameter["Name"][len(snapshot_prefix) :].strip("/"): json.loads(parameter["Value"])
+            for parameter in parameters
+        }
+        package_data = {name: snapshots[name] for name in subtrees if name in snapshots}
+        missing_stacks = [name for name in subtrees if name and name not in snapshots]
+        if missing_stacks:
+            package_data = self.refresh_package_data(ssm, package_data, missing_stacks, [])
+        if "" in subtrees:
+            fetcher = ShardedParameterFetcher(ssm, max_workers=self.max_workers)
+            root_parameters = fetcher.get_parameters_in_shard(parameter_prefix, "")
+            package_data.update(self.build_package_data(parameter_prefix, root_parameters))
+        return package_data
+
+    def session(self, aws_config: AWSConfig) -> boto3.session.Session:
+        return boto3.session.Session(
             aws_access_key_id=aws_config.accessKey,
             aws_secret_access_key=aws_config.secretKey,
             aws_session_token=aws_config.sessionToken,
             region_name=aws_config.defaultRegion,
         )
-        return session.client("ssm")
+
+    def ssm_client(self, aws_config: AWSConfig):
+        """
+        Builds an SSM client using the provided Config. If the builder has a
+        rate limiter, every request the client sends is paced by it.
+        """
+        ssm = self.session(aws_config).client("ssm")
+        if self.rate_limiter is not None:
+            self.rate_limiter.attach(ssm)
+        return ssm
+
+    def account_id(self, aws_config: AWSConfig) -> str:
+        """
+        Returns the account that the provided Config's credentials belong to.
+        """
+        sts = self.session(aws_config).client("sts")
+        return sts.get_caller_identity()["Account"]
 
     def aws_config_from_environment(self) -> AWSConfig:  # noqa: F821
         """
@@ -143,14 +349,92 @@ class DeviceConfigBuilder:
             os.getenv("AWS_DEFAULT_REGION", "us-east-1"),
         )
 
-    def get_package_data(self) -> dict:
-        aws_config = self.aws_config_from_environment()
+    def fetch_package_data(self, ssm) -> dict:
+        """
+        Lists every parameter for the platform, and builds the package data
+        out of them. In snapshot mode, the stacks' snapshots are read instead,
+        unless there are none.
+        """
+        if self.snapshot:
+            package_data = self.get_snapshot_package_data(ssm)
+            if package_data is not None:
+                return package_data
+
         parameter_prefix = self.STACK_PREFIX_BASE + "/" + self.platform
-        ssm = self.ssm_client(aws_config)
-        parameters = self.get_parameters_with_prefix(parameter_prefix, ssm)
+        if self.max_workers > 1:
+            parameters = self.get_parameters_with_prefix_sharded(parameter_prefix, ssm)
+        else:
+            parameters = self.get_parameters_with_prefix(parameter_prefix, ssm)
         package_data = self.build_package_data(parameter_prefix, parameters)
         return package_data
 
+    def refresh_package_data(
+        self, ssm, package_data: dict, changed_stacks: List[str], removed_stacks: List[str]
+    ) -> dict:
+        """
+        Re-reads only the subtrees of the changed stacks, and splices them
+        into a copy of previously built package data. The subtrees of removed
+        stacks, and of changed stacks that no longer have any parameters, are
+        dropped.
+        """
+        refreshed_package_data = dict(package_data)
+        for stack_name in removed_stacks:
+            refreshed_package_data.pop(stack_name, None)
+        if not changed_stacks:
+            return refreshed_package_data
+
+        parameter_prefix = self.STACK_PREFIX_BASE + "/" + self.platform
+        parameters = self.get_parameters_with_prefix_sharded(
+            parameter_prefix, ssm, stack_names=changed_stacks
+        )
+        changed_package_data = self.build_package_data(parameter_prefix, parameters)
+        for stack_name in changed_stacks:
+            if stack_name in changed_package_data:
+                refreshed_package_data[stack_name] = changed_package_data[stack_name]
+            else:
+                refreshed_package_data.pop(stack_name, None)
+        return refreshed_package_data
+
+    def get_package_data(self, aws_config: AWSConfig = None, ssm=None) -> dict:
+        """
+        Returns the package data for the platform. If a cache is configured,
+        and the stack hashes in SSM match the cached entry, the cached
+        package data is returned without listing the platform's parameters.
+        If only some stacks' hashes changed, only those stacks are re-read.
+
+        The AWS config is taken from the environment, and an SSM client is built
+        from it, unless they are provided by the caller.
+        """
+        if aws_config is None:
+            aws_config = self.aws_config_from_environment()
+        if ssm is None:
+            ssm = self.ssm_client(aws_config)
+        if self.cache is None:
+            return self.fetch_package_data(ssm)
+
+        region = aws_config.defaultRegion
+        account = self.account_id(aws_config)
+        stack_hashes = self.get_stack_hashes(ssm)
+        entry = self.cache.read(self.platform, region, account)
+        if self.cache.is_valid(entry, stack_hashes):
+            return entry.packages
+
+        if self.cache.is_refreshable(entry, stack_hashes):
+            changed_stacks, removed_stacks = DeviceConfigCache.stale_stacks(entry, stack_hashes)
+            package_data = self.refresh_package_data(
+                ssm, entry.packages, changed_stacks, removed_stacks
+            )
+            created_at = entry.createdAt
+        else:
+            package_data = self.fetch_package_data(ssm)
+            created_at = None
+
+        if stack_hashes:
+            self.cache.write(
+                self.platform, region, account, stack_hashes, package_data, created_at=created_at
+            )
+        return package_data
+
     def get_credentials_data(self) -> dict:
         aws_config = self.aws_config_from_environment()
         credentials_data = {
@@ -160,7 +444,7 @@ class DeviceConfigBuilder:
         }
         return credentials_data
 
-    def print_device_config(self) -> None:
+    def print_device_config(self, output: TextIO = None, compact: bool = False) -> None:
         """
         Obtains credentials from the environment (only). Builds a Simple
         Systems Manager client, and uses it to read test resources out
@@ -173,11 +457,122 @@ class DeviceConfigBuilder:
         """
         package_data = self.get_package_data()
         credentials_data = self.get_credentials_data()
-        print(json.dumps({"credentials": credentials_data, "packages": package_data}, indent=2))
+        encoded = DeviceConfigBuilder.encode_device_config(credentials_data, package_data, compact)
+        print(encoded, file=output if output is not None else sys.stdout)
+
+    @staticmethod
+    def encode_device_config(credentials_data: dict, package_data: dict, compact: bool) -> str:
+        device_config = {"credentials": credentials_data, "packages": package_data}
+        if compact:
+            return json.dumps(device_config, separators=(",", ":"))
+        return json.dumps(device_config, indent=2)
+
+    def stream_device_config(self, output: TextIO = None, compact: bool = False) -> None:
+        """
+        Like print_device_config, but writes each stack's package as soon as
+        it has been read, instead of building the whole document first. Keys
+        are written in sorted order, so the output is stable across runs.
+
+        Only the packages that are still being read, or are waiting for an
+        earlier package to finish, are held in memory. The cache is not used.
+        """
+        aws_config = self.aws_config_from_environment()
+        ssm = self.ssm_client(aws_config)
+        parameter_prefix = self.STACK_PREFIX_BASE + "/" + self.platform
+        fetcher = ShardedParameterFetcher(ssm, max_workers=self.max_workers)
+        shards = self.list_stack_shards(fetcher) if self.max_workers > 1 else None
+
+        writer = StreamingDeviceConfigWriter(output if output is not None else sys.stdout, compact)
+        writer.begin(self.get_credentials_data())
+
+        # Parameters stored directly beneath the prefix are leaves of the
+        # packages object itself, and are written in order among the stacks.
+        # Without shards, the whole prefix is walked serially, and every
+        # package is written as a root item.
+        if shards is None:
+            root_parameters = self.get_parameters_with_prefix(parameter_prefix, ssm)
+            shards = list()
+        elif "" in shards:
+            root_parameters = fetcher.get_parameters_in_shard(parameter_prefix, "")
+        else:
+            root_parameters = list()
+        root_items = sorted(self.build_package_data(parameter_prefix, root_parameters).items())
+        stack_shards = [shard for shard in shards if shard]
+
+        for shard, parameters in fetcher.iter_shard_parameters(parameter_prefix, stack_shards):
+            while root_items and root_items[0][0] <= shard:
+                name, value = root_items.pop(0)
+                if name == shard:
+                    raise ValueError(
+                        f"Cannot store a value at '{name}', because it already holds nested values"
+                    )
+                writer.write_package(name, value)
+            package_data = self.build_package_data(parameter_prefix, parameters)
+            if shard in package_data:
+                writer.write_package(shard, package_data[shard])
+        for name, value in root_items:
+            writer.write_package(name, value)
+        writer.end()
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        raise Exception("Usage: " + sys.argv[0] + f" <{'|'.join(SUPPORTED_PLATFORMS)}>")
-    config_builder = DeviceConfigBuilder(sys.argv[1])
-    config_builder.print_device_config()
+    parser = argparse.ArgumentParser(description="Prints a device test configuration file.")
+    parser.add_argument("platform", choices=SUPPORTED_PLATFORMS)
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse a locally cached config while the deployed stacks are unchanged",
+    )
+    parser.add_argument("--cache-dir", default=DeviceConfigCache.DEFAULT_CACHE_DIR)
+    parser.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=DeviceConfigCache.DEFAULT_TTL_SECONDS,
+        help="maximum age of a cached config, in seconds",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="write each stack's package as soon as it has been read, with sorted keys",
+    )
+    parser.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="read the snapshots published by each stack, instead of every parameter",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=DeviceConfigBuilder.DEFAULT_MAX_WORKERS,
+        help="read the stacks' subtrees, as listed by their hash markers, on this many threads",
+    )
+    parser.add_argument("--compact", action="store_true", help="write JSON without indentation")
+    parser.add_argument("--output", help="write to this file, instead of standard output")
+    parser.add_argument(
+        "--rate-limit",
+        action="store_true",
+        help="pace SSM requests with a rate limiter shared by every process on this host",
+    )
+    parser.add_argument("--rate-limit-file", default=SharedRateLimiter.DEFAULT_STATE_FILE)
+    args = parser.parse_args()
+    if args.stream and args.cache:
+        parser.error("--stream cannot be combined with --cache")
+    if args.stream and args.snapshot:
+        parser.error("--stream cannot be combined with --snapshot")
+
+    cache = DeviceConfigCache(args.cache_dir, args.cache_ttl) if args.cache else None
+    rate_limiter = SharedRateLimiter(args.rate_limit_file) if args.rate_limit else None
+    config_builder = DeviceConfigBuilder(
+        args.platform,
+        max_workers=args.max_workers,
+        cache=cache,
+        rate_limiter=rate_limiter,
+        snapshot=args.snapshot,
+    )
+    with open(args.output, "w") if args.output else nullcontext(sys.stdout) as output:
+        if args.stream:
+            config_builder.stream_device_config(output, compact=args.compact)
+        else:
+            config_builder.print_device_config(output, compact=args.compact)
+    if rate_limiter is not None:
+        print(rate_limiter.summary(), file=sys.stderr)
@@ -0,0 +1,124 @@
+import json
+import os
+import time
+from collections import namedtuple
+from typing import Callable, List, Optional, Tuple
+
+
+class DeviceConfigCache:
+    """
+    Keeps the `packages` tree built by DeviceConfigBuilder on local disk, so
+    that repeated runs against an unchanged account do not have to list every
+    parameter in the SSM Parameter Store again.
+
+    Entries are keyed by platform, region and account. Each entry records the
+    hashes of the per-stack version markers that were current when the tree
+    was built (see `save_stack_hash_parameter` in `common/parameter_store.py`,
+    and `DeviceConfigBuilder.get_stack_hashes`). An entry may
+    be used as long as it is younger than the TTL, and the hashes stored in
+    SSM still match the recorded ones. A fresh entry whose hashes only differ
+    for some stacks may be brought up to date by re-reading just those stacks.
+
+    The `packages` tree contains test passwords, so cache files are only
+    readable by their owner. Credentials are never cached.
+    """
+
+    DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".aws-amplify", "device-config-cache")
+    DEFAULT_TTL_SECONDS = 60 * 60
+    FORMAT_VERSION = 1
+
+    Entry = namedtuple("Entry", "createdAt stackHashes packages")
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+
+    def path_for(self, platform: str, region: str, account: str) -> str:
+        return os.path.join(self.cache_dir, f"{platform}-{region}-{account}.json")
+
+    def read(self, platform: str, region: str, account: str) -> Optional[Entry]:
+        """
+        Returns the stored entry, or None if there is no usable entry. An
+        unreadable or outdated cache file is treated as a cache miss.
+        """
+        try:
+            with open(self.path_for(platform, region, account), "r") as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if data.get("formatVersion") != DeviceConfigCache.FORMAT_VERSION:
+            return None
+        return DeviceConfigCache.Entry(data["createdAt"], data["stackHashes"], data["packages"])
+
+    def write(
+        self,
+        platform: str,
+        region: str,
+        account: str,
+        stack_hashes: dict,
+        packages: dict,
+        created_at: Optional[float] = None,
+    ) -> Entry:
+        """
+        Stores an entry. `created_at` should be passed when an existing entry
+        is refreshed incrementally, so that the TTL still bounds the age of
+        the stacks that were not re-read.
+        """
+        if created_at is None:
+            created_at = self.clock()
+        entry = DeviceConfigCache.Entry(created_at, stack_hashes, packages)
+        data = {"formatVersion": DeviceConfigCache.FORMAT_VERSION, **entry._asdict()}
+
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        path = self.path_for(platform, region, account)
+        # Write to a temporary file first, so that a concurrent reader never
+        # observes a partially written entry
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        file_descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(file_descriptor, "w") as cache_file:
+            json.dump(data, cache_file)
+        os.replace(temp_path, path)
+        return entry
+
+    def is_fresh(self, entry: Entry) -> bool:
+        return self.clock() - entry.createdAt < self.ttl_seconds
+
+    def is_valid(self, entry: Optional[Entry], stack_hashes: dict) -> bool:
+        """
+        An entry is valid if it is fresh and the stack hashes currently stored
+        in SSM match the ones recorded in the entry. Without any stack hashes,
+        there is nothing to validate against, so the entry is never valid.
+        """
+        if entry is None or not stack_hashes:
+            return False
+        return self.is_fresh(entry) and entry.stackHashes == stack_hashes
+
+    def is_refreshable(self, entry: Optional[Entry], stack_hashes: dict) -> bool:
+        """
+        An entry can be refreshed incrementally if it is fresh, and both the
+        entry and SSM have stack hashes to compare.
+        """
+        if entry is None or not stack_hashes or not entry.stackHashes:
+            return False
+        return self.is_fresh(entry)
+
+    @staticmethod
+    def stale_stacks(entry: Entry, stack_hashes: dict) -> Tuple[List[str], List[str]]:
+        """
+        Compares an entry's stack hashes with the ones currently in SSM.
+        Returns the sorted names of the stacks that were added or changed
+        since the entry was written, and of the stacks that were removed.
+        """
+        changed = [
+            stack_name
+            for stack_name, stack_hash in stack_hashes.items()
+            if entry.stackHashes.get(stack_name) != stack_hash
+        ]
+        removed = [stack_name for stack_name in entry.stackHashes if stack_name not in stack_hashes]
+        return sorted(changed), sorted(removed)
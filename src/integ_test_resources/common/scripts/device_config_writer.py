@@ -0,0 +1,67 @@
+import json
+from typing import Optional, TextIO
+
+
+class StreamingDeviceConfigWriter:
+    """
+    Writes a device config document one package at a time, so that the
+    beginning of the document can be consumed while later packages are still
+    being read out of SSM.
+
+    The output is byte-for-byte what `json.dumps(config, sort_keys=True)`
+    would produce for the complete document, either indented by two spaces,
+    or in compact form. Packages must therefore be written in ascending order
+    of their names.
+    """
+
+    INDENT = 2
+
+    def __init__(self, output: TextIO, compact: bool = False):
+        self.output = output
+        self.compact = compact
+        self.last_package_name: Optional[str] = None
+
+    def begin(self, credentials_data: dict) -> None:
+        self.output.write(
+            "{"
+            + self.newline(1)
+            + self.key("credentials")
+            + self.dumps(credentials_data, 1)
+            + ","
+            + self.newline(1)
+            + self.key("packages")
+            + "{"
+        )
+        self.output.flush()
+
+    def write_package(self, name: str, package_data) -> None:
+        if self.last_package_name is not None and name <= self.last_package_name:
+            raise ValueError(
+                f"Package '{name}' must be written before package '{self.last_package_name}'"
+            )
+        separator = "" if self.last_package_name is None else ","
+        self.output.write(
+            separator + self.newline(2) + self.key(name) + self.dumps(package_data, 2)
+        )
+        self.output.flush()
+        self.last_package_name = name
+
+    def end(self) -> None:
+        if self.last_package_name is not None:
+            self.output.write(self.newline(1))
+        self.output.write("}" + self.newline(0) + "}\n")
+        self.output.flush()
+
+    def newline(self, level: int) -> str:
+        return "" if self.compact else "\n" + " " * (self.INDENT * level)
+
+    def key(self, name: str) -> str:
+        return json.dumps(name) + (":" if self.compact else ": ")
+
+    def dumps(self, value, level: int) -> str:
+        if self.compact:
+            return json.dumps(value, separators=(",", ":"), sort_keys=True)
+        # JSON strings escape their line breaks, so every line break in the
+        # encoded value is structural, and can be re-indented to `level`.
+        encoded = json.dumps(value, indent=self.INDENT, sort_keys=True)
+        return encoded.replace("\n", self.newline(level))
@@ -0,0 +1,120 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator, List, Tuple
+
+
+class ShardedParameterFetcher:
+    """
+    Reads every SSM parameter beneath a path prefix by splitting the prefix
+    into its per-stack subtrees (e.g., `/mobile-sdk/ios/s3`,
+    `/mobile-sdk/ios/iot`), and paging each subtree on its own worker
+    thread.
+
+    `get_parameters_by_path` returns at most 10 parameters per page, so a
+    single paginator over an entire platform prefix turns into a long chain
+    of sequential round trips. The subtrees are listed from a marker
+    namespace holding one parameter per subtree (for device configs, the
+    stack hash markers), which takes a few calls, and the subtrees are then
+    paged concurrently on a bounded thread pool.
+
+    Results are always merged in a fixed order: parameters stored directly
+    beneath the prefix come first, followed by each subtree in sorted order.
+    Within a subtree, parameters are kept in the order SSM returned them.
+    """
+
+    DEFAULT_MAX_WORKERS = 8
+
+    def __init__(self, ssm, max_workers: int = DEFAULT_MAX_WORKERS):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.ssm = ssm
+        self.max_workers = max_workers
+
+    def list_shards(self, marker_prefix: str) -> List[str]:
+        """
+        Returns the sorted names of the parameters stored directly beneath
+        `marker_prefix`, each of which names a subtree, preceded by the empty
+        shard name, which stands for the parameters stored directly beneath
+        the fetched prefix, rather than in a subtree. Returns an empty list if
+        there are no markers, in which case the subtrees cannot be listed.
+
+        Subtrees without a marker are not listed.
+        """
+        marker_prefix = marker_prefix.rstrip("/")
+        shards = set()
+        paginator = self.ssm.get_paginator("get_parameters_by_path")
+        page_iterator = paginator.paginate(Path=marker_prefix, Recursive=False)
+        for page in page_iterator:
+            for parameter in page["Parameters"]:
+                shards.add(parameter["Name"][len(marker_prefix) + 1 :])
+        if not shards:
+            return []
+        return [""] + sorted(shards)
+
+    @staticmethod
+    def shard_path(parameter_prefix: str, shard: str) -> Tuple[str, bool]:
+        """
+        Returns the `get_parameters_by_path` path of a subtree, and whether it
+        is read recursively. The empty shard is read non-recursively, so that
+        it only picks up the parameters that are stored directly beneath the
+        prefix.
+        """
+        if shard:
+            return parameter_prefix.rstrip("/") + "/" + shard, True
+        return parameter_prefix, False
+
+    def get_parameters_in_shard(self, parameter_prefix: str, shard: str) -> list:
+        """
+        Pages through a single subtree. See shard_path.
+        """
+        path, recursive = ShardedParameterFetcher.shard_path(parameter_prefix, shard)
+        parameters = list()
+        paginator = self.ssm.get_paginator("get_parameters_by_path")
+        page_iterator = paginator.paginate(Path=path, Recursive=recursive)
+        for page in page_iterator:
+            parameters.extend(page["Parameters"])
+        return parameters
+
+    def iter_shard_parameters(
+        self, parameter_prefix: str, shards: List[str]
+    ) -> Iterator[Tuple[str, list]]:
+        """
+        Yields a `(shard, parameters)` pair for each of `shards`, in the given
+        order, as soon as that shard and all shards before it have been read.
+
+        At most twice `max_workers` shards are read ahead of the one being
+        consumed, which bounds the number of finished shards held in memory
+        while a slow shard is still being paged.
+        """
+        read_ahead = 2 * self.max_workers
+        remaining_shards = iter(shards)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+
+            def submit(shard: str) -> None:
+                future = executor.submit(self.get_parameters_in_shard, parameter_prefix, shard)
+                pending.append((shard, future))
+
+            pending = deque()
+            for shard in islice(remaining_shards, read_ahead):
+                submit(shard)
+            while pending:
+                shard, future = pending.popleft()
+                parameters = future.result()
+                for next_shard in islice(remaining_shards, 1):
+                    submit(next_shard)
+                yield shard, parameters
+
+    def get_parameters(self, parameter_prefix: str, shards: List[str]) -> list:
+        """
+        Returns the parameters of `shards` beneath `parameter_prefix`, in the
+        same shape as the `Parameters` entries of `get_parameters_by_path`.
+        Include the empty shard to also read the parameters stored directly
+        beneath the prefix. See list_shards.
+        """
+        shards = sorted(set(shards))
+
+        parameters = list()
+        for _, shard_parameters in self.iter_shard_parameters(parameter_prefix, shards):
+            parameters.extend(shard_parameters)
+        return parameters
@@ -0,0 +1,233 @@
+import asyncio
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Awaitable, Callable
+
+
+class SharedRateLimiter:
+    """
+    A token bucket for SSM requests, shared by every process on the host that
+    uses the same state file.
+
+    The bucket's state (its tokens, its current rate, and the host-wide
+    counters) is kept in a small JSON file, and each update happens while
+    holding an exclusive `flock` on that file. A request takes a token before
+    it is sent. When the bucket is empty, the request reserves the next token
+    anyway, and sleeps until that token would have been added, so that
+    waiting requests are spaced out rather than woken all at once.
+
+    The rate adapts to what SSM reports: a throttled request halves it, and
+    every request that was not throttled raises it by `increase`, between
+    `min_rate` and `max_rate` requests per second.
+
+    Attach the limiter to a botocore client with `attach`, or to an
+    aiobotocore client with `attach_async`. Every HTTP attempt, including
+    botocore's own retries, takes a token.
+    """
+
+    DEFAULT_STATE_FILE = os.path.join(
+        os.path.expanduser("~"), ".aws-amplify", "ssm-rate-limiter.json"
+    )
+    DEFAULT_RATE = 20.0
+    DEFAULT_MIN_RATE = 1.0
+    DEFAULT_MAX_RATE = 40.0
+    DEFAULT_BURST = 10.0
+    DEFAULT_INCREASE = 0.1
+    THROTTLING_ERROR_CODES = {"ThrottlingException", "Throttling", "TooManyRequestsException"}
+
+    Counters = namedtuple("Counters", "requests throttles waitSeconds")
+
+    def __init__(
+        self,
+        state_file: str = DEFAULT_STATE_FILE,
+        rate: float = DEFAULT_RATE,
+        min_rate: float = DEFAULT_MIN_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+        burst: float = DEFAULT_BURST,
+        increase: float = DEFAULT_INCREASE,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+        async_sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ):
+        if not 0 < min_rate <= rate <= max_rate:
+            raise ValueError("Expected 0 < min_rate <= rate <= max_rate")
+        if burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.state_file = state_file
+        self.initial_rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.increase = increase
+        self.clock = clock
+        self.sleep = sleep
+        self.async_sleep = async_sleep
+        # The counters of this limiter only. See shared_counters for the
+        # counters of every process using the same state file.
+        self.counters = SharedRateLimiter.Counters(0, 0, 0.0)
+        self.counters_lock = threading.Lock()
+
+    def initial_state(self) -> dict:
+        return {
+            "tokens": self.burst,
+            "rate": self.initial_rate,
+            "updatedAt": self.clock(),
+            "requests": 0,
+            "throttles": 0,
+            "waitSeconds": 0.0,
+        }
+
+    def update_state(self, update: Callable[[dict], None]) -> dict:
+        """
+        Reads the shared state, refills the bucket up to now, applies
+        `update` to it, and writes it back, all under an exclusive lock.
+        Returns the updated state.
+        """
+        state_dir = os.path.dirname(self.state_file)
+        if state_dir:
+            os.makedirs(state_dir, mode=0o700, exist_ok=True)
+        file_descriptor = os.open(self.state_file, os.O_RDWR | os.O_CREAT, 0o600)
+        with os.fdopen(file_descriptor, "r+") as state_file:
+            fcntl.flock(state_file, fcntl.LOCK_EX)
+            try:
+                state = json.loads(state_file.read() or "null")
+            except ValueError:
+                state = None
+            if state is None:
+                state = self.initial_state()
+
+            now = self.clock()
+            elapsed = max(0.0, now - state["updatedAt"])
+            state["tokens"] = min(self.burst, state["tokens"] + elapsed * state["rate"])
+            state["updatedAt"] = now
+            update(state)
+
+            state_file.seek(0)
+            state_file.truncate()
+            json.dump(state, state_file)
+            state_file.flush()
+        return state
+
+    def reserve(self) -> float:
+        """
+        Takes a token, without waiting for it. Returns how long the caller
+        must wait before it is available, in seconds.
+        """
+        wait_seconds = 0.0
+
+        def take_token(state: dict) -> None:
+            nonlocal wait_seconds
+            if state["tokens"] < 1:
+                wait_seconds = (1 - state["tokens"]) / state["rate"]
+            state["tokens"] -= 1
+            state["requests"] += 1
+            state["waitSeconds"] += wait_seconds
+
+        self.update_state(take_token)
+        with self.counters_lock:
+            self.counters = self.counters._replace(
+                requests=self.counters.requests + 1,
+                waitSeconds=self.counters.waitSeconds + wait_seconds,
+            )
+        return wait_seconds
+
+    def acquire(self) -> float:
+        """
+        Takes a token, sleeping until it is available. Returns the time
+        spent waiting, in seconds.
+        """
+        wait_seconds = self.reserve()
+        if wait_seconds > 0:
+            self.sleep(wait_seconds)
+        return wait_seconds
+
+    async def acquire_async(self) -> float:
+        """
+        Same as `acquire`, without blocking the event loop: the state file is
+        locked and updated on the loop's default executor, and the wait for
+        the token is an asyncio sleep.
+        """
+        wait_seconds = await asyncio.get_running_loop().run_in_executor(None, self.reserve)
+        if wait_seconds > 0:
+            await self.async_sleep(wait_seconds)
+        return wait_seconds
+
+    def on_throttle(self) -> None:
+        def slow_down(state: dict) -> None:
+            state["rate"] = max(self.min_rate, state["rate"] / 2)
+            # Tokens added at the old rate would let the next burst through
+            state["tokens"] = min(state["tokens"], 0.0)
+            state["throttles"] += 1
+
+        self.update_state(slow_down)
+        with self.counters_lock:
+            self.counters = self.counters._replace(throttles=self.counters.throttles + 1)
+
+    def on_success(self) -> None:
+        def speed_up(state: dict) -> None:
+            state["rate"] = min(self.max_rate, state["rate"] + self.increase)
+
+        self.update_state(speed_up)
+
+    def rate(self) -> float:
+        return self.update_state(lambda state: None)["rate"]
+
+    def shared_counters(self) -> Counters:
+        state = self.update_state(lambda state: None)
+        return SharedRateLimiter.Counters(
+            state["requests"], state["throttles"], state["waitSeconds"]
+        )
+
+    def summary(self) -> str:
+        """
+        Describes the requests made through this limiter, for the standard
+        error of the scripts that use it.
+        """
+        counters = self.counters
+        return (
+            f"SSM requests: {counters.requests}, throttled: {counters.throttles}, "
+            f"waited: {counters.waitSeconds:.2f}s"
+        )
+
+    def attach(self, client) -> None:
+        """
+        Registers the limiter with a botocore client's events, so that every
+        HTTP attempt the client makes takes a token, and every response
+        adapts the rate.
+        """
+        service_id = client.meta.service_model.service_id.hyphenize()
+        client.meta.events.register(f"before-send.{service_id}", self.before_send)
+        client.meta.events.register(f"needs-retry.{service_id}", self.needs_retry)
+
+    def before_send(self, **kwargs) -> None:
+        self.acquire()
+
+    def needs_retry(self, response=None, **kwargs) -> None:
+        if response is None:
+            return
+        error_code = response[1].get("Error", {}).get("Code")
+        if error_code in self.THROTTLING_ERROR_CODES:
+            self.on_throttle()
+        else:
+            self.on_success()
+
+    def attach_async(self, client) -> None:
+        """
+        Same as `attach`, for an aiobotocore client, whose event handlers are
+        awaited on its event loop.
+        """
+        service_id = client.meta.service_model.service_id.hyphenize()
+        client.meta.events.register(f"before-send.{service_id}", self.before_send_async)
+        client.meta.events.register(f"needs-retry.{service_id}", self.needs_retry_async)
+
+    async def before_send_async(self, **kwargs) -> None:
+        await self.acquire_async()
+
+    async def needs_retry_async(self, response=None, **kwargs) -> None:
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.needs_retry(response=response)
+        )
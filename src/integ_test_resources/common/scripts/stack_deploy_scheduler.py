@@ -0,0 +1,106 @@
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable
+
+DEPLOYED = "deployed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+StackDeployResult = namedtuple("StackDeployResult", "name status seconds")
+
+
+class StackDeployScheduler:
+    """
+    Deploys stacks concurrently, each one as soon as every stack it depends
+    on has been deployed, with at most `max_workers` deploys at once.
+
+    `dependencies` maps each stack to deploy to the stacks it must wait
+    for. `deploy` deploys one stack, and returns whether it succeeded; an
+    exception it raises counts as a failure. A failed stack only holds back
+    the stacks that depend on it, directly or not, which are skipped. Every
+    other stack is still deployed.
+
+    With the star-shaped graph of the integ test apps, where every stack
+    depends on `common`, and `main` on every stack, all the service stacks
+    are deployed together once `common` is, instead of one at a time.
+    """
+
+    DEFAULT_MAX_WORKERS = 4
+
+    def __init__(
+        self,
+        dependencies: Dict[str, Iterable[str]],
+        deploy: Callable[[str], bool],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.dependencies = {name: set(depends_on) for name, depends_on in dependencies.items()}
+        for name, depends_on in self.dependencies.items():
+            unknown_names = depends_on - set(self.dependencies)
+            if unknown_names:
+                raise ValueError(
+                    f"{name} depends on unknown stacks {', '.join(sorted(unknown_names))}"
+                )
+        self.deploy = deploy
+        self.max_workers = max_workers
+
+    def _timed_deploy(self, name: str) -> StackDeployResult:
+        started_at = time.perf_counter()
+        try:
+            succeeded = self.deploy(name)
+        except Exception as error:
+            print(f"Failed to deploy {name}: {error}", file=sys.stderr)
+            succeeded = False
+        return StackDeployResult(
+            name, DEPLOYED if succeeded else FAILED, time.perf_counter() - started_at
+        )
+
+    def run(self) -> Dict[str, StackDeployResult]:
+        """
+        Deploys every stack, and returns the result of each one, in the
+        order they finished. Skipped stacks take no time.
+        """
+        results: Dict[str, StackDeployResult] = {}
+        pending = dict(self.dependencies)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            running = {}
+            while pending or running:
+                self._skip_blocked(pending, results)
+                # Every finished dependency of a pending stack has been deployed
+                for name in sorted(pending):
+                    if all(d in results for d in pending[name]):
+                        running[executor.submit(self._timed_deploy, name)] = name
+                        del pending[name]
+                if not running:
+                    if pending:
+                        raise ValueError(
+                            f"Circular dependency between {', '.join(sorted(pending))}"
+                        )
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    result = future.result()
+                    results[result.name] = result
+        return results
+
+    @staticmethod
+    def _skip_blocked(pending: dict, results: Dict[str, StackDeployResult]) -> None:
+        """
+        Skips the pending stacks that depend on a failed or skipped stack,
+        until none is left.
+        """
+        while True:
+            blocked = [
+                name
+                for name, depends_on in pending.items()
+                if any(results[d].status != DEPLOYED for d in depends_on if d in results)
+            ]
+            if not blocked:
+                return
+            for name in blocked:
+                results[name] = StackDeployResult(name, SKIPPED, 0.0)
+                del pending[name]
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+import pathlib
+import sys
+import unittest
+
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    EndpointConnectionError,
+    ParamValidationError,
+)
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from adaptive_backoff import AdaptiveBackoff, is_retryable
+
+
+def client_error(code: str, status_code: int) -> ClientError:
+    return ClientError(
+        {
+            "Error": {"Code": code, "Message": code},
+            "ResponseMetadata": {"HTTPStatusCode": status_code},
+        },
+        "GetParametersByPath",
+    )
+
+
+class TestAdaptiveBackoff(unittest.TestCase):
+    def setUp(self):
+        self.underTest = AdaptiveBackoff(base_delay=0.1, max_delay=0.5, jitter=lambda: 1.0)
+
+    def test_no_delay_until_throttled(self):
+        self.assertEqual(0.0, self.underTest.next_delay())
+
+    def test_throttles_double_the_delay_up_to_the_maximum(self):
+        delays = list()
+        for _ in range(4):
+            self.underTest.on_throttle()
+            delays.append(self.underTest.next_delay())
+
+        self.assertEqual([0.1, 0.2, 0.4, 0.5], delays)
+
+    def test_successes_halve_the_delay_until_it_is_dropped(self):
+        for _ in range(3):
+            self.underTest.on_throttle()
+
+        self.underTest.on_success()
+        self.assertEqual(0.2, self.underTest.next_delay())
+        self.underTest.on_success()
+        self.underTest.on_success()
+        self.assertEqual(0.0, self.underTest.next_delay())
+
+    def test_delay_is_jittered_by_up_to_half(self):
+        underTest = AdaptiveBackoff(base_delay=0.1, jitter=lambda: 0.0)
+        underTest.on_throttle()
+
+        self.assertEqual(0.05, underTest.next_delay())
+
+    def test_invalid_delays(self):
+        with self.assertRaises(ValueError):
+            AdaptiveBackoff(base_delay=0)
+        with self.assertRaises(ValueError):
+            AdaptiveBackoff(base_delay=1.0, max_delay=0.5)
+
+
+class TestIsRetryable(unittest.TestCase):
+    def test_throttles_are_retryable(self):
+        self.assertTrue(is_retryable(client_error("ThrottlingException", 400)))
+
+    def test_transient_errors_are_retryable(self):
+        self.assertTrue(is_retryable(client_error("InternalServerError", 500)))
+        self.assertTrue(is_retryable(client_error("ServiceUnavailable", 503)))
+        self.assertTrue(is_retryable(client_error("RequestTimeout", 400)))
+
+    def test_connection_errors_are_retryable(self):
+        self.assertTrue(is_retryable(EndpointConnectionError(endpoint_url="https://ssm")))
+        self.assertTrue(is_retryable(ConnectionClosedError(endpoint_url="https://ssm")))
+
+    def test_other_errors_are_not_retryable(self):
+        self.assertFalse(is_retryable(client_error("AccessDeniedException", 400)))
+        self.assertFalse(is_retryable(client_error("ParameterNotFound", 400)))
+        self.assertFalse(is_retryable(ParamValidationError(report="Path is required")))
+
+
+if __name__ == "__main__":
+    unittest.main()
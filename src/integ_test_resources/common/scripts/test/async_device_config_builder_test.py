@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+import boto3
+from botocore.exceptions import ClientError, EndpointConnectionError
+
+try:
+    from moto.server import ThreadedMotoServer
+
+    sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+    from async_device_config_builder import AsyncDeviceConfigBuilder
+    from device_config_builder import DeviceConfigBuilder
+    from rate_limiter import SharedRateLimiter
+
+    ASYNC_DEPENDENCIES_MISSING = None
+except ImportError as error:
+    ASYNC_DEPENDENCIES_MISSING = str(error)
+
+
+class FailingSsm:
+    """
+    Wraps an SSM client, and fails the first `failures` calls with the
+    errors returned by `error`, given the operation name. By default, the
+    calls are throttled.
+    """
+
+    def __init__(self, ssm, failures: int, error=None):
+        self.ssm = ssm
+        self.failures = failures
+        self.error = error if error is not None else self.throttle
+        self.calls = 0
+
+    @staticmethod
+    def throttle(operation_name: str) -> Exception:
+        return ClientError(
+            {
+                "Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"},
+                "ResponseMetadata": {"HTTPStatusCode": 400},
+            },
+            operation_name,
+        )
+
+    def __getattr__(self, operation_name: str):
+        async def call(**kwargs):
+            self.calls += 1
+            if self.calls <= self.failures:
+                raise self.error(operation_name)
+            return await getattr(self.ssm, operation_name)(**kwargs)
+
+        return call
+
+
+@unittest.skipIf(ASYNC_DEPENDENCIES_MISSING, f"requirements-dev.txt: {ASYNC_DEPENDENCIES_MISSING}")
+class TestAsyncDeviceConfigBuilder(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadedMotoServer(ip_address="127.0.0.1", port=0, verbose=False)
+        cls.server.start()
+        host, port = cls.server.get_host_and_port()
+        cls.endpoint_url = f"http://{host}:{port}"
+
+        ssm = boto3.client(
+            "ssm",
+            endpoint_url=cls.endpoint_url,
+            region_name="us-east-1",
+            aws_access_key_id="a",
+            aws_secret_access_key="b",
+        )
+        cls.parameters = {"/mobile-sdk/ios/region": "us-east-1"}
+        for stack in range(5):
+            cls.parameters[f"/mobile-sdk-stack-hash/ios/stack{stack}"] = "marker"
+            for key in range(12):
+                cls.parameters[f"/mobile-sdk/ios/stack{stack}/group{key % 3}/key{key}"] = "value"
+        for name, value in cls.parameters.items():
+            ssm.put_parameter(Name=name, Value=value, Type="String")
+        cls.parameters = {
+            name: value for name, value in cls.parameters.items() if name.startswith("/mobile-sdk/")
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    async def asyncSetUp(self):
+        self.underTest = AsyncDeviceConfigBuilder("ios", max_concurrency=3)
+        self.aws_config = DeviceConfigBuilder.AWSConfig("a", "b", None, "us-east-1")
+        self.ssm = await self.enterAsyncContext(
+            self.underTest.ssm_client(self.aws_config, endpoint_url=self.endpoint_url)
+        )
+
+    async def test_package_data_matches_the_blocking_builder(self):
+        package_data = await self.underTest.get_package_data(self.aws_config, self.ssm)
+
+        expected = DeviceConfigBuilder("ios").build_package_data(
+            "/mobile-sdk/ios",
+            [{"Name": name, "Value": value} for name, value in self.parameters.items()],
+        )
+        self.assertEqual(expected, package_data)
+
+    async def test_parameters_are_grouped_by_stack(self):
+        parameters = await self.underTest.get_parameters_with_prefix("/mobile-sdk/ios", self.ssm)
+
+        names = [parameter["Name"] for parameter in parameters]
+        self.assertEqual(sorted(self.parameters), sorted(names))
+        self.assertEqual("/mobile-sdk/ios/region", names[0])
+        stacks = [name.split("/")[3] for name in names[1:]]
+        self.assertEqual(sorted(stacks), stacks)
+
+    async def test_throttled_requests_are_retried(self):
+        throttling_ssm = FailingSsm(self.ssm, failures=3)
+        self.underTest.backoff.base_delay = 0.001
+
+        package_data = await self.underTest.get_package_data(self.aws_config, throttling_ssm)
+
+        self.assertEqual("us-east-1", package_data["region"])
+        self.assertEqual(5, len([name for name in package_data if name.startswith("stack")]))
+
+    async def test_transient_errors_are_retried(self):
+        def server_error(operation_name: str) -> Exception:
+            return ClientError(
+                {
+                    "Error": {"Code": "InternalServerError", "Message": "Internal error"},
+                    "ResponseMetadata": {"HTTPStatusCode": 500},
+                },
+                operation_name,
+            )
+
+        self.underTest.backoff.base_delay = 0.001
+        for error in [server_error, lambda _: EndpointConnectionError(endpoint_url="http://ssm")]:
+            with self.subTest(error=error):
+                failing_ssm = FailingSsm(self.ssm, failures=2, error=error)
+
+                package_data = await self.underTest.get_package_data(self.aws_config, failing_ssm)
+
+                self.assertEqual("us-east-1", package_data["region"])
+                self.assertEqual(
+                    5, len([name for name in package_data if name.startswith("stack")])
+                )
+
+    @staticmethod
+    def access_denied(operation_name: str) -> Exception:
+        return ClientError(
+            {
+                "Error": {"Code": "AccessDeniedException", "Message": "Denied"},
+                "ResponseMetadata": {"HTTPStatusCode": 400},
+            },
+            operation_name,
+        )
+
+    async def test_other_errors_are_not_retried(self):
+        # The first call lists the stack hash markers, and falls back to a
+        # serial walk, whose first call fails again.
+        failing_ssm = FailingSsm(self.ssm, failures=2, error=self.access_denied)
+
+        with self.assertRaises(ClientError):
+            await self.underTest.get_package_data(self.aws_config, failing_ssm)
+        self.assertEqual(2, failing_ssm.calls)
+
+    async def test_walks_the_prefix_if_markers_cannot_be_read(self):
+        failing_ssm = FailingSsm(self.ssm, failures=1, error=self.access_denied)
+
+        parameters = await self.underTest.get_parameters_with_prefix("/mobile-sdk/ios", failing_ssm)
+
+        self.assertEqual(sorted(self.parameters), sorted(p["Name"] for p in parameters))
+
+    async def test_gives_up_after_max_attempts(self):
+        underTest = AsyncDeviceConfigBuilder("ios", max_attempts=2)
+        underTest.backoff.base_delay = 0.001
+
+        # Listing the markers gives up first, and the serial walk after it.
+        with self.assertRaises(ClientError):
+            await underTest.get_package_data(self.aws_config, FailingSsm(self.ssm, failures=4))
+
+    async def test_requests_take_rate_limiter_tokens(self):
+        temp_dir = self.enterContext(tempfile.TemporaryDirectory())
+        rate_limiter = SharedRateLimiter(os.path.join(temp_dir, "rate-limiter.json"), burst=1.0)
+        underTest = AsyncDeviceConfigBuilder("ios", rate_limiter=rate_limiter)
+        ssm = await self.enterAsyncContext(
+            underTest.ssm_client(self.aws_config, endpoint_url=self.endpoint_url)
+        )
+        requests = list()
+        ssm.meta.events.register(
+            "before-send.ssm", lambda **kwargs: requests.append(kwargs["event_name"])
+        )
+
+        package_data = await underTest.get_package_data(self.aws_config, ssm)
+
+        self.assertEqual("us-east-1", package_data["region"])
+        self.assertEqual(len(requests), rate_limiter.counters.requests)
+        self.assertGreater(rate_limiter.counters.waitSeconds, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import boto3
+from moto import mock_aws
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from batch_device_config_builder import BatchDeviceConfigBuilder
+from device_config_builder import DeviceConfigBuilder
+from rate_limiter import SharedRateLimiter
+
+
+class TestBatchDeviceConfigBuilder(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        # moto sets fake credentials when it starts, so the test credentials
+        # must be patched in after it
+        patches = [
+            mock_aws(),
+            patch.dict(
+                os.environ,
+                {"AWS_ACCESS_KEY_ID": "a", "AWS_SECRET_ACCESS_KEY": "b", "AWS_SESSION_TOKEN": "c"},
+            ),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for region in ["us-east-1", "us-west-2"]:
+            ssm = boto3.client("ssm", region_name=region)
+            for platform in ["ios", "android"]:
+                ssm.put_parameter(
+                    Name=f"/mobile-sdk/{platform}/s3/bucket_name",
+                    Value=f"{platform}-{region}",
+                    Type="String",
+                )
+                ssm.put_parameter(
+                    Name=f"/mobile-sdk/{platform}/iot/endpoint",
+                    Value="endpoint",
+                    Type="String",
+                )
+
+    def test_writes_one_file_per_platform_and_region(self):
+        underTest = BatchDeviceConfigBuilder(
+            ["ios", "android"], ["us-east-1", "us-west-2"], max_workers=2, jobs=2
+        )
+
+        results = underTest.build_all(self.temp_dir.name)
+
+        self.assertEqual(
+            [
+                ("ios", "us-east-1"),
+                ("ios", "us-west-2"),
+                ("android", "us-east-1"),
+                ("android", "us-west-2"),
+            ],
+            [(result.platform, result.region) for result in results],
+        )
+        for result in results:
+            self.assertIsNone(result.error)
+            self.assertEqual(2, result.packageCount)
+            with open(result.path) as device_config_file:
+                device_config = json.load(device_config_file)
+            self.assertEqual(
+                {"accessKey": "a", "secretKey": "b", "sessionToken": "c"},
+                device_config["credentials"],
+            )
+            self.assertEqual(
+                {
+                    "s3": {"bucket_name": f"{result.platform}-{result.region}"},
+                    "iot": {"endpoint": "endpoint"},
+                },
+                device_config["packages"],
+            )
+
+    def test_failed_combination_does_not_stop_the_others(self):
+        underTest = BatchDeviceConfigBuilder(["ios", "android"], ["us-east-1"], jobs=2)
+        fetch_package_data = DeviceConfigBuilder.fetch_package_data
+
+        def fail_for_android(builder, ssm):
+            if builder.platform == "android":
+                raise Exception("Access denied")
+            return fetch_package_data(builder, ssm)
+
+        with patch.object(DeviceConfigBuilder, "fetch_package_data", fail_for_android):
+            results = underTest.build_all(self.temp_dir.name)
+
+        self.assertIsNone(results[0].error)
+        self.assertEqual("Access denied", str(results[1].error))
+        self.assertEqual(["ios-us-east-1.json"], os.listdir(self.temp_dir.name))
+
+        summary = io.StringIO()
+        BatchDeviceConfigBuilder.print_summary(results, 1.0, summary)
+        self.assertIn("failed: Access denied", summary.getvalue())
+
+    def test_ssm_client_pool_is_sized_for_concurrent_platforms(self):
+        underTest = BatchDeviceConfigBuilder(
+            ["ios", "android"], ["us-east-1"], max_workers=8, jobs=4
+        )
+
+        ssm_clients = underTest.ssm_clients(boto3.session.Session())
+
+        self.assertEqual(16, ssm_clients["us-east-1"].meta.config.max_pool_connections)
+
+    def test_requests_take_rate_limiter_tokens(self):
+        rate_limiter = SharedRateLimiter(os.path.join(self.temp_dir.name, "rate-limiter.json"))
+        underTest = BatchDeviceConfigBuilder(["ios"], ["us-east-1"], rate_limiter=rate_limiter)
+        requests = list()
+        ssm_clients = underTest.ssm_clients(boto3.session.Session())
+        ssm_clients["us-east-1"].meta.events.register(
+            "before-send.ssm", lambda **kwargs: requests.append(kwargs["event_name"])
+        )
+
+        with patch.object(underTest, "ssm_clients", return_value=ssm_clients):
+            results = underTest.build_all(os.path.join(self.temp_dir.name, "out"))
+
+        self.assertIsNone(results[0].error)
+        self.assertEqual(len(requests), rate_limiter.counters.requests)
+        self.assertGreater(rate_limiter.counters.requests, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
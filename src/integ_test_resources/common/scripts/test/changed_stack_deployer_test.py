@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import boto3
+from moto import mock_aws
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from changed_stack_deployer import ChangedStackDeployer
+from cloud_assembly import CloudAssembly
+
+DEPLOYED_TEMPLATE = json.dumps({"Resources": {"Topic": {"Type": "AWS::SNS::Topic"}}})
+
+
+def write_assembly(directory: str, templates: dict, dependencies: dict) -> CloudAssembly:
+    """
+    Writes a minimal cloud assembly, with a stack and an asset manifest per
+    template.
+    """
+    artifacts = {}
+    for name, template in templates.items():
+        with open(f"{directory}/{name}.template.json", "w") as template_file:
+            json.dump(template, template_file)
+        with open(f"{directory}/{name}.assets.json", "w") as assets_file:
+            json.dump({"version": "1.0.0", "files": {f"{name}-asset-hash": {}}}, assets_file)
+        artifacts[f"{name}.assets"] = {
+            "type": "cdk:asset-manifest",
+            "properties": {"file": f"{name}.assets.json"},
+        }
+        artifacts[name] = {
+            "type": "aws:cloudformation:stack",
+            "properties": {"templateFile": f"{name}.template.json"},
+            "dependencies": dependencies.get(name, []) + [f"{name}.assets"],
+        }
+    with open(f"{directory}/manifest.json", "w") as manifest_file:
+        json.dump({"version": "1.0.0", "artifacts": artifacts}, manifest_file)
+    return CloudAssembly(directory)
+
+
+class FakeCdk:
+    """
+    Records the stacks it is asked to deploy, and fails to deploy the
+    stacks named in `failing`.
+    """
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.deployed = []
+        self.lock = threading.Lock()
+
+    def __call__(self, command, **kwargs):
+        name = command[-1]
+        with self.lock:
+            self.deployed.append(name)
+        return subprocess.CompletedProcess(command, 1 if name in self.failing else 0, "")
+
+
+class TestChangedStackDeployer(unittest.TestCase):
+    def setUp(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        environment = patch.dict(
+            os.environ,
+            {
+                "AWS_ACCESS_KEY_ID": "testing",
+                "AWS_SECRET_ACCESS_KEY": "testing",
+                "AWS_DEFAULT_REGION": "us-east-1",
+            },
+        )
+        environment.start()
+        self.addCleanup(environment.stop)
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = temp_dir.name
+
+        self.templates = {
+            name: {"Resources": {name: {}}} for name in ["common", "s3", "iot", "main"]
+        }
+        self.dependencies = {"s3": ["common"], "iot": ["common"], "main": ["common", "s3", "iot"]}
+        cloudformation = boto3.client("cloudformation")
+        for name in self.templates:
+            cloudformation.create_stack(StackName=name, TemplateBody=DEPLOYED_TEMPLATE)
+
+    def deployer(self, cdk: FakeCdk) -> ChangedStackDeployer:
+        assembly = write_assembly(self.directory, self.templates, self.dependencies)
+        return ChangedStackDeployer("ios", assembly, run=cdk)
+
+    def test_fingerprint_is_stable(self):
+        first = write_assembly(self.directory, self.templates, self.dependencies)
+        second = write_assembly(self.directory, self.templates, self.dependencies)
+
+        self.assertEqual(first.stacks["s3"].fingerprint, second.stacks["s3"].fingerprint)
+        self.assertNotEqual(first.stacks["s3"].fingerprint, first.stacks["iot"].fingerprint)
+
+    def test_waves_follow_dependencies(self):
+        assembly = write_assembly(self.directory, self.templates, self.dependencies)
+
+        self.assertEqual(
+            [["common"], ["iot", "s3"], ["main"]], assembly.waves(list(self.templates))
+        )
+        self.assertEqual([["iot", "s3"], ["main"]], assembly.waves(["main", "s3", "iot"]))
+
+    def test_deploys_every_stack_first(self):
+        cdk = FakeCdk()
+
+        results = self.deployer(cdk).deploy()
+
+        self.assertEqual({"deployed"}, {result.status for result in results.values()})
+        self.assertEqual("common", cdk.deployed[0])
+        self.assertEqual({"s3", "iot"}, set(cdk.deployed[1:3]))
+        self.assertEqual("main", cdk.deployed[3])
+
+    def test_skips_unchanged_stacks(self):
+        self.deployer(FakeCdk()).deploy()
+        self.templates["iot"] = {"Resources": {"iot": {"Changed": True}}}
+        cdk = FakeCdk()
+
+        self.deployer(cdk).deploy()
+
+        self.assertEqual(["iot"], cdk.deployed)
+
+    def test_deploys_deleted_stacks(self):
+        self.deployer(FakeCdk()).deploy()
+        boto3.client("cloudformation").delete_stack(StackName="s3")
+        cdk = FakeCdk()
+
+        self.deployer(cdk).deploy()
+
+        self.assertEqual(["s3"], cdk.deployed)
+
+    def test_deploys_unchanged_stacks_if_asked(self):
+        self.deployer(FakeCdk()).deploy()
+        cdk = FakeCdk()
+
+        self.deployer(cdk).deploy(["s3", "iot"], changed_only=False)
+
+        self.assertEqual({"s3", "iot"}, set(cdk.deployed))
+
+    def test_isolates_failed_stacks(self):
+        cdk = FakeCdk(failing=["s3"])
+
+        results = self.deployer(cdk).deploy()
+
+        self.assertEqual("failed", results["s3"].status)
+        self.assertEqual("deployed", results["iot"].status)
+        self.assertEqual("skipped", results["main"].status)
+        self.assertNotIn("main", cdk.deployed)
+        retry = FakeCdk()
+        self.deployer(retry).deploy()
+        self.assertEqual(["s3", "main"], retry.deployed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,8 +7,13 @@ import sys
 import unittest
 from unittest.mock import patch
 
+import boto3
+from botocore.exceptions import ClientError
+from moto import mock_aws
+
 sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
 from device_config_builder import DeviceConfigBuilder
+from parameter_fetcher import ShardedParameterFetcher
 
 
 class TestDeviceConfigBuilder(unittest.TestCase):
@@ -78,6 +83,46 @@ class TestDeviceConfigBuilder(unittest.TestCase):
             {"string_with_commas": "foo,bar", "string_list": ["foo", "bar"]}, package_data,
         )
 
+    def test_build_package_data_ignores_empty_segments(self):
+        params = [
+            {"Name": "/mobile-sdk/android/suite//foo/", "Type": "String", "Value": "foo_val"},
+            {"Name": "/mobile-sdk/android/suite/bar", "Type": "String", "Value": "bar_val"},
+        ]
+        prefix = "/mobile-sdk/android"
+
+        package_data = self.underTest.build_package_data(prefix, params)
+
+        self.assertEqual({"suite": {"foo": "foo_val", "bar": "bar_val"}}, package_data)
+
+    def test_build_package_data_with_value_below_leaf(self):
+        params = [
+            {"Name": "/mobile-sdk/android/suite/foo", "Type": "String", "Value": "foo_val"},
+            {"Name": "/mobile-sdk/android/suite/foo/bar", "Type": "String", "Value": "bar_val"},
+        ]
+        prefix = "/mobile-sdk/android"
+
+        with self.assertRaisesRegex(
+            ValueError, "below 'suite/foo', because it already holds a value"
+        ):
+            self.underTest.build_package_data(prefix, params)
+
+    def test_build_package_data_with_value_at_branch(self):
+        params = [
+            {"Name": "/mobile-sdk/android/suite/foo/bar", "Type": "String", "Value": "bar_val"},
+            {"Name": "/mobile-sdk/android/suite/foo", "Type": "StringList", "Value": "a,b"},
+        ]
+        prefix = "/mobile-sdk/android"
+
+        with self.assertRaisesRegex(ValueError, "'suite/foo', because it already holds nested"):
+            self.underTest.build_package_data(prefix, params)
+
+    def test_add_package_data(self):
+        package_data = {"suite": {"foo": "foo_val"}}
+
+        self.underTest.add_package_data(package_data, "/suite/bar/baz", "baz_val")
+
+        self.assertEqual({"suite": {"foo": "foo_val", "bar": {"baz": "baz_val"}}}, package_data)
+
     def test_get_credential_data(self):
         with patch.dict(
             os.environ,
@@ -116,6 +161,184 @@ class TestDeviceConfigBuilder(unittest.TestCase):
                 aws_config,
             )
 
+    def test_stack_hashes_change_with_deployed_values(self):
+        def stack_hashes(bucket_name):
+            marker = json.dumps({"definition": "abc", "values": {"bucket_name": bucket_name}})
+            parameters = [{"Name": "/mobile-sdk-stack-hash/android/s3", "Value": marker}]
+            with patch.object(
+                DeviceConfigBuilder, "get_parameters_with_prefix", return_value=parameters
+            ):
+                return self.underTest.get_stack_hashes(None)
+
+        # A resource replaced behind the same logical ID changes the marker's deployed values
+        self.assertEqual(stack_hashes("bucket-1"), stack_hashes("bucket-1"))
+        self.assertNotEqual(stack_hashes("bucket-1")["s3"], stack_hashes("bucket-2")["s3"])
+
+    def test_fetch_walks_the_prefix_serially_by_default(self):
+        with patch.object(
+            DeviceConfigBuilder,
+            "get_parameters_with_prefix",
+            return_value=TestDeviceConfigBuilder.load_parameters(),
+        ) as get_parameters, patch.object(ShardedParameterFetcher, "list_shards") as list_shards:
+            package_data = self.underTest.fetch_package_data(None)
+
+        get_parameters.assert_called_once_with("/mobile-sdk/android", None)
+        list_shards.assert_not_called()
+        self.assertEqual(["apigateway", "core"], sorted(package_data))
+
+    def test_sharded_fetch_walks_the_prefix_if_markers_cannot_be_read(self):
+        underTest = DeviceConfigBuilder("android", max_workers=4)
+        access_denied = ClientError(
+            {"Error": {"Code": "AccessDeniedException", "Message": "Denied"}},
+            "GetParametersByPath",
+        )
+        for list_shards in [[], access_denied]:
+            with self.subTest(list_shards=list_shards), patch.object(
+                ShardedParameterFetcher, "list_shards", side_effect=[list_shards]
+            ), patch.object(
+                DeviceConfigBuilder,
+                "get_parameters_with_prefix",
+                return_value=TestDeviceConfigBuilder.load_parameters(),
+            ) as get_parameters:
+                package_data = underTest.fetch_package_data(None)
+
+            get_parameters.assert_called_once_with("/mobile-sdk/android", None)
+            self.assertEqual(["apigateway", "core"], sorted(package_data))
+
+    def test_snapshot_package_data(self):
+        underTest = DeviceConfigBuilder("android", snapshot=True)
+        snapshots = [
+            {
+                "Name": "/mobile-sdk-snapshot/android/apigateway",
+                "Type": "String",
+                "Value": '{"api_key": "someapikeyhere"}',
+            },
+            {
+                "Name": "/mobile-sdk-snapshot/android/core",
+                "Type": "String",
+                "Value": '{"nested": {"pools": ["a", "b"]}}',
+            },
+        ]
+        with patch.object(
+            DeviceConfigBuilder, "get_parameters_with_prefix", return_value=snapshots
+        ) as get_parameters, patch.object(
+            DeviceConfigBuilder, "list_parameter_subtrees", return_value=["apigateway", "core"]
+        ), patch.object(
+            DeviceConfigBuilder, "get_parameters_with_prefix_sharded"
+        ) as get_parameters_sharded:
+            package_data = underTest.fetch_package_data(None)
+
+        get_parameters.assert_called_once_with("/mobile-sdk-snapshot/android", None)
+        get_parameters_sharded.assert_not_called()
+        self.assertEqual(
+            {
+                "apigateway": {"api_key": "someapikeyhere"},
+                "core": {"nested": {"pools": ["a", "b"]}},
+            },
+            package_data,
+        )
+
+    def test_snapshot_drops_stacks_without_parameters(self):
+        underTest = DeviceConfigBuilder("android", snapshot=True)
+        snapshots = [
+            {
+                "Name": "/mobile-sdk-snapshot/android/apigateway",
+                "Type": "String",
+                "Value": '{"api_key": "someapikeyhere"}',
+            },
+        ]
+        with patch.object(
+            DeviceConfigBuilder, "get_parameters_with_prefix", return_value=snapshots
+        ), patch.object(DeviceConfigBuilder, "list_parameter_subtrees", return_value=[]):
+            package_data = underTest.fetch_package_data(None)
+
+        self.assertEqual({}, package_data)
+
+    def test_snapshot_reads_stacks_without_snapshot(self):
+        underTest = DeviceConfigBuilder("android", snapshot=True)
+        snapshots = [
+            {
+                "Name": "/mobile-sdk-snapshot/android/apigateway",
+                "Type": "String",
+                "Value": '{"api_key": "someapikeyhere"}',
+            },
+        ]
+        core_parameters = [
+            {"Name": "/mobile-sdk/android/core/identity_pool_id", "Type": "String", "Value": "id"}
+        ]
+        with patch.object(
+            DeviceConfigBuilder, "get_parameters_with_prefix", return_value=snapshots
+        ), patch.object(
+            DeviceConfigBuilder, "list_parameter_subtrees", return_value=["apigateway", "core"]
+        ), patch.object(
+            DeviceConfigBuilder, "get_parameters_with_prefix_sharded", return_value=core_parameters
+        ) as get_parameters_sharded:
+            package_data = underTest.fetch_package_data(None)
+
+        get_parameters_sharded.assert_called_once_with(
+            "/mobile-sdk/android", None, stack_names=["core"]
+        )
+        self.assertEqual(
+            {"apigateway": {"api_key": "someapikeyhere"}, "core": {"identity_pool_id": "id"}},
+            package_data,
+        )
+
+    def test_snapshot_falls_back_if_subtrees_cannot_be_listed(self):
+        underTest = DeviceConfigBuilder("android", snapshot=True)
+        snapshots = [
+            {
+                "Name": "/mobile-sdk-snapshot/android/apigateway",
+                "Type": "String",
+                "Value": '{"api_key": "someapikeyhere"}',
+            },
+        ]
+        access_denied = ClientError(
+            {"Error": {"Code": "AccessDeniedException", "Message": "Denied"}},
+            "DescribeParameters",
+        )
+        with patch.object(
+            DeviceConfigBuilder,
+            "get_parameters_with_prefix",
+            side_effect=[snapshots, TestDeviceConfigBuilder.load_parameters()],
+        ) as get_parameters, patch.object(
+            DeviceConfigBuilder, "list_parameter_subtrees", side_effect=access_denied
+        ):
+            package_data = underTest.fetch_package_data(None)
+
+        get_parameters.assert_called_with("/mobile-sdk/android", None)
+        self.assertEqual(["apigateway", "core"], sorted(package_data))
+
+    def test_list_parameter_subtrees(self):
+        with mock_aws():
+            ssm = boto3.client("ssm", region_name="us-east-1")
+            for name in [
+                "/mobile-sdk/android/region",
+                "/mobile-sdk/android/core/identity_pool_id",
+                "/mobile-sdk/android/core/nested/pool",
+                "/mobile-sdk/android/s3/bucket",
+                "/mobile-sdk/ios/iot/endpoint",
+                "/mobile-sdk-snapshot/android/apigateway",
+            ]:
+                ssm.put_parameter(Name=name, Value="value", Type="String")
+
+            subtrees = self.underTest.list_parameter_subtrees("/mobile-sdk/android", ssm)
+
+        self.assertEqual(["", "core", "s3"], subtrees)
+
+    def test_snapshot_falls_back_when_missing(self):
+        underTest = DeviceConfigBuilder("android", max_workers=2, snapshot=True)
+        with patch.object(
+            DeviceConfigBuilder, "get_parameters_with_prefix", return_value=[]
+        ), patch.object(
+            DeviceConfigBuilder,
+            "get_parameters_with_prefix_sharded",
+            return_value=TestDeviceConfigBuilder.load_parameters(),
+        ) as get_parameters_sharded:
+            package_data = underTest.fetch_package_data(None)
+
+        get_parameters_sharded.assert_called_once_with("/mobile-sdk/android", None)
+        self.assertEqual(["apigateway", "core"], sorted(package_data))
+
     @staticmethod
     def load_parameters():
         """
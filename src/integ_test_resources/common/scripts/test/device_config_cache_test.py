@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pathlib
+import stat
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from device_config_builder import DeviceConfigBuilder
+from device_config_cache import DeviceConfigCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestDeviceConfigCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.cache = DeviceConfigCache(self.temp_dir.name, ttl_seconds=60, clock=self.clock)
+        self.stack_hashes = {"s3": "hash1", "iot": "hash2"}
+        self.packages = {"s3": {"bucket_name": "bucket"}, "iot": {"endpoint": "endpoint"}}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_read_without_entry(self):
+        self.assertIsNone(self.cache.read("ios", "us-east-1", "000000000000"))
+
+    def test_write_then_read(self):
+        self.cache.write("ios", "us-east-1", "000000000000", self.stack_hashes, self.packages)
+
+        entry = self.cache.read("ios", "us-east-1", "000000000000")
+
+        self.assertEqual(DeviceConfigCache.Entry(1000.0, self.stack_hashes, self.packages), entry)
+        self.assertIsNone(self.cache.read("ios", "us-west-2", "000000000000"))
+        self.assertIsNone(self.cache.read("android", "us-east-1", "000000000000"))
+
+    def test_cache_file_is_private(self):
+        self.cache.write("ios", "us-east-1", "000000000000", self.stack_hashes, self.packages)
+
+        path = self.cache.path_for("ios", "us-east-1", "000000000000")
+        self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+
+    def test_corrupt_cache_file_is_a_miss(self):
+        os.makedirs(self.temp_dir.name, exist_ok=True)
+        with open(self.cache.path_for("ios", "us-east-1", "000000000000"), "w") as cache_file:
+            cache_file.write("{not json")
+
+        self.assertIsNone(self.cache.read("ios", "us-east-1", "000000000000"))
+
+    def test_is_valid(self):
+        entry = self.cache.write(
+            "ios", "us-east-1", "000000000000", self.stack_hashes, self.packages
+        )
+
+        self.assertTrue(self.cache.is_valid(entry, {"iot": "hash2", "s3": "hash1"}))
+        self.assertFalse(self.cache.is_valid(entry, {"iot": "hash3", "s3": "hash1"}))
+        self.assertFalse(self.cache.is_valid(entry, {"s3": "hash1"}))
+        self.assertFalse(self.cache.is_valid(entry, {}))
+        self.assertFalse(self.cache.is_valid(None, self.stack_hashes))
+
+        self.clock.now += 60
+        self.assertFalse(self.cache.is_valid(entry, self.stack_hashes))
+
+    def test_is_refreshable(self):
+        entry = self.cache.write(
+            "ios", "us-east-1", "000000000000", self.stack_hashes, self.packages
+        )
+
+        self.assertTrue(self.cache.is_refreshable(entry, {"iot": "hash3"}))
+        self.assertFalse(self.cache.is_refreshable(entry, {}))
+        self.assertFalse(self.cache.is_refreshable(None, {"iot": "hash3"}))
+
+        self.clock.now += 60
+        self.assertFalse(self.cache.is_refreshable(entry, {"iot": "hash3"}))
+
+    def test_write_keeps_created_at(self):
+        self.clock.now += 30
+        entry = self.cache.write(
+            "ios", "us-east-1", "000000000000", {}, self.packages, created_at=1000.0
+        )
+
+        self.assertEqual(1000.0, entry.createdAt)
+
+    def test_stale_stacks(self):
+        entry = DeviceConfigCache.Entry(
+            1000.0, {"s3": "hash1", "iot": "hash2", "sns": "hash3"}, self.packages
+        )
+
+        changed, removed = DeviceConfigCache.stale_stacks(
+            entry, {"s3": "hash1", "iot": "hash4", "sqs": "hash5"}
+        )
+
+        self.assertEqual(["iot", "sqs"], changed)
+        self.assertEqual(["sns"], removed)
+
+
+class TestDeviceConfigBuilderWithCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.cache = DeviceConfigCache(self.temp_dir.name, ttl_seconds=60, clock=self.clock)
+        self.underTest = DeviceConfigBuilder("ios", cache=self.cache)
+        self.environment = patch.dict(os.environ, {"AWS_DEFAULT_REGION": "us-east-1"})
+        self.environment.start()
+        for method, value in [
+            ("ssm_client", None),
+            ("account_id", "000000000000"),
+            ("get_stack_hashes", {"s3": "hash1"}),
+            ("fetch_package_data", {"s3": {"bucket_name": "bucket"}}),
+        ]:
+            patcher = patch.object(DeviceConfigBuilder, method, return_value=value)
+            setattr(self, method, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.environment.stop()
+        self.temp_dir.cleanup()
+
+    def test_warm_cache_skips_listing(self):
+        self.assertEqual({"s3": {"bucket_name": "bucket"}}, self.underTest.get_package_data())
+        self.assertEqual({"s3": {"bucket_name": "bucket"}}, self.underTest.get_package_data())
+
+        self.assertEqual(1, self.fetch_package_data.call_count)
+
+    def test_expired_cache_lists_again(self):
+        self.underTest.get_package_data()
+        self.clock.now += 60
+        self.underTest.get_package_data()
+
+        self.assertEqual(2, self.fetch_package_data.call_count)
+
+    def test_changed_stack_hash_refreshes_only_that_stack(self):
+        self.get_stack_hashes.return_value = {"s3": "hash1", "iot": "hash1", "sns": "hash1"}
+        self.fetch_package_data.return_value = {
+            "s3": {"bucket_name": "bucket"},
+            "iot": {"endpoint": "old_endpoint", "policy_name": "old_policy"},
+            "sns": {"topic_arn": "topic"},
+        }
+        self.underTest.get_package_data()
+
+        self.get_stack_hashes.return_value = {"s3": "hash1", "iot": "hash2"}
+        changed_parameters = [
+            {"Name": "/mobile-sdk/ios/iot/endpoint", "Type": "String", "Value": "new_endpoint"}
+        ]
+        with patch.object(
+            DeviceConfigBuilder,
+            "get_parameters_with_prefix_sharded",
+            return_value=changed_parameters,
+        ) as get_parameters:
+            package_data = self.underTest.get_package_data()
+
+        get_parameters.assert_called_once_with("/mobile-sdk/ios", None, stack_names=["iot"])
+        self.assertEqual(1, self.fetch_package_data.call_count)
+        self.assertEqual(
+            {"s3": {"bucket_name": "bucket"}, "iot": {"endpoint": "new_endpoint"}},
+            package_data,
+        )
+        entry = self.cache.read("ios", "us-east-1", "000000000000")
+        self.assertEqual({"s3": "hash1", "iot": "hash2"}, entry.stackHashes)
+        self.assertEqual(package_data, entry.packages)
+
+    def test_no_stack_hashes_is_never_cached(self):
+        self.get_stack_hashes.return_value = {}
+        self.underTest.get_package_data()
+        self.underTest.get_package_data()
+
+        self.assertEqual(2, self.fetch_package_data.call_count)
+        self.assertIsNone(self.cache.read("ios", "us-east-1", "000000000000"))
+
+
+class TestDeviceConfigCacheWithVersionMarkers(unittest.TestCase):
+    """
+    Runs cached builds against the version markers stored in SSM, and checks
+    that a stack whose resources were replaced is read again.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        cache = DeviceConfigCache(self.temp_dir.name, ttl_seconds=60, clock=FakeClock())
+        self.underTest = DeviceConfigBuilder("ios", cache=cache)
+        self.deployed = {"s3": "bucket-1", "iot": "endpoint-1"}
+        for patcher in [
+            patch.dict(os.environ, {"AWS_DEFAULT_REGION": "us-east-1"}),
+            patch.object(DeviceConfigBuilder, "ssm_client", return_value=None),
+            patch.object(DeviceConfigBuilder, "account_id", return_value="000000000000"),
+            patch.object(
+                DeviceConfigBuilder,
+                "get_parameters_with_prefix",
+                side_effect=lambda prefix, ssm: self.markers(),
+            ),
+            patch.object(
+                DeviceConfigBuilder,
+                "fetch_package_data",
+                side_effect=lambda ssm: {
+                    stack_name: {"id": value} for stack_name, value in self.deployed.items()
+                },
+            ),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def markers(self) -> list:
+        """
+        The version markers as CloudFormation resolves them: the definitions
+        are unchanged, only the deployed physical IDs differ.
+        """
+        return [
+            {
+                "Name": f"/mobile-sdk-stack-hash/ios/{stack_name}",
+                "Value": json.dumps({"definition": "abc", "values": {"id": value}}),
+            }
+            for stack_name, value in self.deployed.items()
+        ]
+
+    def test_replaced_resource_is_read_again(self):
+        self.underTest.get_package_data()
+
+        self.deployed["s3"] = "bucket-2"
+        changed_parameters = [
+            {"Name": "/mobile-sdk/ios/s3/id", "Type": "String", "Value": "bucket-2"}
+        ]
+        with patch.object(
+            DeviceConfigBuilder,
+            "get_parameters_with_prefix_sharded",
+            return_value=changed_parameters,
+        ) as get_parameters:
+            package_data = self.underTest.get_package_data()
+
+        get_parameters.assert_called_once_with("/mobile-sdk/ios", None, stack_names=["s3"])
+        self.assertEqual({"s3": {"id": "bucket-2"}, "iot": {"id": "endpoint-1"}}, package_data)
+
+
+if __name__ == "__main__":
+    unittest.main()
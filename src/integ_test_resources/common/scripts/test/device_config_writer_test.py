@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import io
+import json
+import os
+import pathlib
+import sys
+import unittest
+from unittest.mock import patch
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from device_config_builder import DeviceConfigBuilder
+from device_config_writer import StreamingDeviceConfigWriter
+from parameter_fetcher import ShardedParameterFetcher
+
+
+class TestStreamingDeviceConfigWriter(unittest.TestCase):
+    def setUp(self):
+        self.credentials = {"accessKey": "a", "secretKey": "b", "sessionToken": "c"}
+        self.packages = {
+            "iot": {"endpoint": "endpoint", "custom": {"token": "allow", "name": "auth"}},
+            "region": "us-east-1",
+            "s3": {"buckets": ["one", "two"]},
+        }
+
+    def write(self, packages: dict, compact: bool) -> str:
+        output = io.StringIO()
+        writer = StreamingDeviceConfigWriter(output, compact=compact)
+        writer.begin(self.credentials)
+        for name in sorted(packages):
+            writer.write_package(name, packages[name])
+        writer.end()
+        return output.getvalue()
+
+    def test_indented_output_matches_json_dumps(self):
+        expected = json.dumps(
+            {"credentials": self.credentials, "packages": self.packages}, indent=2, sort_keys=True
+        )
+
+        self.assertEqual(expected + "\n", self.write(self.packages, compact=False))
+
+    def test_compact_output_matches_json_dumps(self):
+        expected = json.dumps(
+            {"credentials": self.credentials, "packages": self.packages},
+            separators=(",", ":"),
+            sort_keys=True,
+        )
+
+        self.assertEqual(expected + "\n", self.write(self.packages, compact=True))
+
+    def test_output_without_packages(self):
+        for compact in [False, True]:
+            output = self.write({}, compact=compact)
+            self.assertEqual({"credentials": self.credentials, "packages": {}}, json.loads(output))
+
+    def test_packages_must_be_sorted(self):
+        writer = StreamingDeviceConfigWriter(io.StringIO())
+        writer.begin(self.credentials)
+        writer.write_package("s3", {})
+
+        with self.assertRaises(ValueError):
+            writer.write_package("iot", {})
+
+
+class TestStreamDeviceConfig(unittest.TestCase):
+    def setUp(self):
+        shard_parameters = {
+            "": [{"Name": "/mobile-sdk/ios/region", "Value": "us-east-1"}],
+            "iot": [{"Name": "/mobile-sdk/ios/iot/endpoint", "Value": "endpoint"}],
+            "s3": [{"Name": "/mobile-sdk/ios/s3/bucket", "Value": "bucket"}],
+        }
+        patches = [
+            patch.dict(os.environ, {"AWS_ACCESS_KEY_ID": "a", "AWS_SECRET_ACCESS_KEY": "b"}),
+            patch.object(DeviceConfigBuilder, "ssm_client"),
+            patch.object(ShardedParameterFetcher, "list_shards", return_value=["", "iot", "s3"]),
+            patch.object(
+                ShardedParameterFetcher,
+                "get_parameters_in_shard",
+                side_effect=lambda prefix, shard: shard_parameters[shard],
+            ),
+        ]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_stream_device_config(self):
+        output = io.StringIO()
+
+        DeviceConfigBuilder("ios", max_workers=2).stream_device_config(output)
+
+        self.assertEqual(
+            {
+                "credentials": {"accessKey": "a", "secretKey": "b", "sessionToken": None},
+                "packages": {
+                    "iot": {"endpoint": "endpoint"},
+                    "region": "us-east-1",
+                    "s3": {"bucket": "bucket"},
+                },
+            },
+            json.loads(output.getvalue()),
+        )
+        self.assertEqual(
+            ["iot", "region", "s3"], list(json.loads(output.getvalue())["packages"].keys())
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
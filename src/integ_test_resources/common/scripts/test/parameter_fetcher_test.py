@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+import pathlib
+import sys
+import threading
+import unittest
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from parameter_fetcher import ShardedParameterFetcher
+
+
+class FakeSsm:
+    """
+    A minimal, thread-safe stand-in for an SSM client, which answers
+    get_parameters_by_path from an in-memory list of parameters, a few
+    parameters per page.
+    """
+
+    PAGE_SIZE = 2
+
+    def __init__(self, parameters: list):
+        self.parameters = parameters
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def get_paginator(self, operation_name: str):
+        return FakePaginator(self, operation_name)
+
+    def matching(self, operation_name: str, kwargs: dict) -> list:
+        with self.lock:
+            self.calls.append((operation_name, kwargs))
+        path = kwargs["Path"].rstrip("/") + "/"
+        matches = [p for p in self.parameters if p["Name"].startswith(path)]
+        if not kwargs["Recursive"]:
+            matches = [p for p in matches if "/" not in p["Name"][len(path) :]]
+        return matches
+
+
+class FakePaginator:
+    def __init__(self, ssm: FakeSsm, operation_name: str):
+        self.ssm = ssm
+        self.operation_name = operation_name
+
+    def paginate(self, **kwargs):
+        matches = self.ssm.matching(self.operation_name, kwargs)
+        for start in range(0, len(matches), FakeSsm.PAGE_SIZE):
+            yield {"Parameters": matches[start : start + FakeSsm.PAGE_SIZE]}
+
+
+def parameter(name: str) -> dict:
+    return {"Name": name, "Type": "String", "Value": name.rsplit("/", 1)[-1]}
+
+
+class TestShardedParameterFetcher(unittest.TestCase):
+    def setUp(self):
+        self.parameters = [
+            parameter("/mobile-sdk/ios/s3/bucket_name"),
+            parameter("/mobile-sdk/ios/iot/endpoint"),
+            parameter("/mobile-sdk/ios/iot/policy_name"),
+            parameter("/mobile-sdk/ios/iot/custom/token"),
+            parameter("/mobile-sdk/ios/region"),
+            parameter("/mobile-sdk/ios/apigateway/api_key"),
+            parameter("/mobile-sdk/android/s3/bucket_name"),
+            parameter("/mobile-sdk-stack-hash/ios/s3"),
+            parameter("/mobile-sdk-stack-hash/ios/iot"),
+            parameter("/mobile-sdk-stack-hash/ios/apigateway"),
+            parameter("/mobile-sdk-stack-hash/android/s3"),
+        ]
+        self.shards = ["", "apigateway", "iot", "s3"]
+
+    def test_list_shards(self):
+        ssm = FakeSsm(self.parameters)
+        fetcher = ShardedParameterFetcher(ssm)
+
+        shards = fetcher.list_shards("/mobile-sdk-stack-hash/ios")
+
+        self.assertEqual(self.shards, shards)
+        self.assertEqual(
+            [
+                (
+                    "get_parameters_by_path",
+                    {"Path": "/mobile-sdk-stack-hash/ios", "Recursive": False},
+                )
+            ],
+            ssm.calls,
+        )
+
+    def test_list_shards_without_markers(self):
+        fetcher = ShardedParameterFetcher(FakeSsm(self.parameters))
+
+        self.assertEqual([], fetcher.list_shards("/mobile-sdk-stack-hash/macos"))
+
+    def test_get_parameters_merges_shards_in_fixed_order(self):
+        fetcher = ShardedParameterFetcher(FakeSsm(self.parameters), max_workers=4)
+
+        parameters = fetcher.get_parameters("/mobile-sdk/ios", ["s3", "iot", "", "apigateway"])
+
+        self.assertEqual(
+            [
+                "/mobile-sdk/ios/region",
+                "/mobile-sdk/ios/apigateway/api_key",
+                "/mobile-sdk/ios/iot/endpoint",
+                "/mobile-sdk/ios/iot/policy_name",
+                "/mobile-sdk/ios/iot/custom/token",
+                "/mobile-sdk/ios/s3/bucket_name",
+            ],
+            [p["Name"] for p in parameters],
+        )
+
+    def test_get_parameters_pages_each_shard_once(self):
+        ssm = FakeSsm(self.parameters)
+        fetcher = ShardedParameterFetcher(ssm, max_workers=2)
+
+        fetcher.get_parameters("/mobile-sdk/ios", self.shards)
+
+        paths = sorted(
+            kwargs["Path"] for name, kwargs in ssm.calls if name == "get_parameters_by_path"
+        )
+        self.assertEqual(
+            [
+                "/mobile-sdk/ios",
+                "/mobile-sdk/ios/apigateway",
+                "/mobile-sdk/ios/iot",
+                "/mobile-sdk/ios/s3",
+            ],
+            paths,
+        )
+
+    def test_get_parameters_with_no_parameters(self):
+        fetcher = ShardedParameterFetcher(FakeSsm([]))
+
+        self.assertEqual([], fetcher.get_parameters("/mobile-sdk/ios", self.shards))
+
+    def test_max_workers_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            ShardedParameterFetcher(FakeSsm([]), max_workers=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import asyncio
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from rate_limiter import SharedRateLimiter
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+        self.sleeps = list()
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds: float) -> None:
+        self.sleep(seconds)
+        await asyncio.sleep(0)
+
+
+class TestSharedRateLimiter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.temp_dir.name, "state.json")
+        self.clock = FakeClock()
+        self.underTest = self.limiter()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def limiter(self) -> SharedRateLimiter:
+        return SharedRateLimiter(
+            self.state_file,
+            rate=10.0,
+            min_rate=1.0,
+            max_rate=20.0,
+            burst=2.0,
+            increase=1.0,
+            clock=self.clock,
+            sleep=self.clock.sleep,
+            async_sleep=self.clock.async_sleep,
+        )
+
+    def test_burst_is_not_delayed(self):
+        self.assertEqual(0.0, self.underTest.acquire())
+        self.assertEqual(0.0, self.underTest.acquire())
+        self.assertEqual([], self.clock.sleeps)
+
+    def test_waits_for_next_token_when_empty(self):
+        self.underTest.acquire()
+        self.underTest.acquire()
+
+        self.assertAlmostEqual(0.1, self.underTest.acquire())
+        self.assertEqual(3, self.underTest.counters.requests)
+        self.assertAlmostEqual(0.1, self.underTest.counters.waitSeconds)
+
+    def test_waiting_requests_are_spaced_out(self):
+        self.underTest.acquire()
+        self.underTest.acquire()
+        other = self.limiter()
+        # Neither request has slept yet, so the second reserves the token after the first's
+        self.clock.sleep = lambda seconds: self.clock.sleeps.append(seconds)
+        self.underTest.sleep = self.clock.sleep
+        other.sleep = self.clock.sleep
+
+        self.underTest.acquire()
+        other.acquire()
+
+        self.assertEqual(2, len(self.clock.sleeps))
+        self.assertAlmostEqual(0.1, self.clock.sleeps[0])
+        self.assertAlmostEqual(0.2, self.clock.sleeps[1])
+
+    def test_throttle_halves_rate_and_empties_bucket(self):
+        self.underTest.on_throttle()
+
+        self.assertEqual(5.0, self.underTest.rate())
+        self.assertAlmostEqual(0.2, self.underTest.acquire())
+        self.assertEqual(1, self.underTest.counters.throttles)
+
+    def test_rate_stays_within_bounds(self):
+        for _ in range(10):
+            self.underTest.on_throttle()
+        self.assertEqual(1.0, self.underTest.rate())
+
+        for _ in range(50):
+            self.underTest.on_success()
+        self.assertEqual(20.0, self.underTest.rate())
+
+    def test_state_is_shared_between_limiters(self):
+        other = self.limiter()
+        self.underTest.acquire()
+        other.on_throttle()
+
+        self.assertEqual(5.0, self.underTest.rate())
+        self.assertEqual(SharedRateLimiter.Counters(1, 1, 0.0), self.underTest.shared_counters())
+        self.assertEqual(SharedRateLimiter.Counters(1, 0, 0.0), self.underTest.counters)
+        self.assertEqual(SharedRateLimiter.Counters(0, 1, 0.0), other.counters)
+
+    def test_corrupt_state_file_is_reset(self):
+        with open(self.state_file, "w") as state_file:
+            state_file.write("{not json")
+
+        self.assertEqual(10.0, self.underTest.rate())
+
+    def test_needs_retry_adapts_rate(self):
+        throttled = (None, {"Error": {"Code": "ThrottlingException"}})
+        succeeded = (None, {"ResponseMetadata": {}})
+
+        self.underTest.needs_retry(response=throttled)
+        self.assertEqual(5.0, self.underTest.rate())
+        self.underTest.needs_retry(response=succeeded)
+        self.assertEqual(6.0, self.underTest.rate())
+        self.underTest.needs_retry(response=None)
+        self.assertEqual(6.0, self.underTest.rate())
+
+    def test_acquire_async_sleeps_on_the_event_loop(self):
+        sync_sleeps = list()
+        self.underTest.sleep = sync_sleeps.append
+
+        async def acquire_three() -> list:
+            return [await self.underTest.acquire_async() for _ in range(3)]
+
+        waits = asyncio.run(acquire_three())
+
+        self.assertEqual([0.0, 0.0, 0.1], [round(wait, 6) for wait in waits])
+        self.assertEqual([0.1], [round(sleep, 6) for sleep in self.clock.sleeps])
+        self.assertEqual([], sync_sleeps)
+        self.assertEqual(3, self.underTest.counters.requests)
+
+    def test_summary(self):
+        self.underTest.acquire()
+        self.underTest.on_throttle()
+
+        self.assertEqual("SSM requests: 1, throttled: 1, waited: 0.00s", self.underTest.summary())
+
+    def test_invalid_rates(self):
+        with self.assertRaises(ValueError):
+            SharedRateLimiter(self.state_file, rate=50.0, max_rate=40.0)
+        with self.assertRaises(ValueError):
+            SharedRateLimiter(self.state_file, min_rate=0)
+        with self.assertRaises(ValueError):
+            SharedRateLimiter(self.state_file, burst=0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
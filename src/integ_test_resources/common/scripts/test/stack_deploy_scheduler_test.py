@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import pathlib
+import sys
+import threading
+import time
+import unittest
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+from stack_deploy_scheduler import DEPLOYED, FAILED, SKIPPED, StackDeployScheduler
+
+# The star-shaped graph of the integ test apps
+STAR_DEPENDENCIES = {
+    "common": [],
+    "iot": ["common"],
+    "s3": ["common"],
+    "kinesis": ["common"],
+    "main": ["common", "iot", "s3", "kinesis"],
+}
+
+
+class FakeDeploy:
+    """
+    Deploys stacks by sleeping, records the order in which stacks started,
+    and the highest number of concurrent deploys, and fails the stacks named
+    in `failing`.
+    """
+
+    def __init__(self, failing=(), seconds=0.05):
+        self.failing = set(failing)
+        self.seconds = seconds
+        self.started = []
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, name: str) -> bool:
+        with self.lock:
+            self.started.append(name)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.seconds)
+        with self.lock:
+            self.running -= 1
+        if name == "raising":
+            raise RuntimeError("boom")
+        return name not in self.failing
+
+
+class TestStackDeployScheduler(unittest.TestCase):
+    def test_deploys_independent_stacks_concurrently(self):
+        deploy = FakeDeploy()
+
+        results = StackDeployScheduler(STAR_DEPENDENCIES, deploy, max_workers=8).run()
+
+        self.assertEqual({DEPLOYED}, {result.status for result in results.values()})
+        self.assertEqual("common", deploy.started[0])
+        self.assertEqual("main", deploy.started[-1])
+        self.assertEqual(3, deploy.max_running)
+        self.assertGreater(results["iot"].seconds, 0)
+
+    def test_limits_concurrent_deploys(self):
+        deploy = FakeDeploy()
+
+        StackDeployScheduler(STAR_DEPENDENCIES, deploy, max_workers=2).run()
+
+        self.assertEqual(2, deploy.max_running)
+
+    def test_skips_dependents_of_failed_stacks(self):
+        dependencies = dict(STAR_DEPENDENCIES, app_sync=["s3"], raising=["common"])
+        deploy = FakeDeploy(failing=["iot"])
+
+        results = StackDeployScheduler(dependencies, deploy).run()
+
+        self.assertEqual(FAILED, results["iot"].status)
+        self.assertEqual(FAILED, results["raising"].status)
+        self.assertEqual(SKIPPED, results["main"].status)
+        self.assertEqual(DEPLOYED, results["s3"].status)
+        self.assertEqual(DEPLOYED, results["app_sync"].status)
+        self.assertNotIn("main", deploy.started)
+
+    def test_skips_stacks_blocked_through_skipped_stacks(self):
+        dependencies = {"a": [], "b": ["a"], "c": ["b"], "d": []}
+        deploy = FakeDeploy(failing=["a"])
+
+        results = StackDeployScheduler(dependencies, deploy).run()
+
+        self.assertEqual(SKIPPED, results["b"].status)
+        self.assertEqual(SKIPPED, results["c"].status)
+        self.assertEqual(DEPLOYED, results["d"].status)
+
+    def test_rejects_unknown_dependencies(self):
+        with self.assertRaises(ValueError):
+            StackDeployScheduler({"main": ["common"]}, FakeDeploy())
+
+    def test_rejects_circular_dependencies(self):
+        with self.assertRaises(ValueError):
+            StackDeployScheduler({"a": ["b"], "b": ["a"]}, FakeDeploy()).run()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,226 @@
+import hashlib
 import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import boto3
 
 from common.platforms import Platform
+from common.synth_fixtures import synth_lookup
 
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
 
-def get_integ_tests_secrets(platform: Platform) -> dict:
-    secret_name = "integ_test_secrets_{}".format(platform.value)
-    # using constant region as these secrets are static & created outside of this app
-    region_name = "us-east-1"
+# using constant region as these secrets are static & created outside of this app
+SECRETS_REGION = "us-east-1"
+
+
+class SecretsProvider:
+    """
+    Fetches JSON secrets from Secrets Manager, and remembers them for
+    `ttl_seconds`, so that the stacks of an app that read the same secret
+    share one `GetSecretValue` call.
+
+    Secrets can be fetched several at once, with `get_secrets`, which makes
+    a single `BatchGetSecretValue` call for all of those not remembered yet.
+
+    With a `cache_key`, a Fernet key, secrets are also kept on disk, in
+    `cache_dir`, encrypted with that key, so that repeated syntheses during
+    development skip the round trips. The disk cache needs the
+    `cryptography` package. Create a key with:
+
+        python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"
+
+    Every secret is looked up through `synth_lookup`, so secrets are
+    recorded into, or replayed from, an active SynthFixtureStore, whether
+    they were cached or not.
+    """
+
+    DEFAULT_TTL_SECONDS = 900
+    DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "integ-test-secrets")
+    # BatchGetSecretValue's limit on the number of secret ids of one call
+    BATCH_SIZE = 20
+
+    def __init__(
+        self,
+        region_name: str = SECRETS_REGION,
+        ttl_seconds: int = DEFAULT_TTL_SECONDS,
+        cache_key: Optional[str] = None,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+    ):
+        self.region_name = region_name
+        self.ttl_seconds = ttl_seconds
+        self.cache_dir = cache_dir
+        self._fernet = None
+        if cache_key:
+            if Fernet is None:
+                raise RuntimeError(
+                    "The encrypted secrets cache needs the 'cryptography' package. "
+                    "Install it with 'pip install cryptography'"
+                )
+            self._fernet = Fernet(cache_key)
+        self._client = None
+        # secret id -> (expiry, as returned by time.monotonic, value)
+        self._secrets: Dict[str, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls) -> "SecretsProvider":
+        """
+        Creates a provider configured by the environment:
+
+        - INTEG_TEST_SECRETS_TTL: seconds for which secrets are remembered
+        - INTEG_TEST_SECRETS_CACHE_KEY: Fernet key enabling the disk cache
+        - INTEG_TEST_SECRETS_CACHE_DIR: directory of the disk cache
+        """
+        return cls(
+            ttl_seconds=int(os.environ.get("INTEG_TEST_SECRETS_TTL", cls.DEFAULT_TTL_SECONDS)),
+            cache_key=os.environ.get("INTEG_TEST_SECRETS_CACHE_KEY"),
+            cache_dir=os.environ.get("INTEG_TEST_SECRETS_CACHE_DIR", cls.DEFAULT_CACHE_DIR),
+        )
+
+    def get_secret(self, secret_id: str) -> Any:
+        return self.get_secrets([secret_id])[secret_id]
+
+    def get_secrets(self, secret_ids: Iterable[str]) -> Dict[str, Any]:
+        """
+        Returns the parsed values of the secrets, by secret id. The secrets
+        that are not cached are fetched together, the first time one of
+        them is needed.
+        """
+        secret_ids = list(dict.fromkeys(secret_ids))
+        fetched: Dict[str, Any] = {}
+
+        def fetch(secret_id: str) -> Any:
+            with self._lock:
+                value = self._get_cached(secret_id)
+                if value is not None:
+                    return value
+                if secret_id not in fetched:
+                    uncached_ids = [i for i in secret_ids if self._get_cached(i) is None]
+                    fetched.update(self._fetch_secrets(uncached_ids))
+                    for fetched_id, fetched_value in fetched.items():
+                        self._remember(fetched_id, fetched_value)
+                return fetched[secret_id]
+
+        return {
+            secret_id: synth_lookup(
+                "secrets", secret_id, lambda secret_id=secret_id: fetch(secret_id)
+            )
+            for secret_id in secret_ids
+        }
 
-    session = boto3.session.Session()
-    client = session.client(service_name="secretsmanager", region_name=region_name)
+    def clear(self) -> None:
+        """
+        Forgets the remembered secrets. The disk cache is kept.
+        """
+        with self._lock:
+            self._secrets.clear()
 
-    get_secret_value_response = client.get_secret_value(SecretId=secret_name)
+    def _get_cached(self, secret_id: str) -> Any:
+        cached = self._secrets.get(secret_id)
+        if cached is not None:
+            expiry, value = cached
+            if time.monotonic() < expiry:
+                return value
+            del self._secrets[secret_id]
 
-    if "SecretString" not in get_secret_value_response:
-        raise ValueError(f"Value of {secret_name} is not a string")
+        value = self._read_disk_cache(secret_id)
+        if value is not None:
+            self._secrets[secret_id] = (time.monotonic() + self.ttl_seconds, value)
+        return value
 
-    secret_string = get_secret_value_response["SecretString"]
-    secret_dict = json.loads(secret_string)
-    return secret_dict
+    def _remember(self, secret_id: str, value: Any) -> None:
+        self._secrets[secret_id] = (time.monotonic() + self.ttl_seconds, value)
+        self._write_disk_cache(secret_id, value)
+
+    @property
+    def client(self):
+        if self._client is None:
+            session = boto3.session.Session()
+            self._client = session.client(
+                service_name="secretsmanager", region_name=self.region_name
+            )
+        return self._client
+
+    def _fetch_secrets(self, secret_ids: List[str]) -> Dict[str, Any]:
+        if len(secret_ids) == 1:
+            response = self.client.get_secret_value(SecretId=secret_ids[0])
+            return {secret_ids[0]: self._parse(secret_ids[0], response)}
+
+        secrets = {}
+        for start in range(0, len(secret_ids), self.BATCH_SIZE):
+            batch = secret_ids[start : start + self.BATCH_SIZE]
+            response = self.client.batch_get_secret_value(SecretIdList=batch)
+            if response.get("Errors"):
+                messages = [
+                    f"{error['SecretId']}: {error['ErrorCode']} {error.get('Message', '')}"
+                    for error in response["Errors"]
+                ]
+                raise ValueError(f"Could not fetch secrets: {'; '.join(messages)}")
+            for secret_value in response["SecretValues"]:
+                for secret_id in batch:
+                    if secret_id in (secret_value["Name"], secret_value["ARN"]):
+                        secrets[secret_id] = self._parse(secret_id, secret_value)
+            # Secrets requested by a partial ARN are not matched above
+            for secret_id in batch:
+                if secret_id not in secrets:
+                    response = self.client.get_secret_value(SecretId=secret_id)
+                    secrets[secret_id] = self._parse(secret_id, response)
+        return secrets
+
+    @staticmethod
+    def _parse(secret_id: str, secret_value: dict) -> Any:
+        if "SecretString" not in secret_value:
+            raise ValueError(f"Value of {secret_id} is not a string")
+        return json.loads(secret_value["SecretString"])
+
+    def _cache_path(self, secret_id: str) -> str:
+        file_name = hashlib.sha256(f"{self.region_name}/{secret_id}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, file_name)
+
+    def _read_disk_cache(self, secret_id: str) -> Any:
+        if self._fernet is None:
+            return None
+        try:
+            with open(self._cache_path(secret_id), "rb") as cache_file:
+                token = cache_file.read()
+            return json.loads(self._fernet.decrypt(token, ttl=self.ttl_seconds))
+        except (OSError, InvalidToken):
+            # Missing, expired, or encrypted with another key
+            return None
+
+    def _write_disk_cache(self, secret_id: str, value: Any) -> None:
+        if self._fernet is None:
+            return
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+        token = self._fernet.encrypt(json.dumps(value).encode())
+        file_descriptor = os.open(
+            self._cache_path(secret_id), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600
+        )
+        with os.fdopen(file_descriptor, "wb") as cache_file:
+            cache_file.write(token)
+
+
+_provider: Optional[SecretsProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_secrets_provider() -> SecretsProvider:
+    """
+    Returns the process-wide SecretsProvider, configured by the environment.
+    """
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = SecretsProvider.from_environment()
+        return _provider
+
+
+def get_integ_tests_secrets(platform: Platform) -> dict:
+    secret_name = "integ_test_secrets_{}".format(platform.value)
+    return get_secrets_provider().get_secret(secret_name)
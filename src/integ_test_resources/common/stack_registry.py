@@ -0,0 +1,83 @@
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from aws_cdk import Stack
+
+
+class StackRegistry:
+    """
+    Constructs an app's stacks on demand, instead of all of them up front.
+
+    Each stack is registered under its name, with a factory that builds it,
+    and the names of the stacks it needs. A stack's dependencies are built
+    before it, and passed to its factory, in the order they were given:
+
+        registry.register("lambda", lambda: LambdaStack(app, "lambda", common_stack))
+        registry.register(
+            "apigateway",
+            lambda lambda_stack: ApigatewayStack(
+                app, "apigateway", lambda_stack.lambda_echo_function, common_stack
+            ),
+            depends_on=["lambda"],
+        )
+
+    Every stack is built at most once.
+    """
+
+    def __init__(self) -> None:
+        self._factories: Dict[str, Tuple[Callable[..., Stack], List[str]]] = {}
+        self._stacks: Dict[str, Stack] = {}
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._factories)
+
+    def register(
+        self, name: str, factory: Callable[..., Stack], depends_on: Iterable[str] = ()
+    ) -> None:
+        if name in self._factories:
+            raise ValueError(f"A stack named '{name}' is already registered")
+        self._factories[name] = (factory, list(depends_on))
+
+    def get(self, name: str) -> Stack:
+        """
+        Returns the named stack, building it, and the stacks it depends on,
+        if they have not been built yet.
+        """
+        return self._get(name, ())
+
+    def _get(self, name: str, building: Tuple[str, ...]) -> Stack:
+        if name in self._stacks:
+            return self._stacks[name]
+        if name not in self._factories:
+            raise ValueError(f"Unknown stack '{name}'. Known stacks: {', '.join(self.names)}")
+        if name in building:
+            raise ValueError(f"Circular dependency: {' -> '.join(building + (name,))}")
+
+        factory, depends_on = self._factories[name]
+        dependencies = [self._get(dependency, building + (name,)) for dependency in depends_on]
+        stack = factory(*dependencies)
+        self._stacks[name] = stack
+        return stack
+
+    def build(self, names: Optional[Iterable[str]] = None) -> List[Stack]:
+        """
+        Builds the named stacks, and the stacks they depend on, or every
+        registered stack if no names are given. Returns every stack that has
+        been built, in the order they were registered.
+        """
+        for name in self.names if names is None else names:
+            self.get(name)
+        return [self._stacks[name] for name in self.names if name in self._stacks]
+
+    @staticmethod
+    def selection_from_context(value) -> Optional[List[str]]:
+        """
+        Parses a stack selection given as CDK context, either as a
+        comma-separated string (`-c stacks=iot,s3`) or a list. Returns None,
+        meaning every stack, if no selection was given.
+        """
+        if value is None:
+            return None
+        if isinstance(value, str):
+            value = value.split(",")
+        return [name.strip() for name in value if name.strip()]
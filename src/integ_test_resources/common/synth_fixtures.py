@@ -0,0 +1,116 @@
+import json
+import os
+from typing import Any, Callable, Dict, Optional
+
+
+class SynthFixtureStore:
+    """
+    Records the AWS lookups an app makes while it is synthesized, such as
+    the integ test secrets and the regions each service is available in, so
+    that later syntheses can replay them without any network access.
+
+    Select a mode with context, before the app's stacks are constructed:
+
+        cdk synth -c record_synth_fixture=synth-fixture.json ...
+        cdk synth -c replay_synth_fixture=synth-fixture.json ...
+
+    A recording run makes every lookup live, and writes the results once the
+    app has been synthesized. A replaying run answers every lookup from the
+    fixture, and fails on lookups that were not recorded, instead of making
+    them live. Without either context key, lookups are made live, and not
+    recorded.
+
+    Fixtures are JSON documents, with the lookups grouped by kind:
+
+        {"version": 1, "lookups": {"secrets": {...}, "regions": {...}}}
+
+    Fixtures hold the secrets' values, so keep them out of source control.
+    """
+
+    VERSION = 1
+    RECORD_CONTEXT_KEY = "record_synth_fixture"
+    REPLAY_CONTEXT_KEY = "replay_synth_fixture"
+
+    _active: Optional["SynthFixtureStore"] = None
+
+    def __init__(self, path: str, replay: bool):
+        self.path = path
+        self.replay = replay
+        self.lookups: Dict[str, Dict[str, Any]] = {}
+        if replay:
+            self.load()
+
+    @classmethod
+    def from_context(cls, app) -> Optional["SynthFixtureStore"]:
+        """
+        Activates a store if the app's context asks for one. Returns None
+        otherwise.
+        """
+        record_path = app.node.try_get_context(cls.RECORD_CONTEXT_KEY)
+        replay_path = app.node.try_get_context(cls.REPLAY_CONTEXT_KEY)
+        if record_path and replay_path:
+            raise ValueError(
+                f"Provide only one of '{cls.RECORD_CONTEXT_KEY}' and '{cls.REPLAY_CONTEXT_KEY}'"
+            )
+        if not record_path and not replay_path:
+            return None
+        store = cls(replay_path or record_path, replay=bool(replay_path))
+        SynthFixtureStore._active = store
+        return store
+
+    @classmethod
+    def active(cls) -> Optional["SynthFixtureStore"]:
+        return cls._active
+
+    def load(self) -> None:
+        with open(self.path, "r") as fixture_file:
+            fixture = json.load(fixture_file)
+        if fixture.get("version") != self.VERSION:
+            raise ValueError(
+                f"Unsupported synth fixture version {fixture.get('version')} in {self.path}. "
+                f"Record it again, with -c {self.RECORD_CONTEXT_KEY}={self.path}"
+            )
+        self.lookups = fixture["lookups"]
+
+    def save(self) -> None:
+        """
+        Writes the recorded lookups, and deactivates the store. Replaying
+        stores are only deactivated.
+        """
+        if SynthFixtureStore._active is self:
+            SynthFixtureStore._active = None
+        if self.replay:
+            return
+        file_descriptor = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(file_descriptor, "w") as fixture_file:
+            json.dump(
+                {"version": self.VERSION, "lookups": self.lookups},
+                fixture_file,
+                indent=2,
+                sort_keys=True,
+            )
+
+    def lookup(self, kind: str, key: str, fetch: Callable[[], Any]) -> Any:
+        lookups_of_kind = self.lookups.setdefault(kind, {})
+        if self.replay:
+            if key not in lookups_of_kind:
+                raise KeyError(
+                    f"The synth fixture {self.path} has no '{kind}' lookup for '{key}'. "
+                    f"Record it again, with -c {self.RECORD_CONTEXT_KEY}={self.path}"
+                )
+            return lookups_of_kind[key]
+        if key not in lookups_of_kind:
+            lookups_of_kind[key] = fetch()
+        return lookups_of_kind[key]
+
+
+def synth_lookup(kind: str, key: str, fetch: Callable[[], Any]) -> Any:
+    """
+    Returns the result of a synth-time AWS lookup. `fetch` makes the lookup
+    live, and must return a JSON-serializable value. If a SynthFixtureStore
+    is active, the lookup is recorded into it, or replayed from it.
+    """
+    store = SynthFixtureStore.active()
+    if store is None:
+        return fetch()
+    return store.lookup(kind, key, fetch)
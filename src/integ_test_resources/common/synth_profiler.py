@@ -0,0 +1,189 @@
+import json
+import time
+from collections import namedtuple
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from aws_cdk import App, Stack
+from botocore.client import BaseClient
+
+ApiCall = namedtuple("ApiCall", "service operation seconds")
+
+
+class StackProfile:
+    def __init__(self, name: str):
+        self.name = name
+        self.constructor_seconds = 0.0
+        self.api_calls: List[ApiCall] = []
+        self.construct_count = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "constructorSeconds": self.constructor_seconds,
+            "apiCallCount": len(self.api_calls),
+            "apiCallSeconds": sum(call.seconds for call in self.api_calls),
+            "apiCalls": [call._asdict() for call in self.api_calls],
+            "constructCount": self.construct_count,
+        }
+
+
+class SynthProfiler:
+    """
+    Records, for each RegionAwareStack, how long its constructor took, the
+    AWS API calls it made while it was being constructed, and how many
+    constructs it contains.
+
+    Profiling is opt-in, with the `synth_profile` context key, whose value is
+    the path of the report:
+
+        cdk synth -c synth_profile=synth-profile.json ...
+
+    The report is a JSON document with one entry per stack. Next to it, a
+    `.folded` file holds the same timings as collapsed stacks, one line per
+    stack and API operation, which flame graph tools such as `flamegraph.pl`
+    or speedscope read directly.
+
+    API calls are observed by wrapping botocore's `BaseClient._make_api_call`
+    while the profiler is running, so calls made through any session are
+    counted. Calls made outside of a stack's constructor are attributed to
+    `(app)`.
+    """
+
+    CONTEXT_KEY = "synth_profile"
+    APP_PROFILE_NAME = "(app)"
+
+    _active: Optional["SynthProfiler"] = None
+
+    def __init__(self, report_path: str):
+        self.report_path = report_path
+        self.profiles: Dict[str, StackProfile] = {}
+        # The stacks whose constructors are running, with their ids
+        self._constructing: List[Tuple[Stack, str]] = []
+        self._make_api_call: Optional[Callable] = None
+
+    @classmethod
+    def from_context(cls, app: App) -> Optional["SynthProfiler"]:
+        """
+        Starts a profiler if the app's context asks for one. Returns None
+        otherwise.
+        """
+        report_path = app.node.try_get_context(cls.CONTEXT_KEY)
+        if not report_path:
+            return None
+        profiler = cls(report_path)
+        profiler.start()
+        return profiler
+
+    @classmethod
+    def active(cls) -> Optional["SynthProfiler"]:
+        return cls._active
+
+    def start(self) -> None:
+        if SynthProfiler._active is not None:
+            raise RuntimeError("Another synth profiler is already running")
+        SynthProfiler._active = self
+        self._make_api_call = BaseClient._make_api_call
+        profiler = self
+        original = self._make_api_call
+
+        @wraps(original)
+        def make_api_call(client, operation_name, api_params):
+            started_at = time.perf_counter()
+            try:
+                return original(client, operation_name, api_params)
+            finally:
+                profiler.record_api_call(
+                    client.meta.service_model.service_name,
+                    operation_name,
+                    time.perf_counter() - started_at,
+                )
+
+        BaseClient._make_api_call = make_api_call
+
+    def stop(self) -> None:
+        if self._make_api_call is not None:
+            BaseClient._make_api_call = self._make_api_call
+            self._make_api_call = None
+        if SynthProfiler._active is self:
+            SynthProfiler._active = None
+
+    def profile_for(self, name: str) -> StackProfile:
+        if name not in self.profiles:
+            self.profiles[name] = StackProfile(name)
+        return self.profiles[name]
+
+    def record_api_call(self, service: str, operation: str, seconds: float) -> None:
+        if self._constructing:
+            name = self._constructing[-1][1]
+        else:
+            name = self.APP_PROFILE_NAME
+        self.profile_for(name).api_calls.append(ApiCall(service, operation, seconds))
+
+    def profile_constructor(self, stack: Stack, name: str, constructor: Callable[[], None]) -> None:
+        """
+        Runs a stack's constructor, timing it. Constructors of base classes,
+        called from the stack's own constructor, are not timed again.
+        """
+        if self._constructing and self._constructing[-1][0] is stack:
+            constructor()
+            return
+
+        self._constructing.append((stack, name))
+        started_at = time.perf_counter()
+        try:
+            constructor()
+        finally:
+            elapsed = time.perf_counter() - started_at
+            self._constructing.pop()
+            self.profile_for(name).constructor_seconds += elapsed
+
+    def write_report(self, app: App) -> None:
+        """
+        Stops the profiler, counts the constructs of every profiled stack,
+        and writes the report.
+        """
+        self.stop()
+        for child in app.node.children:
+            if isinstance(child, Stack) and child.node.id in self.profiles:
+                self.profiles[child.node.id].construct_count = len(child.node.find_all())
+
+        profiles = sorted(
+            self.profiles.values(), key=lambda profile: profile.constructor_seconds, reverse=True
+        )
+        with open(self.report_path, "w") as report_file:
+            json.dump(
+                {"stacks": [profile.to_dict() for profile in profiles]}, report_file, indent=2
+            )
+
+        with open(self.report_path + ".folded", "w") as folded_file:
+            for profile in profiles:
+                api_microseconds = 0
+                for call in profile.api_calls:
+                    microseconds = int(call.seconds * 1e6)
+                    api_microseconds += microseconds
+                    folded_file.write(
+                        f"synth;{profile.name};{call.service}.{call.operation} {microseconds}\n"
+                    )
+                own_microseconds = int(profile.constructor_seconds * 1e6) - api_microseconds
+                if own_microseconds > 0:
+                    folded_file.write(f"synth;{profile.name} {own_microseconds}\n")
+
+
+def profile_constructor(init: Callable) -> Callable:
+    """
+    Wraps a stack class's `__init__`, so that the active SynthProfiler, if
+    any, times it. Without an active profiler, the constructor runs as is.
+
+    The stack's id is taken from the constructor's arguments, as its
+    construct node does not exist until the base constructor has run.
+    """
+
+    @wraps(init)
+    def profiled_init(self, scope, id, *args, **kwargs):
+        profiler = SynthProfiler.active()
+        if profiler is None:
+            return init(self, scope, id, *args, **kwargs)
+        profiler.profile_constructor(self, id, lambda: init(self, scope, id, *args, **kwargs))
+
+    return profiled_init
@@ -33,9 +33,14 @@ from cdk_integration_tests_ios.translate_stack import TranslateStack
 from common.common_stack import CommonStack
 from common.main_stack import MainStack
 from common.platforms import Platform
+from common.stack_registry import StackRegistry
 from common.stack_utils import add_stack_dependency_on_common_stack
+from common.synth_fixtures import SynthFixtureStore
+from common.synth_profiler import SynthProfiler
 
 app = App()
+synth_profiler = SynthProfiler.from_context(app)
+synth_fixtures = SynthFixtureStore.from_context(app)
 
 region = app.node.try_get_context("region")
 account = app.node.try_get_context("account")
@@ -48,43 +53,60 @@ common_stack = CommonStack(app, "common", platform=Platform.IOS)
 main_stack = MainStack(app, "main")
 main_stack.add_dependency(common_stack)
 
-core_stack = CoreStack(app, "core", common_stack)
+# Stacks are only constructed when they are selected, e.g. with `-c stacks=iot,s3`, or when
+# a selected stack depends on them. Without a selection, every stack is constructed.
+# `common` and `main` are built from every other stack, so selecting either selects them all.
+STACKS_BUILT_FROM_ALL = {"common", "main"}
+registry = StackRegistry()
+registry.register("core", lambda: CoreStack(app, "core", common_stack))
+registry.register("lambda", lambda: LambdaStack(app, "lambda", common_stack))
+registry.register(
+    "apigateway",
+    lambda lambda_stack: ApigatewayStack(
+        app, "apigateway", lambda_stack.lambda_echo_function, common_stack
+    ),
+    depends_on=["lambda"],
+)
+registry.register("autoscaling", lambda: AutoScalingStack(app, "autoscaling", common_stack))
+registry.register("cloudwatch", lambda: CloudWatchStack(app, "cloudwatch", common_stack))
+registry.register("cognito-idp", lambda: CognitoIdpStack(app, "cognito-idp", common_stack))
+registry.register("comprehend", lambda: ComprehendStack(app, "comprehend", common_stack))
+registry.register("dynamodb", lambda: DynamoDbStack(app, "dynamodb", common_stack))
+registry.register("ec2", lambda: Ec2Stack(app, "ec2", common_stack))
+registry.register("elb", lambda: ElbStack(app, "elb", common_stack))
+registry.register("firehose", lambda: FirehoseStack(app, "firehose", common_stack))
+registry.register("iot", lambda: IotStack(app, "iot", common_stack))
+registry.register("kinesis", lambda: KinesisStack(app, "kinesis", common_stack))
+registry.register("kinesisvideo", lambda: KinesisVideoStack(app, "kinesisvideo", common_stack))
+registry.register("kms", lambda: KmsStack(app, "kms", common_stack))
+registry.register("location", lambda: LocationStack(app, "location", common_stack))
+registry.register("mobileclient", lambda: MobileClientStack(app, "mobileclient", common_stack))
+registry.register("pinpoint", lambda: PinpointStack(app, "pinpoint", common_stack))
+registry.register("polly", lambda: PollyStack(app, "polly", common_stack))
+registry.register("rekognition", lambda: RekognitionStack(app, "rekognition", common_stack))
+registry.register("s3", lambda: S3Stack(app, "s3", common_stack))
+registry.register("ses", lambda: SesStack(app, "ses", common_stack))
+registry.register("sdb", lambda: SimpleDbStack(app, "sdb", common_stack))
+registry.register("sns", lambda: SnsStack(app, "sns", common_stack))
+registry.register("sqs", lambda: SqsStack(app, "sqs", common_stack))
+registry.register("sts", lambda: StsStack(app, "sts", common_stack))
+registry.register("textract", lambda: TextractStack(app, "textract", common_stack))
+registry.register("transcribe", lambda: TranscribeStack(app, "transcribe", common_stack))
+registry.register("translate", lambda: TranslateStack(app, "translate", common_stack))
 
-lambda_stack = LambdaStack(app, "lambda", common_stack)
-
-stacks_in_app = [
-    core_stack,
-    lambda_stack,
-    ApigatewayStack(app, "apigateway", lambda_stack.lambda_echo_function, common_stack),
-    AutoScalingStack(app, "autoscaling", common_stack),
-    CloudWatchStack(app, "cloudwatch", common_stack),
-    CognitoIdpStack(app, "cognito-idp", common_stack),
-    ComprehendStack(app, "comprehend", common_stack),
-    DynamoDbStack(app, "dynamodb", common_stack),
-    Ec2Stack(app, "ec2", common_stack),
-    ElbStack(app, "elb", common_stack),
-    FirehoseStack(app, "firehose", common_stack),
-    IotStack(app, "iot", common_stack),
-    KinesisStack(app, "kinesis", common_stack),
-    KinesisVideoStack(app, "kinesisvideo", common_stack),
-    KmsStack(app, "kms", common_stack),
-    LocationStack(app, "location", common_stack),
-    MobileClientStack(app, "mobileclient", common_stack),
-    PinpointStack(app, "pinpoint", common_stack),
-    PollyStack(app, "polly", common_stack),
-    RekognitionStack(app, "rekognition", common_stack),
-    S3Stack(app, "s3", common_stack),
-    SesStack(app, "ses", common_stack),
-    SimpleDbStack(app, "sdb", common_stack),
-    SnsStack(app, "sns", common_stack),
-    SqsStack(app, "sqs", common_stack),
-    StsStack(app, "sts", common_stack),
-    TextractStack(app, "textract", common_stack),
-    TranscribeStack(app, "transcribe", common_stack),
-    TranslateStack(app, "translate", common_stack),
-]
+selected_stacks = StackRegistry.selection_from_context(app.node.try_get_context("stacks"))
+if selected_stacks is not None and STACKS_BUILT_FROM_ALL & set(selected_stacks):
+    selected_stacks = None
+stacks_in_app = registry.build(selected_stacks)
+if selected_stacks is not None:
+    # Only the selected stacks added their policies and exports to `common`
+    common_stack.refuse_partial_deployment(selected_stacks)
 
 add_stack_dependency_on_common_stack(stacks_in_app=stacks_in_app, common_stack=common_stack)
 main_stack.add_dependencies_with_region_filter(stacks_to_add=stacks_in_app)
 
 app.synth()
+if synth_fixtures is not None:
+    synth_fixtures.save()
+if synth_profiler is not None:
+    synth_profiler.write_report(app)
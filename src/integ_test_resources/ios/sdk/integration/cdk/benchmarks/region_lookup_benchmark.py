@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Measures the region-support lookups that synthesizing the iOS app makes, and
+compares the memoized index in common.region_availability with the previous
+lookup, which created a new boto3 session for every service.
+
+The lookups are replayed from the list below, one entry per stack in app.py,
+so that the benchmark does not need the CDK, or credentials for the secrets
+some stacks read while they are constructed. Each repetition starts from an
+empty index, as a new `cdk synth` process would.
+
+Usage:
+    ./benchmarks/region_lookup_benchmark.py --region us-west-2
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+from boto3.session import Session
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../../../../.."))
+from common import region_availability
+
+# The services each stack of the iOS app checks, in the order app.py builds them.
+STACK_SERVICES = [
+    ["cognito-identity"],  # common
+    ["cognito-identity"],  # core
+    ["lambda"],
+    ["apigateway"],
+    ["autoscaling"],
+    ["cloudwatch"],
+    ["cognito-idp"],
+    ["comprehend"],
+    ["dynamodb"],
+    ["ec2"],
+    ["elb"],
+    ["firehose"],
+    ["iot"],
+    ["kinesis"],
+    ["kinesisvideo"],
+    ["kms"],
+    ["location"],
+    ["cognito-identity", "cognito-idp"],  # mobileclient
+    ["pinpoint"],
+    ["polly"],
+    ["rekognition"],
+    ["s3"],
+    ["ses"],
+    ["sdb"],
+    ["sns"],
+    ["sqs"],
+    ["sts"],
+    ["textract"],
+    ["transcribe"],
+    ["translate"],
+]
+
+
+def lookup_with_new_sessions(region_name: str) -> list:
+    """
+    The previous implementation, kept as a baseline: a new session, and so
+    a new load of botocore's endpoint data, for every service.
+    """
+    results = list()
+    for service_names in STACK_SERVICES:
+        supported = True
+        for service_name in service_names:
+            regions = Session().get_available_regions(service_name)
+            supported = supported and region_name in regions
+        results.append(supported)
+    return results
+
+
+def lookup_with_index(region_name: str) -> list:
+    region_availability._session = None
+    region_availability._regions_by_service.clear()
+    return [
+        region_availability.are_services_supported_in_region(service_names, region_name)
+        for service_names in STACK_SERVICES
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if lookup_with_index(args.region) != lookup_with_new_sessions(args.region):
+        raise RuntimeError("The lookups disagree on which stacks are supported")
+
+    baseline_time = min(
+        timeit.repeat(lambda: lookup_with_new_sessions(args.region), number=1, repeat=args.repeat)
+    )
+    current_time = min(
+        timeit.repeat(lambda: lookup_with_index(args.region), number=1, repeat=args.repeat)
+    )
+
+    print(f"stacks:            {len(STACK_SERVICES)}")
+    print(f"new session each:  {baseline_time:.3f}s")
+    print(f"memoized index:    {current_time:.3f}s ({baseline_time / current_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Measures how long synthesizing the iOS app takes, for the whole app and for
+a selection of stacks.
+
+Each synthesis runs `app.py` in a new process, the way `cdk synth` does,
+with the context passed through `CDK_CONTEXT_JSON`, and the cloud assembly
+written to a temporary directory. The app's dependencies must be installed,
+and some stacks read secrets while they are constructed, so credentials for
+the account are needed as well.
+
+Usage:
+    ./benchmarks/synth_benchmark.py --account 123456789012 --selections iot s3 iot,s3
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def synth(region: str, account: str, stacks: Optional[str]) -> float:
+    context = {"region": region, "account": account}
+    if stacks is not None:
+        context["stacks"] = stacks
+    with tempfile.TemporaryDirectory() as output_dir:
+        environment = dict(os.environ, CDK_CONTEXT_JSON=json.dumps(context), CDK_OUTDIR=output_dir)
+        started_at = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "app.py"],
+            cwd=APP_DIR,
+            env=environment,
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        return time.perf_counter() - started_at
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--region", default="us-east-1")
+    parser.add_argument("--account", required=True)
+    parser.add_argument(
+        "--selections",
+        nargs="+",
+        default=["iot"],
+        help="values of the `stacks` context to synthesize, besides the whole app",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for stacks in [None] + args.selections:
+        elapsed = min(synth(args.region, args.account, stacks) for _ in range(args.repeat))
+        print(f"{stacks or 'all stacks':<20} {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
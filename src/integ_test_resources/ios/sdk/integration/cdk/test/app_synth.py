@@ -0,0 +1,50 @@
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+APP_DIR = str(pathlib.Path(__file__).parent.absolute()) + "/.."
+
+SYNTH_WITH_FAKE_SECRETS = """
+import runpy
+from unittest.mock import patch
+
+class FakeSecrets(dict):
+    def __missing__(self, key):
+        return "secret-" + key.replace(".", "-")
+
+secrets = FakeSecrets()
+with patch(
+    "cdk_integration_tests_ios.core_stack.get_integ_tests_secrets", return_value=secrets
+), patch(
+    "cdk_integration_tests_ios.mobileclient_stack.get_integ_tests_secrets", return_value=secrets
+):
+    runpy.run_path("app.py", run_name="__main__")
+"""
+
+
+def synth_app(output_dir: str, fake_secrets: bool = True, **context) -> None:
+    """
+    Synthesizes the iOS app into `output_dir`, with its secrets faked, unless
+    `fake_secrets` is False.
+
+    The CDK reads its context and output directory from the environment of
+    the process that first loads it, so the app is synthesized in a process
+    of its own.
+    """
+    context = dict({"region": "us-east-1", "account": "123456789012"}, **context)
+    environment = dict(os.environ, CDK_CONTEXT_JSON=json.dumps(context), CDK_OUTDIR=output_dir)
+    command = ["-c", SYNTH_WITH_FAKE_SECRETS] if fake_secrets else ["app.py"]
+    subprocess.run(
+        [sys.executable] + command,
+        cwd=APP_DIR,
+        env=environment,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def load_template(output_dir: str, stack_name: str) -> dict:
+    with open(f"{output_dir}/{stack_name}.template.json") as template_file:
+        return json.load(template_file)
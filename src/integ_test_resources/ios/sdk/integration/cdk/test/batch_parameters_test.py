@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+
+import pathlib
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()))
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+import cdk_integration_tests_ios  # noqa: F401 (adds the common resources to the path)
+from app_synth import load_template, synth_app
+from common.custom_resources.batch_parameter_writer import batch_parameter_writer
+
+
+class TestBatchParameters(unittest.TestCase):
+    """
+    Synthesizes the s3 stack with its parameters written in one batch, and
+    checks the resources that hold them.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.output_dir = tempfile.TemporaryDirectory()
+        synth_app(cls.output_dir.name, stacks="s3", batch_parameters="true")
+        cls.template = load_template(cls.output_dir.name, "s3")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.output_dir.cleanup()
+
+    def resources_of_type(self, resource_type: str) -> list:
+        return [
+            resource
+            for resource in self.template["Resources"].values()
+            if resource["Type"] == resource_type
+        ]
+
+    def test_parameters_are_written_by_one_resource(self):
+        batches = self.resources_of_type("Custom::MobileSdkParameters")
+
+        self.assertEqual(1, len(batches))
+        properties = batches[0]["Properties"]
+        self.assertEqual("/mobile-sdk/ios/s3/", properties["namespace"])
+        self.assertIn("/mobile-sdk/ios/s3/bucket_name_basic", properties["parameters"])
+        for parameter in properties["parameters"].values():
+            self.assertEqual("String", parameter["type"])
+        self.assertEqual("", properties["rewrite"])
+
+    def test_only_hash_is_parameter_resource(self):
+        names = sorted(
+            parameter["Properties"]["Name"]
+            for parameter in self.resources_of_type("AWS::SSM::Parameter")
+        )
+
+        self.assertEqual(["/mobile-sdk-stack-hash/ios/s3"], names)
+
+
+class TestSnapshotParameters(unittest.TestCase):
+    """
+    Synthesizes the s3 stack with the `snapshot_parameters` context set.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.output_dir = tempfile.TemporaryDirectory()
+        synth_app(cls.output_dir.name, stacks="s3", snapshot_parameters="true")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.output_dir.cleanup()
+
+    def test_snapshot_is_saved_in_the_advanced_tier(self):
+        template = load_template(self.output_dir.name, "s3")
+
+        [snapshot] = [
+            resource["Properties"]
+            for resource in template["Resources"].values()
+            if resource["Type"] == "AWS::SSM::Parameter"
+            and resource["Properties"]["Name"] == "/mobile-sdk-snapshot/ios/s3"
+        ]
+        self.assertEqual("Advanced", snapshot["Tier"])
+
+    def test_ci_role_may_list_parameter_names(self):
+        template = load_template(self.output_dir.name, "common")
+
+        actions = [
+            statement["Action"]
+            for resource in template["Resources"].values()
+            if resource["Type"] == "AWS::IAM::Policy"
+            for statement in resource["Properties"]["PolicyDocument"]["Statement"]
+        ]
+        self.assertIn(
+            ["ssm:GetParameter", "ssm:GetParametersByPath", "ssm:DescribeParameters"], actions
+        )
+
+
+class TestBatchParametersRewrite(unittest.TestCase):
+    """
+    Synthesizes the s3 stack with the `rewrite_parameters` context set.
+    """
+
+    def test_rewrite_context_is_passed_to_the_resource(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            synth_app(output_dir, stacks="s3", batch_parameters="true", rewrite_parameters="2")
+            template = load_template(output_dir, "s3")
+
+        [properties] = [
+            resource["Properties"]
+            for resource in template["Resources"].values()
+            if resource["Type"] == "Custom::MobileSdkParameters"
+        ]
+        self.assertEqual("2", properties["rewrite"])
+
+
+class TestBatchParameterWriter(unittest.TestCase):
+    """
+    Checks which parameters the custom resource writes and deletes on update.
+    """
+
+    def update(self, parameters: dict, old_parameters: dict, rewrite="", old_rewrite="") -> tuple:
+        event = {
+            "RequestType": "Update",
+            "ResourceProperties": {
+                "namespace": "/mobile-sdk/ios/s3/",
+                "parameters": parameters,
+                "rewrite": rewrite,
+            },
+            "OldResourceProperties": {
+                "namespace": "/mobile-sdk/ios/s3/",
+                "parameters": old_parameters,
+                "rewrite": old_rewrite,
+            },
+        }
+        with mock.patch.object(
+            batch_parameter_writer, "put_parameters"
+        ) as put_parameters, mock.patch.object(
+            batch_parameter_writer, "delete_parameters"
+        ) as delete_parameters:
+            batch_parameter_writer.on_event(event, None)
+        return put_parameters.call_args.args[0], delete_parameters.call_args.args[0]
+
+    def test_update_writes_changed_parameters_only(self):
+        unchanged = {"value": "a", "type": "String"}
+        changed = {"value": "b2", "type": "String"}
+
+        written, deleted = self.update(
+            {"/p/unchanged": unchanged, "/p/changed": changed},
+            {
+                "/p/unchanged": unchanged,
+                "/p/changed": {"value": "b1", "type": "String"},
+                "/p/removed": {"value": "c", "type": "String"},
+            },
+        )
+
+        self.assertEqual({"/p/changed": changed}, written)
+        self.assertEqual(["/p/removed"], deleted)
+
+    def test_update_with_new_rewrite_writes_every_parameter(self):
+        parameters = {"/p/a": {"value": "a", "type": "String"}}
+
+        written, deleted = self.update(parameters, parameters, rewrite="2", old_rewrite="1")
+
+        self.assertEqual(parameters, written)
+        self.assertEqual([], deleted)
+
+    def test_update_of_resource_deployed_without_rewrite_writes_every_parameter(self):
+        parameters = {"/p/a": {"value": "a", "type": "String"}}
+
+        written, _ = self.update(parameters, parameters, rewrite="", old_rewrite=None)
+
+        self.assertEqual(parameters, written)
+
+
+if __name__ == "__main__":
+    unittest.main()
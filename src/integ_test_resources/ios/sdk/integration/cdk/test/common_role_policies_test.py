@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import json
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()))
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+import cdk_integration_tests_ios  # noqa: F401 (adds the common resources to the path)
+from app_synth import load_template, synth_app
+from aws_cdk import aws_iam as iam
+from common.policy_accumulator import PolicyAccumulator
+
+# IAM's limit on the total size of a role's inline policies, not counting whitespace
+ROLE_POLICY_SIZE_LIMIT = 10240
+
+
+class TestPolicyAccumulator(unittest.TestCase):
+    def test_merges_actions_with_same_target(self):
+        underTest = PolicyAccumulator()
+        underTest.add(iam.PolicyStatement(actions=["s3:GetObject"], resources=["*"]))
+        underTest.add(iam.PolicyStatement(actions=["sns:*", "s3:GetObject"], resources=["*"]))
+
+        statements = underTest.statements()
+
+        self.assertEqual(1, len(statements))
+        self.assertEqual(["s3:GetObject", "sns:*"], statements[0].actions)
+        self.assertEqual(["*"], statements[0].resources)
+
+    def test_merges_resources_with_same_actions(self):
+        underTest = PolicyAccumulator()
+        underTest.add(iam.PolicyStatement(actions=["s3:GetObject"], resources=["arn:a"]))
+        underTest.add(iam.PolicyStatement(actions=["s3:GetObject"], resources=["arn:b"]))
+
+        statements = underTest.statements()
+
+        self.assertEqual(1, len(statements))
+        self.assertEqual(["arn:a", "arn:b"], statements[0].resources)
+
+    def test_keeps_different_effects_and_conditions_apart(self):
+        underTest = PolicyAccumulator()
+        underTest.add(iam.PolicyStatement(actions=["s3:GetObject"], resources=["*"]))
+        underTest.add(
+            iam.PolicyStatement(
+                effect=iam.Effect.DENY, actions=["s3:DeleteObject"], resources=["*"]
+            )
+        )
+        underTest.add(
+            iam.PolicyStatement(
+                actions=["s3:PutObject"],
+                resources=["*"],
+                conditions={"Bool": {"aws:SecureTransport": "true"}},
+            )
+        )
+
+        statements = underTest.statements()
+
+        self.assertEqual(3, len(statements))
+
+    def test_drops_duplicate_actions_and_resources(self):
+        underTest = PolicyAccumulator()
+        for _ in range(3):
+            underTest.add(
+                iam.PolicyStatement(actions=["s3:GetObject"], resources=["arn:a", "arn:a"])
+            )
+
+        statements = underTest.statements()
+
+        self.assertEqual(1, len(statements))
+        self.assertEqual(["s3:GetObject"], statements[0].actions)
+        self.assertEqual(["arn:a"], statements[0].resources)
+
+    def test_keeps_statements_with_sid(self):
+        underTest = PolicyAccumulator()
+        statement = iam.PolicyStatement(sid="Keep", actions=["s3:GetObject"], resources=["*"])
+        underTest.add(statement)
+        underTest.add(iam.PolicyStatement(actions=["s3:GetObject"], resources=["*"]))
+
+        statements = underTest.statements()
+
+        self.assertEqual(2, len(statements))
+        self.assertIs(statement, statements[-1])
+
+
+class TestCommonRolePolicies(unittest.TestCase):
+    """
+    Synthesizes the whole iOS app, with its secrets faked, and checks the
+    policies of the common roles.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.output_dir = tempfile.TemporaryDirectory()
+        synth_app(cls.output_dir.name)
+        cls.template = load_template(cls.output_dir.name, "common")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.output_dir.cleanup()
+
+    def role_policies(self) -> dict:
+        policies = dict()
+        for resource in self.template["Resources"].values():
+            if resource["Type"] != "AWS::IAM::Policy":
+                continue
+            for role in resource["Properties"]["Roles"]:
+                policies.setdefault(role["Ref"], []).append(resource["Properties"])
+        return policies
+
+    def test_role_policies_are_within_size_limit(self):
+        role_policies = self.role_policies()
+
+        self.assertEqual(4, len(role_policies))
+        for role, policies in role_policies.items():
+            size = sum(len(json.dumps(policy, separators=(",", ":"))) for policy in policies)
+            self.assertLess(size, ROLE_POLICY_SIZE_LIMIT, role)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import boto3
+from cryptography.fernet import Fernet
+from moto import mock_aws
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+import cdk_integration_tests_ios  # noqa: F401 (adds the common resources to the path)
+from common.secrets_manager import SecretsProvider
+
+
+class TestSecretsProvider(unittest.TestCase):
+    def setUp(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        patcher = patch.dict(
+            os.environ, {"AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing"}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.secretsmanager = boto3.client("secretsmanager", region_name="us-east-1")
+        for name in ["integ_test_secrets_ios", "integ_test_secrets_android"]:
+            self.secretsmanager.create_secret(
+                Name=name, SecretString=json.dumps({"common.password": f"{name}-password"})
+            )
+
+    def count_calls(self, provider: SecretsProvider) -> list:
+        calls = []
+        provider.client.meta.events.register(
+            "before-call.secretsmanager", lambda model, **_: calls.append(model.name)
+        )
+        return calls
+
+    def test_remembers_secrets(self):
+        underTest = SecretsProvider()
+        calls = self.count_calls(underTest)
+
+        first = underTest.get_secret("integ_test_secrets_ios")
+        second = underTest.get_secret("integ_test_secrets_ios")
+
+        self.assertEqual({"common.password": "integ_test_secrets_ios-password"}, first)
+        self.assertEqual(first, second)
+        self.assertEqual(["GetSecretValue"], calls)
+
+    def test_fetches_secrets_again_after_ttl(self):
+        underTest = SecretsProvider(ttl_seconds=0)
+        calls = self.count_calls(underTest)
+
+        underTest.get_secret("integ_test_secrets_ios")
+        underTest.get_secret("integ_test_secrets_ios")
+
+        self.assertEqual(["GetSecretValue", "GetSecretValue"], calls)
+
+    def test_fetches_several_secrets_in_one_call(self):
+        underTest = SecretsProvider()
+        calls = self.count_calls(underTest)
+
+        secrets = underTest.get_secrets(["integ_test_secrets_ios", "integ_test_secrets_android"])
+        underTest.get_secret("integ_test_secrets_android")
+
+        self.assertEqual(
+            "integ_test_secrets_android-password",
+            secrets["integ_test_secrets_android"]["common.password"],
+        )
+        self.assertEqual(["BatchGetSecretValue"], calls)
+
+    def test_reads_encrypted_disk_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            key = Fernet.generate_key()
+            SecretsProvider(cache_key=key, cache_dir=cache_dir).get_secret("integ_test_secrets_ios")
+            self.secretsmanager.delete_secret(
+                SecretId="integ_test_secrets_ios", ForceDeleteWithoutRecovery=True
+            )
+
+            underTest = SecretsProvider(cache_key=key, cache_dir=cache_dir)
+            secret = underTest.get_secret("integ_test_secrets_ios")
+
+            self.assertEqual("integ_test_secrets_ios-password", secret["common.password"])
+            for file_name in os.listdir(cache_dir):
+                with open(f"{cache_dir}/{file_name}", "rb") as cache_file:
+                    self.assertNotIn(b"password", cache_file.read())
+
+    def test_ignores_disk_cache_of_another_key(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            SecretsProvider(cache_key=Fernet.generate_key(), cache_dir=cache_dir).get_secret(
+                "integ_test_secrets_ios"
+            )
+
+            underTest = SecretsProvider(cache_key=Fernet.generate_key(), cache_dir=cache_dir)
+            calls = self.count_calls(underTest)
+            underTest.get_secret("integ_test_secrets_ios")
+
+            self.assertEqual(["GetSecretValue"], calls)
+
+
+if __name__ == "__main__":
+    unittest.main()
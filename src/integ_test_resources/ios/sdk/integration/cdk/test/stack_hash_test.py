@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import json
+import pathlib
+import sys
+import unittest
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()) + "/..")
+import cdk_integration_tests_ios  # noqa: F401 (adds the common resources to the path)
+from aws_cdk import App, CfnResource, Stack
+from aws_cdk.assertions import Template
+from common.parameter_store import save_stack_hash_parameter
+from common.platforms import Platform
+
+
+def resolve(value, physical_ids: dict):
+    """
+    Substitutes the Refs and Fn::Joins of a template value the way
+    CloudFormation does, with the given physical IDs.
+    """
+    if isinstance(value, dict) and "Ref" in value:
+        return physical_ids[value["Ref"]]
+    if isinstance(value, dict) and "Fn::Join" in value:
+        separator, items = value["Fn::Join"]
+        return separator.join(resolve(item, physical_ids) for item in items)
+    return value
+
+
+class TestStackHashParameter(unittest.TestCase):
+    """
+    Checks that a stack's version marker changes when a resource is
+    replaced behind the same logical ID.
+    """
+
+    def setUp(self):
+        stack = Stack(App(), "s3")
+        bucket = CfnResource(stack, "bucket", type="AWS::S3::Bucket")
+        save_stack_hash_parameter(
+            stack, {"bucket_name": bucket.ref, "region": "us-east-1"}, Platform.IOS
+        )
+        parameters = Template.from_stack(stack).find_resources("AWS::SSM::Parameter")
+        (self.marker,) = [parameter["Properties"]["Value"] for parameter in parameters.values()]
+
+    def test_marker_holds_deploy_time_values(self):
+        marker = json.loads(resolve(self.marker, {"bucket": "bucket-1"}))
+
+        self.assertEqual({"bucket_name": "bucket-1"}, marker["values"])
+        self.assertEqual(64, len(marker["definition"]))
+
+    def test_replaced_resource_changes_the_marker(self):
+        self.assertNotEqual(
+            resolve(self.marker, {"bucket": "bucket-1"}),
+            resolve(self.marker, {"bucket": "bucket-2"}),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
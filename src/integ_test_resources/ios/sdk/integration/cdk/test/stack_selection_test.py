@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()))
+from app_synth import load_template, synth_app
+
+
+class TestStackSelection(unittest.TestCase):
+    """
+    Synthesizes the app with a selection of stacks, and checks that `common`
+    cannot be deployed from it.
+    """
+
+    @staticmethod
+    def refusal_rules(template: dict) -> list:
+        return [
+            rule
+            for logical_id, rule in template.get("Rules", {}).items()
+            if logical_id.startswith("refusepartialdeployment")
+        ]
+
+    def synth(self, **context) -> str:
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        synth_app(output_dir.name, **context)
+        return output_dir.name
+
+    def test_refuses_to_deploy_a_partial_common_stack(self):
+        output_dir = self.synth(stacks="iot")
+
+        rules = self.refusal_rules(load_template(output_dir, "common"))
+
+        self.assertEqual(1, len(rules))
+        assertion = rules[0]["Assertions"][0]
+        self.assertIn("--exclusively", assertion["AssertDescription"])
+        self.assertFalse(os.path.exists(f"{output_dir}/s3.template.json"))
+
+    def test_selecting_common_builds_every_stack(self):
+        output_dir = self.synth(stacks="common")
+
+        self.assertEqual([], self.refusal_rules(load_template(output_dir, "common")))
+        self.assertTrue(os.path.exists(f"{output_dir}/s3.template.json"))
+
+
+if __name__ == "__main__":
+    unittest.main()
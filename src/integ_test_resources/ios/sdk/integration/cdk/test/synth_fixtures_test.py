@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(str(pathlib.Path(__file__).parent.absolute()))
+from app_synth import synth_app
+
+SECRET_KEYS = [
+    "common.password",
+    "common.shared_email",
+    "facebook.api_version",
+    "facebook.app_id",
+    "facebook.app_secret",
+    "facebook.scopes",
+    "google.app_id",
+    "google.app_secret",
+    "google.scopes",
+    "hostedui.domain_prefix",
+    "hostedui.scopes",
+    "hostedui.sign_in_redirect",
+    "hostedui.sign_out_redirect",
+]
+
+
+# The lambda stack stamps its functions' descriptions with the synth time, which also
+# changes the logical ids of their versions, so only its resource types are compared
+TIMESTAMPED_TEMPLATES = ["lambda.template.json"]
+# The iot stack names its policy after a hash of the policy document, which holds the names
+# of the region and account tokens. Those depend on the tokens created before them, which
+# differ between the two syntheses, so only its resource types are compared
+TOKEN_HASHED_TEMPLATES = ["iot.template.json"]
+
+
+def resource_types(template):
+    return sorted(resource["Type"] for resource in template["Resources"].values())
+
+
+class TestSynthFixtures(unittest.TestCase):
+    """
+    Records the region lookups of the whole iOS app, adds faked secrets to the
+    fixture, and checks that replaying it, with unusable credentials,
+    synthesizes the same templates.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        cls.fixture_path = cls.temp_dir.name + "/synth-fixture.json"
+        cls.recorded_dir = cls.temp_dir.name + "/recorded"
+        cls.replayed_dir = cls.temp_dir.name + "/replayed"
+
+        synth_app(cls.recorded_dir, record_synth_fixture=cls.fixture_path)
+        with open(cls.fixture_path) as fixture_file:
+            cls.fixture = json.load(fixture_file)
+
+        # The secrets were faked while recording, so they are added by hand
+        secrets = {key: "secret-" + key.replace(".", "-") for key in SECRET_KEYS}
+        cls.fixture["lookups"]["secrets"] = {"integ_test_secrets_ios": secrets}
+        with open(cls.fixture_path, "w") as fixture_file:
+            json.dump(cls.fixture, fixture_file)
+
+        offline_environment = {
+            "AWS_ACCESS_KEY_ID": "invalid",
+            "AWS_SECRET_ACCESS_KEY": "invalid",
+            "AWS_EC2_METADATA_DISABLED": "true",
+        }
+        with patch.dict(os.environ, offline_environment):
+            synth_app(cls.replayed_dir, fake_secrets=False, replay_synth_fixture=cls.fixture_path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def test_fixture_records_region_lookups(self):
+        self.assertEqual(1, self.fixture["version"])
+        self.assertIn("us-east-1", self.fixture["lookups"]["regions"]["cognito-identity"])
+
+    def test_replay_synthesizes_the_same_templates(self):
+        templates = sorted(
+            name for name in os.listdir(self.recorded_dir) if name.endswith(".template.json")
+        )
+
+        self.assertIn("mobileclient.template.json", templates)
+        for name in templates:
+            with open(f"{self.recorded_dir}/{name}") as recorded_file:
+                recorded = json.load(recorded_file)
+            with open(f"{self.replayed_dir}/{name}") as replayed_file:
+                replayed = json.load(replayed_file)
+            if name in TIMESTAMPED_TEMPLATES + TOKEN_HASHED_TEMPLATES:
+                self.assertEqual(resource_types(recorded), resource_types(replayed), name)
+            else:
+                self.assertEqual(recorded, replayed, name)
+
+
+if __name__ == "__main__":
+    unittest.main()